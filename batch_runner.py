@@ -0,0 +1,173 @@
+import io
+import json
+import time
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+BATCH_PROVIDERS = ("anthropic", "openai")
+
+# Requests per submitted batch (provider limits: 100k for Anthropic, 50k for OpenAI).
+MAX_BATCH_REQUESTS = {"anthropic": 100_000, "openai": 50_000}
+
+OPENAI_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+BatchResults = Dict[str, Tuple[str, Dict[str, int]]]
+StatusCallback = Callable[[str, int, int], None]
+
+
+class BatchRunner:
+    """
+    Run many completion requests through a provider's asynchronous batch API.
+
+    Requests are submitted in as few batches as the provider allows, polled
+    until every batch has ended, and the results are mapped back to the
+    caller's ``custom_id``s. Batched requests cost less and do not count
+    against the interactive rate limits, at the price of turnaround time
+    (minutes to hours).
+    """
+
+    def __init__(self, evaluator, poll_interval: float = 30.0, timeout: float = 24 * 3600,
+                 status_callback: Optional[StatusCallback] = None):
+        """
+        Initialize the runner.
+
+        Args:
+            evaluator: PromptEvaluator whose client, provider and response parsing are used
+            poll_interval: Seconds between status checks
+            timeout: Seconds to wait for all batches before giving up
+            status_callback: Optional callback receiving (status, finished requests, total requests)
+        """
+        if evaluator.provider not in BATCH_PROVIDERS:
+            raise ValueError(f"Batch mode is not available for provider '{evaluator.provider}'. "
+                             f"Use one of: {', '.join(BATCH_PROVIDERS)}")
+        self.evaluator = evaluator
+        self.client = evaluator.client
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.status_callback = status_callback
+        self.batch_ids: List[str] = []
+
+    def run(self, requests: Dict[str, Dict[str, Any]]) -> BatchResults:
+        """
+        Execute requests as provider batches.
+
+        Args:
+            requests: Request parameters (as built by PromptEvaluator._request_params) by custom_id
+
+        Returns:
+            (text, usage) by custom_id for every request that succeeded, with usage
+            as returned by PromptEvaluator._parse_usage; failed or expired requests
+            are left out
+        """
+        if not requests:
+            return {}
+        items = list(requests.items())
+        chunk_size = MAX_BATCH_REQUESTS[self.evaluator.provider]
+        chunks = [dict(items[start:start + chunk_size]) for start in range(0, len(items), chunk_size)]
+        if self.evaluator.provider == "anthropic":
+            return self._run_anthropic(chunks)
+        return self._run_openai(chunks)
+
+    def _report(self, status: str, finished: int, total: int) -> None:
+        if self.status_callback:
+            self.status_callback(status, finished, total)
+
+    def _wait(self, started: float) -> None:
+        if time.monotonic() - started > self.timeout:
+            raise TimeoutError(f"Batches {', '.join(self.batch_ids)} did not finish within {self.timeout:.0f}s")
+        time.sleep(self.poll_interval)
+
+    def _anthropic_batches(self):
+        messages = self.client.messages
+        return getattr(messages, "batches", None) or self.client.beta.messages.batches
+
+    def _run_anthropic(self, chunks: List[Dict[str, Dict[str, Any]]]) -> BatchResults:
+        batches = self._anthropic_batches()
+        total = sum(len(chunk) for chunk in chunks)
+        pending = []
+        for chunk in chunks:
+            batch = batches.create(requests=[
+                {"custom_id": custom_id, "params": params} for custom_id, params in chunk.items()
+            ])
+            self.batch_ids.append(batch.id)
+            pending.append(batch.id)
+
+        started = time.monotonic()
+        while True:
+            statuses = [batches.retrieve(batch_id) for batch_id in pending]
+            finished = sum(
+                counts.succeeded + counts.errored + counts.canceled + counts.expired
+                for counts in (status.request_counts for status in statuses)
+            )
+            self._report("processing", finished, total)
+            if all(status.processing_status == "ended" for status in statuses):
+                break
+            self._wait(started)
+
+        results: BatchResults = {}
+        for batch_id in pending:
+            for entry in batches.results(batch_id):
+                if entry.result.type == "succeeded":
+                    results[entry.custom_id] = self.evaluator._parse_completion(entry.result.message)
+        self._report("ended", len(results), total)
+        return results
+
+    def _run_openai(self, chunks: List[Dict[str, Dict[str, Any]]]) -> BatchResults:
+        total = sum(len(chunk) for chunk in chunks)
+        pending = []
+        for chunk in chunks:
+            lines = "".join(
+                json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": params}) + "\n"
+                for custom_id, params in chunk.items()
+            )
+            input_file = self.client.files.create(
+                file=("neo_batch.jsonl", io.BytesIO(lines.encode("utf-8"))),
+                purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            self.batch_ids.append(batch.id)
+            pending.append(batch.id)
+
+        started = time.monotonic()
+        while True:
+            statuses = [self.client.batches.retrieve(batch_id) for batch_id in pending]
+            finished = sum(
+                (status.request_counts.completed + status.request_counts.failed) if status.request_counts else 0
+                for status in statuses
+            )
+            self._report("processing", finished, total)
+            if all(status.status in OPENAI_TERMINAL_STATUSES for status in statuses):
+                break
+            self._wait(started)
+
+        results: BatchResults = {}
+        for status in statuses:
+            if not status.output_file_id:
+                continue
+            content = self.client.files.content(status.output_file_id).text
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if entry.get("error") or response.get("status_code") != 200:
+                    continue
+                results[entry["custom_id"]] = self._parse_openai_body(response["body"])
+        self._report("ended", len(results), total)
+        return results
+
+    @staticmethod
+    def _parse_openai_body(body: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+        choices = body.get("choices") or []
+        text = (choices[0]["message"].get("content") or "") if choices else ""
+        usage = body.get("usage") or {}
+        details = usage.get("prompt_tokens_details") or {}
+        return text, {
+            "input_tokens": usage.get("prompt_tokens", 0),
+            "output_tokens": usage.get("completion_tokens", 0),
+            "cache_read_tokens": details.get("cached_tokens") or 0,
+            "cache_write_tokens": 0
+        }
@@ -0,0 +1,198 @@
+"""
+Throughput and memory benchmarks for the evaluation pipeline.
+
+Runs evaluate_prompts against the bundled mock server, then the statistics
+and the HTML report, for each dataset size. Every size runs in a fresh
+process so its peak RSS is its own. Results are compared with a JSON
+baseline and the script exits non-zero if any metric regressed by more
+than the tolerance:
+
+    python benchmarks/run_benchmarks.py                      # 100, 10k, 100k cases vs baseline.json
+    python benchmarks/run_benchmarks.py --sizes 100,10000
+    python benchmarks/run_benchmarks.py --update-baseline    # record a new baseline
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Any
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_SIZES = "100,10000,100000"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+PROMPT_A = "You are a helpful assistant. Answer concisely: {input}"
+PROMPT_B = "You are an expert assistant. Provide a detailed answer to: {input}"
+
+# Metrics compared against the baseline; True means higher is better.
+METRICS = {
+    "throughput_cases_per_s": True,
+    "evaluate_s": False,
+    "statistics_s": False,
+    "report_s": False,
+    "peak_rss_mb": False,
+}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def synthetic_dataset(size: int) -> List[Dict[str, str]]:
+    return [{"input": f"Customer question {i}: how do I reset my password on device {i % 97}?"}
+            for i in range(size)]
+
+
+def run_size(size: int, base_url: str, concurrency: int) -> Dict[str, Any]:
+    """Benchmark one dataset size in the current process."""
+    from evaluator import PromptEvaluator
+    from rate_limiter import AdaptiveRateLimiter
+    from report_builder import generate_html_report
+    from stats_calculator import calculate_statistics, calculate_latency_statistics, calculate_roi
+
+    evaluator = PromptEvaluator(
+        provider="anthropic",
+        api_key="benchmark",
+        base_url=base_url,
+        rate_limiter=AdaptiveRateLimiter(requests_per_minute=1e9, tokens_per_minute=1e12)
+    )
+    dataset = synthetic_dataset(size)
+
+    started = time.perf_counter()
+    results = evaluator.evaluate_prompts(PROMPT_A, PROMPT_B, dataset, concurrency=concurrency)
+    evaluate_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    stats = calculate_statistics(results["prompt_a"]["quality_scores"], results["prompt_b"]["quality_scores"])
+    stats["latency"] = calculate_latency_statistics(
+        [r["time"] for r in results["prompt_a"]["results"]],
+        [r["time"] for r in results["prompt_b"]["results"]]
+    )
+    roi = calculate_roi(results["prompt_a"]["avg_cost"], results["prompt_b"]["avg_cost"],
+                        results["prompt_a"]["avg_quality"], results["prompt_b"]["avg_quality"])
+    statistics_s = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        started = time.perf_counter()
+        generate_html_report(results, stats, roi, os.path.join(output_dir, "report.html"),
+                             prompt_a=PROMPT_A, prompt_b=PROMPT_B, dataset_name=f"synthetic-{size}",
+                             model_name=evaluator.model, provider=evaluator.provider)
+        report_s = time.perf_counter() - started
+
+    return {
+        "cases": size,
+        "api_calls": evaluator.call_count,
+        "throughput_cases_per_s": size / evaluate_s,
+        "evaluate_s": evaluate_s,
+        "statistics_s": statistics_s,
+        "report_s": report_s,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float) -> List[str]:
+    """
+    List metrics that are worse than the baseline by more than ``tolerance``.
+
+    Sizes missing from the baseline are skipped.
+    """
+    regressions = []
+    for size, metrics in current.items():
+        reference = baseline.get(size)
+        if not reference:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = reference.get(metric), metrics[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{size} cases: {metric} {old:.3f} -> {new:.3f} ({change * 100:+.1f}%)")
+    return regressions
+
+
+def print_table(current: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{'cases':>8} {'cases/s':>10} {'evaluate':>10} {'statistics':>11} {'report':>9} {'peak RSS':>10}"
+    print(header)
+    print("-" * len(header))
+    for metrics in current.values():
+        print(f"{metrics['cases']:>8} {metrics['throughput_cases_per_s']:>10.1f} {metrics['evaluate_s']:>9.2f}s "
+              f"{metrics['statistics_s']:>10.3f}s {metrics['report_s']:>8.3f}s {metrics['peak_rss_mb']:>7.1f} MB")
+
+
+@click.command()
+@click.option("--sizes", default=DEFAULT_SIZES, show_default=True, help="Comma-separated dataset sizes")
+@click.option("--concurrency", default=32, type=click.IntRange(min=1), show_default=True,
+              help="Concurrent API calls during evaluate_prompts")
+@click.option("--latency", default="fixed:0", show_default=True,
+              help="Mock server latency distribution (see mock_server.py --help)")
+@click.option("--baseline", "baseline_path", default=DEFAULT_BASELINE, show_default=True,
+              help="JSON baseline to compare against")
+@click.option("--tolerance", default=0.25, type=click.FloatRange(min=0), show_default=True,
+              help="Allowed relative regression before the run fails")
+@click.option("--update-baseline", is_flag=True, help="Write the results as the new baseline")
+@click.option("--single", type=int, hidden=True)
+@click.option("--base-url", hidden=True)
+def main(sizes, concurrency, latency, baseline_path, tolerance, update_baseline, single, base_url):
+    """Benchmark evaluate_prompts, the statistics and the HTML report against a local mock server."""
+    if single:
+        print(json.dumps(run_size(single, base_url, concurrency)))
+        return
+
+    from mock_server import serve, MockBehaviour
+
+    server = serve(0, behaviour=MockBehaviour(latency=latency, seed=0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    current: Dict[str, Dict[str, Any]] = {}
+    for size in (int(value) for value in sizes.split(",")):
+        click.echo(f"Benchmarking {size} cases...", err=True)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--single", str(size), "--base-url", base_url,
+             "--concurrency", str(concurrency)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        current[str(size)] = json.loads(output.strip().splitlines()[-1])
+    server.shutdown()
+
+    print_table(current)
+
+    if update_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump({
+                "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                                "concurrency": concurrency, "latency": latency},
+                "results": current
+            }, f, indent=2)
+            f.write("\n")
+        click.echo(f"Baseline written to {baseline_path}")
+        return
+
+    if not os.path.exists(baseline_path):
+        click.echo(f"No baseline at {baseline_path}; run with --update-baseline to record one")
+        return
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline["results"], tolerance)
+    if regressions:
+        click.echo(f"\nREGRESSION (tolerance {tolerance * 100:.0f}%):", err=True)
+        for regression in regressions:
+            click.echo(f"  {regression}", err=True)
+        sys.exit(1)
+    click.echo(f"\nNo regressions beyond {tolerance * 100:.0f}% of {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
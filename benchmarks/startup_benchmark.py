@@ -0,0 +1,153 @@
+"""
+Cold-start benchmark for the neo_test.py CLI.
+
+Times fresh interpreter runs of the paths that should return almost
+immediately (--help and an argument error), records the -X importtime
+profile of the CLI module, and fails if startup regressed beyond the
+tolerance or if a deferred heavy dependency is imported at startup:
+
+    python benchmarks/startup_benchmark.py                    # compare with startup_baseline.json
+    python benchmarks/startup_benchmark.py --update-baseline  # record a new baseline
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+# Commands timed, by name. None of them may call a provider.
+COMMANDS = {
+    "help": ["--help"],
+    "run_help": ["run", "--help"],
+    "missing_api_key": ["--provider", "openrouter", "--prompt-a", "A: {input}", "--prompt-b", "B: {input}"],
+}
+
+# Modules that must only be imported once a run actually needs them.
+DEFERRED_MODULES = ("anthropic", "openai", "scipy", "tiktoken")
+
+
+def time_command(args: List[str], repeats: int) -> Dict[str, float]:
+    """Median and minimum wall time in milliseconds of ``python neo_test.py ARGS`` over ``repeats`` runs."""
+    env = {key: value for key, value in os.environ.items() if not key.endswith("_API_KEY")}
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "neo_test.py"] + args, cwd=ROOT, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+
+
+def import_profile() -> List[Tuple[str, int, int]]:
+    """
+    Every module imported by ``import neo_test``, in import order.
+
+    Parsed from the interpreter's ``-X importtime`` report.
+
+    Returns:
+        List of (module, nesting depth, cumulative microseconds); depth 0 is a top-level import
+    """
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import neo_test"], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), depth, int(cumulative)))
+    return modules
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """
+    List commands whose startup time is worse than the baseline by more than ``tolerance``.
+
+    The fastest run is compared rather than the median: scheduler noise only
+    ever adds time, so the minimum is the stablest estimate of cold start.
+    """
+    regressions = []
+    for name, metrics in current.items():
+        old = baseline.get(name, {}).get("min_ms")
+        if not old:
+            continue
+        change = (metrics["min_ms"] - old) / old
+        if change > tolerance:
+            regressions.append(f"{name}: {old:.0f} ms -> {metrics['min_ms']:.0f} ms ({change * 100:+.1f}%)")
+    return regressions
+
+
+@click.command()
+@click.option("--repeats", default=10, type=click.IntRange(min=1), show_default=True,
+              help="Cold runs per command")
+@click.option("--baseline", "baseline_path", default=DEFAULT_BASELINE, show_default=True,
+              help="JSON baseline to compare against")
+@click.option("--tolerance", default=0.25, type=click.FloatRange(min=0), show_default=True,
+              help="Allowed relative regression of the fastest run before the run fails")
+@click.option("--top", default=10, type=click.IntRange(min=0), show_default=True,
+              help="Slowest top-level imports to print")
+@click.option("--update-baseline", is_flag=True, help="Write the results as the new baseline")
+def main(repeats, baseline_path, tolerance, top, update_baseline):
+    """Benchmark neo_test.py cold start and check that heavy dependencies stay deferred."""
+    current: Dict[str, Dict[str, float]] = {}
+    for name, args in COMMANDS.items():
+        current[name] = time_command(args, repeats)
+        click.echo(f"{name:>16}: median {current[name]['median_ms']:.0f} ms, min {current[name]['min_ms']:.0f} ms")
+
+    profile = import_profile()
+    imported = {name.split(".")[0] for name, _, _ in profile}
+    # importtime lists a module after its children, so neo_test's direct imports
+    # are the depth-1 rows since the previous top-level row.
+    direct, total = [], 0
+    for name, depth, cumulative in profile:
+        if depth == 0:
+            if name == "neo_test":
+                total = cumulative
+                break
+            direct = []
+        elif depth == 1:
+            direct.append((name, cumulative))
+    click.echo(f"\nimport neo_test: {total / 1000:.0f} ms")
+    for name, cumulative in sorted(direct, key=lambda row: row[1], reverse=True)[:top]:
+        click.echo(f"  {cumulative / 1000:>7.1f} ms  {name}")
+
+    failures = [f"{module} is imported at startup" for module in DEFERRED_MODULES if module in imported]
+
+    if update_baseline and not failures:
+        with open(baseline_path, "w") as f:
+            json.dump({
+                "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                                "repeats": repeats},
+                "results": current,
+                "import_ms": total / 1000
+            }, f, indent=2)
+            f.write("\n")
+        click.echo(f"\nBaseline written to {baseline_path}")
+        return
+
+    if os.path.exists(baseline_path):
+        with open(baseline_path, "r") as f:
+            failures += compare(current, json.load(f)["results"], tolerance)
+    elif not failures:
+        click.echo(f"\nNo baseline at {baseline_path}; run with --update-baseline to record one")
+        return
+
+    if failures:
+        click.echo(f"\nREGRESSION (tolerance {tolerance * 100:.0f}%):", err=True)
+        for failure in failures:
+            click.echo(f"  {failure}", err=True)
+        sys.exit(1)
+    click.echo(f"\nNo regressions beyond {tolerance * 100:.0f}% of {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Iterable, Tuple
+
+# Listwise judge batch size the scheduler switches to when the plan will not fit.
+SCALE_DOWN_JUDGE_BATCH = 5
+# Forecasts are inflated by this fraction before they are compared with a limit.
+SAFETY_MARGIN = 0.1
+# Weight of a prior, in observed calls or cases, when averaged with observations.
+PRIOR_WEIGHT = 2
+# Completed cases needed before the scheduler considers scaling down.
+MIN_OBSERVED_CASES = 3
+# Cases of the dataset rendered and tokenized for the cost priors.
+PRIOR_SAMPLE_CASES = 20
+
+CALL_KINDS = ("generation", "judge", "judge_batch")
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)([hms]?)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "": 1.0}
+
+# Scheduler of the evaluation running in the current asyncio task (and the tasks it starts).
+CURRENT_BUDGET: ContextVar[Optional["BudgetScheduler"]] = ContextVar("neo_budget", default=None)
+# Reservation of the case group evaluated by the current asyncio task.
+CURRENT_RESERVATION: ContextVar[Optional["Reservation"]] = ContextVar("neo_reservation", default=None)
+
+
+def parse_duration(value: str) -> float:
+    """
+    Parse a duration such as ``90``, ``45s``, ``30m`` or ``1h30m`` into seconds.
+
+    Raises:
+        ValueError: If ``value`` is not a positive duration
+    """
+    text = value.strip().lower()
+    position, seconds = 0, 0.0
+    for match in _DURATION_PART.finditer(text):
+        if match.start() != position:
+            break
+        seconds += float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+        position = match.end()
+    if not text or position != len(text) or seconds <= 0:
+        raise ValueError(f"Invalid duration '{value}' (use e.g. 90, 45s, 30m or 1h30m)")
+    return seconds
+
+
+class Reservation:
+    """Worst-case USD set aside for one admitted group of cases, given back call by call."""
+
+    def __init__(self, budget: "BudgetScheduler", amount: float):
+        self.budget = budget
+        self.remaining = amount
+
+    def release(self, amount: float) -> None:
+        """Give back up to ``amount`` once a call has been charged (never more than is left)."""
+        amount = min(amount, self.remaining)
+        self.remaining -= amount
+        self.budget.reserved -= amount
+
+    def close(self) -> None:
+        """Give back whatever is left when the group finishes or is cancelled."""
+        self.release(self.remaining)
+
+
+class BudgetScheduler:
+    """
+    Live cost and wall-time limits for one evaluation run.
+
+    Every API call is charged at its actual token usage as it finishes
+    (cache hits count as free calls). The cost of a call of each kind is
+    forecast from the running average of those charges, seeded with a
+    prior, and the duration of a test case from the cases completed so
+    far. ``max_cost`` is a hard cap: a case only starts if the spend so far,
+    the worst-case cost reserved for the calls still in flight and the
+    worst case of its own calls (every input token counted and every call
+    using its full ``max_tokens``) fit within it. Each call gives back its
+    reservation when it is charged. The deadline is checked against the
+    forecast duration of a case. A refused case waits for cases in flight
+    to finish and is tried again; once a case does not fit with nothing in
+    flight, no new cases are admitted. When the cost forecast for the
+    whole plan exceeds ``max_cost`` the scheduler first switches to
+    listwise judging, which needs fewer and cheaper judge calls. If the
+    deadline passes anyway, ``hard_stop`` tells the evaluator to cancel the
+    cases still in flight.
+    """
+
+    def __init__(self, max_cost: Optional[float] = None, deadline: Optional[float] = None,
+                 call_cost_priors: Optional[Dict[str, float]] = None, call_seconds_prior: float = 2.0,
+                 margin: float = SAFETY_MARGIN, clock=time.monotonic):
+        """
+        Args:
+            max_cost: Spend limit in USD for the run (None for no limit)
+            deadline: Wall-time limit in seconds from ``start`` (None for no limit)
+            call_cost_priors: Expected USD per call by kind ('generation', 'judge', 'judge_batch')
+            call_seconds_prior: Expected seconds per API call
+            margin: Fraction added to forecasts before they are compared with a limit
+            clock: Monotonic time source
+        """
+        if max_cost is not None and max_cost <= 0:
+            raise ValueError("max_cost must be positive")
+        if deadline is not None and deadline <= 0:
+            raise ValueError("deadline must be positive")
+        self.max_cost = max_cost
+        self.deadline = deadline
+        self.margin = margin
+        self.clock = clock
+        self.priors = {kind: (call_cost_priors or {}).get(kind, 0.0) for kind in CALL_KINDS}
+        self.case_seconds_prior = 2 * call_seconds_prior
+        self.spent = 0.0
+        self.reserved = 0.0
+        self.cost_by_kind = {kind: 0.0 for kind in CALL_KINDS}
+        self.calls_by_kind = {kind: 0 for kind in CALL_KINDS}
+        self.expected_calls = {kind: 0 for kind in CALL_KINDS}
+        self.admitted_cases = 0
+        self.completed_cases = 0
+        self.group_seconds: Dict[int, float] = {}
+        self.groups: Dict[int, int] = {}
+        self.started_at: Optional[float] = None
+        self.carried_seconds = 0.0
+        self.stop_reason: Optional[str] = None
+        self.scaled_down_at: Optional[int] = None
+
+    @classmethod
+    def from_estimate(cls, prompt_a: str, prompt_b: str, dataset: Iterable[Dict[str, str]], provider: str,
+                      model: str, max_cost: Optional[float] = None, deadline: Optional[float] = None,
+                      **estimate_options: Any) -> "BudgetScheduler":
+        """
+        Scheduler whose priors come from estimate_run on the first cases of ``dataset``.
+
+        Args:
+            prompt_a: First prompt template
+            prompt_b: Second prompt template
+            dataset: Test cases (re-iterable; only the first PRIOR_SAMPLE_CASES are read)
+            provider: API provider name
+            model: Model name
+            max_cost: Spend limit in USD
+            deadline: Wall-time limit in seconds
+            **estimate_options: Passed to estimate_run (e.g. runs_dir, output_tokens_prior)
+        """
+        from cost_estimator import estimate_run
+
+        single = estimate_run(prompt_a, prompt_b, dataset, provider, model, max_cases=PRIOR_SAMPLE_CASES,
+                              **estimate_options)
+        batched = estimate_run(prompt_a, prompt_b, dataset, provider, model, max_cases=PRIOR_SAMPLE_CASES,
+                               judge_batch=SCALE_DOWN_JUDGE_BATCH, **estimate_options)
+        priors = {}
+        if single["generation_calls"]:
+            priors["generation"] = single["generation_cost"] / single["generation_calls"]
+            priors["judge"] = single["judge_cost"] / single["judge_calls"]
+            priors["judge_batch"] = batched["judge_cost"] / batched["judge_calls"]
+        return cls(max_cost=max_cost, deadline=deadline, call_cost_priors=priors,
+                   call_seconds_prior=single["latency_prior"])
+
+    def start(self) -> None:
+        """Start the deadline clock (the first call wins)."""
+        if self.started_at is None:
+            self.started_at = self.clock()
+
+    @property
+    def elapsed(self) -> float:
+        running = 0.0 if self.started_at is None else self.clock() - self.started_at
+        return self.carried_seconds + running
+
+    def carry_over(self, cases: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]], judge_batch: int = 0,
+                   summary: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Count the spend and time of earlier attempts of a resumed run against the limits.
+
+        Logged case results carry their generation cost only, so judging is
+        charged at the forecast judge cost per case. The spend and elapsed
+        time recorded in the earlier budget ``summary`` are used when they
+        are higher; an attempt that was interrupted writes no summary, so its
+        time cannot be counted.
+
+        Args:
+            cases: (result A, result B) pairs of the cases already logged
+            judge_batch: Listwise judge batch size the logged cases were judged with
+            summary: Budget summary of the last attempt that finished, if any
+        """
+        cases = list(cases)
+        generation = sum(result_a["cost"] + result_b["cost"] for result_a, result_b in cases)
+        judging = len(cases) * (self.case_cost(judge_batch) - 2 * self.call_cost("generation"))
+        summary = summary or {}
+        self.spent += max(summary.get("spent") or 0.0, generation + judging)
+        self.carried_seconds += summary.get("elapsed") or 0.0
+
+    def time_left(self) -> Optional[float]:
+        """Seconds until the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self.elapsed)
+
+    def charge(self, kind: str, cost: float) -> None:
+        """Record a finished call of ``kind`` ('generation', 'judge' or 'judge_batch') that cost ``cost`` USD."""
+        self.spent += cost
+        self.cost_by_kind[kind] += cost
+        self.calls_by_kind[kind] += 1
+
+    def call_cost(self, kind: str) -> float:
+        """Forecast USD of the next call of ``kind``: running average shrunk towards the prior."""
+        return ((self.priors[kind] * PRIOR_WEIGHT + self.cost_by_kind[kind])
+                / (PRIOR_WEIGHT + self.calls_by_kind[kind]))
+
+    @staticmethod
+    def _calls(cases: int, judge_batch: int) -> Dict[str, int]:
+        """Calls needed to evaluate ``cases`` test cases as one group."""
+        if judge_batch:
+            return {"generation": 2 * cases, "judge": 0, "judge_batch": 1}
+        return {"generation": 2 * cases, "judge": 2 * cases, "judge_batch": 0}
+
+    def case_cost(self, judge_batch: int = 0) -> float:
+        """Forecast USD of one more test case."""
+        if judge_batch:
+            return 2 * self.call_cost("generation") + self.call_cost("judge_batch") / judge_batch
+        return 2 * (self.call_cost("generation") + self.call_cost("judge"))
+
+    def committed_cost(self) -> float:
+        """Forecast USD still to be spent on calls of cases already started."""
+        return sum(max(0, self.expected_calls[kind] - self.calls_by_kind[kind]) * self.call_cost(kind)
+                   for kind in CALL_KINDS)
+
+    def case_seconds(self, judge_batch: int = 0) -> float:
+        """
+        Forecast wall time of one group of cases from start to finish.
+
+        The mean over finished groups judged the same way; before the first
+        listwise-judged group finishes, its cases are assumed to take as
+        long as single cases run one after another.
+        """
+        if self.groups.get(judge_batch):
+            return self.group_seconds[judge_batch] / self.groups[judge_batch]
+        single = self.group_seconds[0] / self.groups[0] if self.groups.get(0) else self.case_seconds_prior
+        return single * max(1, judge_batch)
+
+    def forecast_cost(self, remaining_cases: int, judge_batch: int = 0) -> float:
+        """Forecast total spend if ``remaining_cases`` more cases are started after the current ones."""
+        return self.spent + self.committed_cost() + remaining_cases * self.case_cost(judge_batch)
+
+    def admit(self, cases: int, judge_batch: int = 0, worst_case: float = 0.0) -> Optional[Reservation]:
+        """
+        Decide whether a group of ``cases`` test cases may start.
+
+        Refuses the group when the spend so far, the reservations of the
+        calls in flight and ``worst_case`` exceed ``max_cost``, or when the
+        group is forecast to finish after the deadline. The caller should
+        retry after a case in flight finishes; with no case in flight the
+        refusal is final and sets ``stop_reason``.
+
+        Args:
+            cases: Test cases in the group
+            judge_batch: Listwise judge batch size the group is evaluated with
+            worst_case: Largest USD the group's calls can cost
+
+        Returns:
+            Reservation of ``worst_case`` for the admitted group (release it as calls are
+            charged and close it when the group ends), or None if refused
+        """
+        if self.stop_reason is not None:
+            return None
+        self.start()
+        reason = None
+        if self.max_cost is not None and self.spent + self.reserved + worst_case > self.max_cost:
+            reason = "cost limit"
+        if (self.deadline is not None
+                and self.elapsed + self.case_seconds(judge_batch) * (1 + self.margin) > self.deadline):
+            reason = reason or "deadline"
+        if reason is not None:
+            if self.admitted_cases == self.completed_cases:
+                self.stop_reason = reason
+            return None
+        for kind, calls in self._calls(cases, judge_batch).items():
+            self.expected_calls[kind] += calls
+        self.admitted_cases += cases
+        self.reserved += worst_case
+        return Reservation(self, worst_case)
+
+    def complete(self, cases: int, seconds: float, judge_batch: int = 0) -> None:
+        """Record a finished group of ``cases`` test cases that took ``seconds`` since it was admitted."""
+        self.completed_cases += cases
+        self.group_seconds[judge_batch] = self.group_seconds.get(judge_batch, 0.0) + seconds
+        self.groups[judge_batch] = self.groups.get(judge_batch, 0) + 1
+
+    def hard_stop(self) -> bool:
+        """
+        True once a limit has been reached, so the cases in flight should be cancelled.
+
+        Reservations keep the spend within ``max_cost``; the cost check
+        only fires for calls made outside them.
+        """
+        if self.max_cost is not None and self.spent >= self.max_cost:
+            self.stop_reason = "cost limit"
+            return True
+        if self.deadline is not None and self.elapsed >= self.deadline:
+            self.stop_reason = "deadline"
+            return True
+        return False
+
+    def judge_batch_for(self, judge_batch: int, remaining_cases: Optional[int]) -> int:
+        """
+        Judge batch size for the next cases: ``judge_batch``, or SCALE_DOWN_JUDGE_BATCH when
+        the remaining ``remaining_cases`` are forecast to overrun ``max_cost`` with one judge call per response.
+
+        Deadlines do not trigger the switch: listwise judging saves calls
+        but makes every group slower, so under time pressure the run
+        evaluates fewer cases instead.
+        """
+        if (judge_batch or self.max_cost is None or remaining_cases is None
+                or self.completed_cases < MIN_OBSERVED_CASES):
+            return judge_batch
+        if self.forecast_cost(remaining_cases) * (1 + self.margin) > self.max_cost:
+            self.scaled_down_at = self.admitted_cases
+            return SCALE_DOWN_JUDGE_BATCH
+        return judge_batch
+
+    def summary(self, evaluated: int, planned: Optional[int]) -> Dict[str, Any]:
+        """
+        JSON-serializable summary for the run log and the report.
+
+        Args:
+            evaluated: Test cases with results
+            planned: Test cases the run would have evaluated without limits (None if unknown)
+        """
+        truncated = self.stop_reason is not None
+        remaining = (planned - evaluated) if planned is not None else None
+        return {
+            "max_cost": self.max_cost,
+            "deadline": self.deadline,
+            "spent": self.spent,
+            "elapsed": self.elapsed,
+            "truncated": truncated,
+            "reason": self.stop_reason,
+            "evaluated": evaluated,
+            "planned": planned,
+            "forecast_cost": (self.spent + remaining * self.case_cost(SCALE_DOWN_JUDGE_BATCH
+                                                                      if self.scaled_down_at is not None else 0)
+                              if remaining is not None else None),
+            "calls": dict(self.calls_by_kind),
+            "judge_batch_from_case": self.scaled_down_at
+        }
@@ -0,0 +1,233 @@
+import glob
+import itertools
+import json
+import math
+import os
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Iterable
+
+from evaluator import JUDGE_PROMPT_TEMPLATE, PromptEvaluator
+from pricing import get_pricing
+from rate_limiter import DEFAULT_LIMITS
+from run_log import DEFAULT_RUNS_DIR
+
+DEFAULT_OUTPUT_TOKENS_PRIOR = 300
+DEFAULT_LATENCY_PRIOR = 3.0
+JUDGE_OUTPUT_TOKENS = 3
+BATCH_JUDGE_OUTPUT_TOKENS_PER_ITEM = 12
+FALLBACK_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoder(model: str):
+    """
+    Return a cached tiktoken encoder for ``model``, or None if unavailable.
+
+    tiktoken downloads BPE files on first use; when the model is unknown or
+    the files cannot be loaded offline, callers fall back to a character
+    heuristic. tiktoken itself is imported here rather than at module level
+    so that CLI startup does not pay for it.
+    """
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model.split("/", 1)[-1])
+    except Exception:
+        pass
+    try:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Count tokens locally; ~4 characters per token when no encoder is available."""
+    encoder = get_encoder(model)
+    if encoder is None:
+        return max(1, math.ceil(len(text) / 4))
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def token_counter_name(model: str) -> str:
+    encoder = get_encoder(model)
+    return f"tiktoken:{encoder.name}" if encoder is not None else "heuristic (4 chars/token)"
+
+
+def load_run_priors(provider: str, model: str, runs_dir: str = DEFAULT_RUNS_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Derive output-token and latency priors from past run logs of the same model.
+
+    Prompts seen in earlier runs get their own output-token average; other
+    prompts use the average over all responses of the model.
+
+    Args:
+        provider: API provider name
+        model: Model name
+        runs_dir: Directory holding run logs
+
+    Returns:
+        Dictionary with 'output_tokens', 'latency', 'by_prompt' and 'responses',
+        or None when no matching runs exist
+    """
+    output_tokens: List[int] = []
+    latencies: List[float] = []
+    by_prompt: Dict[str, List[int]] = {}
+
+    for path in sorted(glob.glob(os.path.join(runs_dir, "*.jsonl"))):
+        metadata = None
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("type") == "run":
+                    metadata = record
+                    if metadata.get("provider") != provider or metadata.get("model") != model:
+                        break
+                elif record.get("type") == "case" and metadata is not None:
+                    for side in ("a", "b"):
+                        result = record[side]
+                        output_tokens.append(result["output_tokens"])
+                        latencies.append(result["time"])
+                        by_prompt.setdefault(metadata[f"prompt_{side}"], []).append(result["output_tokens"])
+
+    if not output_tokens:
+        return None
+    return {
+        "output_tokens": sum(output_tokens) / len(output_tokens),
+        "latency": sum(latencies) / len(latencies),
+        "by_prompt": {prompt: sum(values) / len(values) for prompt, values in by_prompt.items()},
+        "responses": len(output_tokens)
+    }
+
+
+def estimate_run(prompt_a: str, prompt_b: str, dataset: Iterable[Dict[str, str]], provider: str,
+                 model: str, concurrency: int = 1, judge_batch: int = 0,
+                 max_cases: Optional[int] = None, output_tokens_prior: Optional[float] = None,
+                 latency_prior: Optional[float] = None, requests_per_minute: Optional[float] = None,
+                 runs_dir: str = DEFAULT_RUNS_DIR) -> Dict[str, Any]:
+    """
+    Project calls, tokens, cost and wall time of a run without calling any provider.
+
+    Every prompt x input pair is rendered and counted with a cached local
+    tokenizer. Output tokens come from ``output_tokens_prior`` or, if not
+    given, from past run logs of the same model (falling back to
+    DEFAULT_OUTPUT_TOKENS_PRIOR). Judge calls are included, with the
+    estimated response length standing in for the unseen responses.
+
+    Args:
+        prompt_a: First prompt template
+        prompt_b: Second prompt template
+        dataset: Test cases with 'input' field (streamed, so any iterable works)
+        provider: API provider name
+        model: Model name
+        concurrency: Planned number of concurrent API calls
+        judge_batch: Planned listwise judge batch size (0 = one judge call per response)
+        max_cases: Optional cap on the number of cases
+        output_tokens_prior: Expected output tokens per generation
+        latency_prior: Expected seconds per API call
+        requests_per_minute: Request rate cap used for the wall-time projection
+        runs_dir: Directory with past run logs used for priors
+
+    Returns:
+        Dictionary with call counts, token counts, cost breakdown and projected wall time
+    """
+    pricing = get_pricing(provider, model)
+
+    priors = load_run_priors(provider, model, runs_dir) if output_tokens_prior is None or latency_prior is None else None
+    if output_tokens_prior is not None:
+        prior_source = "configured"
+        output_a = output_b = float(output_tokens_prior)
+    elif priors:
+        prior_source = f"{priors['responses']} past responses"
+        output_a = priors["by_prompt"].get(prompt_a, priors["output_tokens"])
+        output_b = priors["by_prompt"].get(prompt_b, priors["output_tokens"])
+    else:
+        prior_source = "default"
+        output_a = output_b = float(DEFAULT_OUTPUT_TOKENS_PRIOR)
+    if latency_prior is None:
+        latency_prior = priors["latency"] if priors else DEFAULT_LATENCY_PRIOR
+
+    generation_input = 0
+    judge_input = 0
+    judge_output = 0
+    judge_calls = 0
+    case_count = 0
+    group: List[str] = []
+    judge_template_tokens = count_tokens(JUDGE_PROMPT_TEMPLATE.format(input="", response=""), model)
+
+    def add_batch_judge_call(inputs: List[str]) -> None:
+        nonlocal judge_input, judge_output, judge_calls
+        items = [(input_text, "") for input_text in inputs for _ in (prompt_a, prompt_b)]
+        judge_input += count_tokens(PromptEvaluator._render_batch_judge_prompt(items), model)
+        judge_input += round(len(inputs) * (output_a + output_b))
+        judge_output += BATCH_JUDGE_OUTPUT_TOKENS_PER_ITEM * len(items)
+        judge_calls += 1
+
+    for case in itertools.islice(dataset, max_cases):
+        input_text = case["input"]
+        case_count += 1
+        generation_input += count_tokens(prompt_a.replace("{input}", input_text), model)
+        generation_input += count_tokens(prompt_b.replace("{input}", input_text), model)
+        if judge_batch:
+            group.append(input_text)
+            if len(group) == judge_batch:
+                add_batch_judge_call(group)
+                group = []
+        else:
+            input_tokens = count_tokens(input_text, model)
+            judge_input += 2 * (judge_template_tokens + input_tokens) + round(output_a + output_b)
+            judge_output += 2 * JUDGE_OUTPUT_TOKENS
+            judge_calls += 2
+    if group:
+        add_batch_judge_call(group)
+
+    generation_calls = 2 * case_count
+    generation_output = round(case_count * (output_a + output_b))
+    generation_cost = generation_input * pricing["input"] + generation_output * pricing["output"]
+    judge_cost = judge_input * pricing["input"] + judge_output * pricing["output"]
+    total_calls = generation_calls + judge_calls
+
+    rpm = requests_per_minute or DEFAULT_LIMITS.get(provider, (60, 60_000))[0]
+    wall_time = max(total_calls * latency_prior / concurrency, total_calls / rpm * 60.0)
+
+    return {
+        "cases": case_count,
+        "generation_calls": generation_calls,
+        "judge_calls": judge_calls,
+        "total_calls": total_calls,
+        "generation_input_tokens": generation_input,
+        "generation_output_tokens": generation_output,
+        "judge_input_tokens": judge_input,
+        "judge_output_tokens": judge_output,
+        "generation_cost": generation_cost,
+        "judge_cost": judge_cost,
+        "total_cost": generation_cost + judge_cost,
+        "output_tokens_prior_a": output_a,
+        "output_tokens_prior_b": output_b,
+        "output_prior_source": prior_source,
+        "latency_prior": latency_prior,
+        "wall_time_seconds": wall_time,
+        "token_counter": token_counter_name(model)
+    }
+
+
+def scale_estimate(estimate: Dict[str, Any], cases: int) -> Dict[str, Any]:
+    """
+    Extrapolate an estimate linearly to ``cases`` test cases.
+
+    Used when a plan calls for more cases than the dataset provides, so the
+    per-case averages of the available cases stand in for the rest.
+    """
+    if estimate["cases"] == 0:
+        raise ValueError("Cannot scale an estimate of zero cases")
+    factor = cases / estimate["cases"]
+    scaled = dict(estimate)
+    for key in ("generation_calls", "judge_calls", "total_calls", "generation_input_tokens",
+                "generation_output_tokens", "judge_input_tokens", "judge_output_tokens"):
+        scaled[key] = round(estimate[key] * factor)
+    for key in ("generation_cost", "judge_cost", "total_cost", "wall_time_seconds"):
+        scaled[key] = estimate[key] * factor
+    scaled["cases"] = cases
+    return scaled
@@ -0,0 +1,251 @@
+import gzip
+import json
+import os
+import random
+from typing import Dict, List, Any, Optional, Iterable, Iterator
+
+import numpy as np
+
+INDEX_SUFFIX = ".idx.npy"
+
+
+def is_jsonl(path: str) -> bool:
+    return path.endswith((".jsonl", ".jsonl.gz", ".ndjson", ".ndjson.gz"))
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield test cases from a JSONL file one line at a time.
+
+    Gzip-compressed files (``.gz``) are decompressed on the fly. Blank lines
+    are skipped.
+
+    Raises:
+        ValueError: If a line is not valid JSON
+    """
+    with _open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON ({e.msg})") from None
+
+
+def index_path(path: str) -> str:
+    return path + INDEX_SUFFIX
+
+
+def build_index(path: str) -> np.ndarray:
+    """
+    Record the byte offset of every non-blank line of an uncompressed JSONL file.
+
+    The offsets are saved next to the dataset (``<path>.idx.npy``) and reused
+    until the dataset is modified.
+
+    Returns:
+        Array of line offsets
+    """
+    if path.endswith(".gz"):
+        raise ValueError("Byte-offset indexes need an uncompressed JSONL file")
+
+    offsets = []
+    position = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                offsets.append(position)
+            position += len(line)
+
+    index = np.array(offsets, dtype=np.int64)
+    np.save(index_path(path), index)
+    return index
+
+
+def load_index(path: str) -> Optional[np.ndarray]:
+    """Return the saved offset index for ``path``, or None if missing or stale."""
+    saved = index_path(path)
+    if not os.path.exists(saved) or os.path.getmtime(saved) < os.path.getmtime(path):
+        return None
+    return np.load(saved)
+
+
+class JsonlDataset:
+    """
+    Lazily read JSONL dataset.
+
+    Iterating streams cases from disk, so memory use does not grow with the
+    file. With an offset index, ``len()`` is free and cases can be fetched
+    by position without reading the rest of the file.
+    """
+
+    def __init__(self, path: str, use_index: bool = False):
+        """
+        Args:
+            path: Path to a .jsonl or .jsonl.gz file
+            use_index: Build (or reuse) a byte-offset index for random access
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Dataset not found: {path}")
+        self.path = path
+        self.offsets: Optional[np.ndarray] = None
+        self._length: Optional[int] = None
+        if use_index:
+            self.offsets = load_index(path)
+            if self.offsets is None:
+                self.offsets = build_index(path)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter_jsonl(self.path)
+
+    def __len__(self) -> int:
+        if self.offsets is not None:
+            return len(self.offsets)
+        if self._length is None:
+            with _open(self.path) as f:
+                self._length = sum(1 for line in f if line.strip())
+        return self._length
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        if self.offsets is None:
+            raise TypeError("Random access needs an offset index (use_index=True)")
+        with open(self.path, "rb") as f:
+            f.seek(int(self.offsets[position]))
+            return json.loads(f.readline())
+
+    def take(self, positions: Iterable[int]) -> Iterator[Dict[str, Any]]:
+        """Yield the cases at ``positions`` (ascending order reads the file sequentially)."""
+        if self.offsets is None:
+            raise TypeError("Random access needs an offset index (use_index=True)")
+        with open(self.path, "rb") as f:
+            for position in positions:
+                f.seek(int(self.offsets[position]))
+                yield json.loads(f.readline())
+
+
+def reservoir_sample(cases: Iterable[Dict[str, Any]], size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Draw a uniform sample of ``size`` cases in a single pass.
+
+    Uses reservoir sampling (Algorithm R), so only ``size`` cases are kept in
+    memory. The same seed and input always give the same sample, returned
+    in the original dataset order.
+
+    Args:
+        cases: Iterable of test cases
+        size: Number of cases to keep
+        seed: Random seed
+
+    Returns:
+        Sampled cases
+    """
+    rng = random.Random(seed)
+    reservoir: List[Any] = []
+    for position, case in enumerate(cases):
+        if position < size:
+            reservoir.append((position, case))
+        else:
+            slot = rng.randint(0, position)
+            if slot < size:
+                reservoir[slot] = (position, case)
+    reservoir.sort(key=lambda item: item[0])
+    return [case for _, case in reservoir]
+
+
+def stratified_sample(cases: Iterable[Dict[str, Any]], size: int, field: str,
+                      seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Draw a sample of ``size`` cases that keeps the proportions of ``field``.
+
+    A first pass counts the cases of each stratum and gives each stratum a
+    share proportional to its count (largest-remainder rounding). A second
+    pass fills one reservoir per stratum, capped at that share, so at most
+    ``size`` cases are held in memory however many strata there are. Cases
+    without the field form their own stratum.
+
+    Args:
+        cases: Re-iterable test cases (list or JsonlDataset); a one-shot iterator is read into a list
+        size: Number of cases to keep
+        field: Case field to stratify by
+        seed: Random seed
+
+    Returns:
+        Sampled cases in the original dataset order
+    """
+    if iter(cases) is cases:
+        cases = list(cases)
+
+    def stratum_of(case: Dict[str, Any]) -> str:
+        return json.dumps(case.get(field), sort_keys=True)
+
+    counts: Dict[str, int] = {}
+    for case in cases:
+        stratum = stratum_of(case)
+        counts[stratum] = counts.get(stratum, 0) + 1
+
+    total = sum(counts.values())
+    if total <= size:
+        allocation = dict(counts)
+    else:
+        quotas = {stratum: size * count / total for stratum, count in counts.items()}
+        allocation = {stratum: int(quota) for stratum, quota in quotas.items()}
+        shortfall = size - sum(allocation.values())
+        for stratum in sorted(quotas, key=lambda s: (quotas[s] - allocation[s], s), reverse=True)[:shortfall]:
+            allocation[stratum] += 1
+
+    rng = random.Random(seed)
+    reservoirs: Dict[str, List[Any]] = {stratum: [] for stratum in counts}
+    seen: Dict[str, int] = dict.fromkeys(counts, 0)
+    for position, case in enumerate(cases):
+        stratum = stratum_of(case)
+        quota = allocation[stratum]
+        if not quota:
+            continue
+        reservoir = reservoirs[stratum]
+        if seen[stratum] < quota:
+            reservoir.append((position, case))
+        else:
+            slot = rng.randint(0, seen[stratum])
+            if slot < quota:
+                reservoir[slot] = (position, case)
+        seen[stratum] += 1
+
+    sample = [item for reservoir in reservoirs.values() for item in reservoir]
+    sample.sort(key=lambda item: item[0])
+    return [case for _, case in sample]
+
+
+def sample_dataset(dataset: Iterable[Dict[str, Any]], size: int, stratify_by: Optional[str] = None,
+                   seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Deterministically sample ``size`` cases from a dataset.
+
+    Indexed JSONL datasets are sampled by position, reading only the chosen
+    lines; everything else is sampled in one streaming pass (two with
+    ``stratify_by``: one to count the strata, one to sample them).
+
+    Args:
+        dataset: List, JsonlDataset or any iterable of test cases
+        size: Number of cases to keep
+        stratify_by: Optional case field whose proportions the sample keeps
+        seed: Random seed
+
+    Returns:
+        Sampled cases in the original dataset order
+    """
+    if stratify_by:
+        return stratified_sample(dataset, size, stratify_by, seed)
+    if isinstance(dataset, JsonlDataset) and dataset.offsets is not None:
+        total = len(dataset)
+        if total <= size:
+            return list(dataset)
+        positions = sorted(random.Random(seed).sample(range(total), size))
+        return list(dataset.take(positions))
+    return reservoir_sample(dataset, size, seed)
@@ -0,0 +1,271 @@
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 5
+
+_WHITESPACE = re.compile(r"\s+")
+_DIGITS = re.compile(r"\d")
+
+
+def normalize_text(text: str, mask_digits: bool = True) -> str:
+    """Lowercase, collapse whitespace and (optionally) replace every digit with 0."""
+    text = _WHITESPACE.sub(" ", text.lower()).strip()
+    return _DIGITS.sub("0", text) if mask_digits else text
+
+
+def shingle_hashes(text: str, size: int = DEFAULT_SHINGLE_SIZE) -> np.ndarray:
+    """CRC32 of every distinct character ``size``-gram of ``text`` (the whole text if it is shorter)."""
+    if len(text) <= size:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+                       dtype=np.uint64, count=len(shingles))
+
+
+def _area(values: np.ndarray, points: np.ndarray) -> float:
+    """Trapezoidal integral of ``values`` over ``points``."""
+    return float(np.sum((values[1:] + values[:-1]) / 2 * np.diff(points)))
+
+
+def lsh_parameters(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Choose (bands, rows per band) for a Jaccard ``threshold``.
+
+    Two texts with Jaccard similarity s become candidates with probability
+    1 - (1 - s^rows)^bands. The split minimises the area of false positives
+    below the threshold plus false negatives above it.
+    """
+    similarities = np.linspace(0.0, 1.0, 201)
+    below, above = similarities <= threshold, similarities >= threshold
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        if rows < 1:
+            break
+        probability = 1 - (1 - similarities ** rows) ** bands
+        false_positive = _area(probability[below], similarities[below])
+        false_negative = _area(1 - probability[above], similarities[above])
+        error = false_positive + false_negative
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index that groups near-identical texts into clusters.
+
+    Each text is reduced to a MinHash signature of its character shingles
+    and then to one 64-bit hash per LSH band. Only the band hashes are
+    kept (8 bytes per band per text), so millions of texts fit in memory.
+    Texts that share any band hash are linked, and clusters are the
+    connected components of those links, so they are transitive: A~B and
+    B~C put A and C together.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM,
+                 shingle_size: int = DEFAULT_SHINGLE_SIZE, mask_digits: bool = True, seed: int = 0):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity of shingle sets above which texts are duplicates
+            num_perm: MinHash permutations (more is more precise and slower)
+            shingle_size: Characters per shingle
+            mask_digits: Treat all digits as equal, so "order #12345" matches "order #12346"
+            seed: Seed for the hash permutations; equal seeds give equal clusters
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.mask_digits = mask_digits
+        self.bands, self.rows = lsh_parameters(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: (a * x + b) mod 2^64, top 32 bits; a must be odd.
+        self._a = rng.integers(1, 2 ** 63, size=self.bands * self.rows, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=self.bands * self.rows, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 2 ** 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._chunks: List[np.ndarray] = []
+        self._pending: List[np.ndarray] = []
+        self.size = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of ``text`` (one uint64 per permutation)."""
+        hashes = shingle_hashes(normalize_text(text, self.mask_digits), self.shingle_size)
+        with np.errstate(over="ignore"):
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1)
+
+    def band_hashes(self, text: str) -> np.ndarray:
+        """One 64-bit hash per LSH band of ``text``'s signature."""
+        signature = self.signature(text).reshape(self.bands, self.rows)
+        with np.errstate(over="ignore"):
+            return (signature * self._band_mix).sum(axis=1, dtype=np.uint64)
+
+    def add(self, text: str) -> int:
+        """Index ``text``; returns its position."""
+        self._pending.append(self.band_hashes(text))
+        if len(self._pending) >= 4096:
+            self._chunks.append(np.stack(self._pending))
+            self._pending = []
+        self.size += 1
+        return self.size - 1
+
+    def _band_matrix(self) -> np.ndarray:
+        if self._pending:
+            self._chunks.append(np.stack(self._pending))
+            self._pending = []
+        if not self._chunks:
+            return np.zeros((0, self.bands), dtype=np.uint64)
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+        return self._chunks[0]
+
+    def cluster_labels(self) -> np.ndarray:
+        """
+        Cluster of every indexed text, labelled by the position of its first member.
+
+        Runs min-label propagation over the band buckets until it converges
+        (a few vectorized sweeps per band).
+        """
+        bands = self._band_matrix()
+        count = len(bands)
+        labels = np.arange(count)
+        if count == 0:
+            return labels
+        buckets = [np.unique(bands[:, band], return_inverse=True)[1].ravel() for band in range(self.bands)]
+        while True:
+            previous = labels.copy()
+            for bucket in buckets:
+                bucket_min = np.full(bucket.max() + 1, count, dtype=labels.dtype)
+                np.minimum.at(bucket_min, bucket, labels)
+                labels = np.minimum(labels, bucket_min[bucket])
+            # Pointer jumping: a label is a member's position, so follow it to that member's label.
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+            if np.array_equal(labels, previous):
+                return labels
+
+
+class DedupResult:
+    """Representative cases of a deduplicated dataset and the weights that restore the original mix."""
+
+    def __init__(self, cases: List[Dict[str, Any]], weights: List[float], positions: List[int],
+                 labels: List[int], cluster_sizes: List[int], total: int, clusters: int,
+                 max_per_cluster: int, threshold: float):
+        self.cases = cases
+        self.weights = weights
+        self.positions = positions
+        # Cluster label and cluster size of every kept case.
+        self.labels = labels
+        self.cluster_sizes = cluster_sizes
+        self.total = total
+        self.clusters = clusters
+        self.max_per_cluster = max_per_cluster
+        self.threshold = threshold
+
+    @property
+    def skipped(self) -> int:
+        return self.total - len(self.cases)
+
+    def summary(self, completed: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+        """
+        JSON-serializable summary for the run log and the report.
+
+        Args:
+            completed: Positions in ``cases`` that were evaluated, e.g. after --max-cases or a
+                cost or deadline stop (which can leave gaps); defaults to all
+
+        Returns:
+            Summary whose ``weights`` follow the completed positions in ascending order. A
+            cluster's weight is spread over its completed representatives, so a cluster that
+            only partly completed still counts in full.
+        """
+        positions = range(len(self.cases)) if completed is None else sorted(completed)
+        completed_in_cluster = Counter(self.labels[position] for position in positions)
+        weights = [self.cluster_sizes[position] / completed_in_cluster[self.labels[position]]
+                   for position in positions]
+        return {
+            "threshold": self.threshold,
+            "max_per_cluster": self.max_per_cluster,
+            "total_inputs": self.total,
+            "clusters": self.clusters,
+            "evaluated": len(weights),
+            "represented": round(sum(weights)),
+            "weights": weights,
+        }
+
+
+def _select(dataset: Iterable[Dict[str, Any]], keep: np.ndarray) -> Iterator[Dict[str, Any]]:
+    """Cases of ``dataset`` at the ascending positions ``keep``."""
+    if isinstance(dataset, list):
+        return (dataset[int(position)] for position in keep)
+    if getattr(dataset, "offsets", None) is not None:
+        return dataset.take(int(position) for position in keep)
+    mask = np.zeros(int(keep[-1]) + 1 if len(keep) else 0, dtype=bool)
+    mask[keep] = True
+    return (case for position, case in enumerate(dataset) if position < len(mask) and mask[position])
+
+
+def dedupe_dataset(dataset: Iterable[Dict[str, Any]], threshold: float = DEFAULT_THRESHOLD,
+                   max_per_cluster: int = 1, field: str = "input", **index_options: Any) -> DedupResult:
+    """
+    Cluster near-duplicate inputs and keep a few representatives per cluster.
+
+    The inputs are hashed in one pass. The first ``max_per_cluster``
+    members of each cluster in dataset order are kept, and each kept case
+    is weighted by the share of its cluster it stands for, so weighted
+    statistics over the kept cases estimate the full dataset. Lists and
+    indexed JSONL files are not read again; a streamed JSONL file is read a
+    second time to pick the kept cases.
+
+    Args:
+        dataset: Test cases (any iterable; JsonlDataset is streamed)
+        threshold: Jaccard similarity above which inputs count as duplicates
+        max_per_cluster: Representatives evaluated per cluster
+        field: Case field holding the text to compare
+        **index_options: Passed to NearDuplicateIndex
+
+    Returns:
+        DedupResult with the kept cases in dataset order and their weights
+    """
+    if max_per_cluster < 1:
+        raise ValueError("max_per_cluster must be at least 1")
+    index = NearDuplicateIndex(threshold=threshold, **index_options)
+    for case in dataset:
+        index.add(str(case.get(field, "")))
+    labels = index.cluster_labels()
+
+    # Rank of each case within its cluster, in dataset order.
+    order = np.lexsort((np.arange(len(labels)), labels))
+    sorted_labels = labels[order]
+    starts = np.r_[0, np.flatnonzero(sorted_labels[1:] != sorted_labels[:-1]) + 1] if len(labels) else np.array([], int)
+    sizes = np.diff(np.r_[starts, len(labels)])
+    rank = np.arange(len(labels)) - np.repeat(starts, sizes)
+    keep = np.sort(order[rank < max_per_cluster])
+
+    cluster_size = np.zeros(len(labels), dtype=np.int64)
+    cluster_size[sorted_labels[starts]] = sizes
+    sizes_of_kept = cluster_size[labels[keep]]
+    weights = (sizes_of_kept / np.minimum(sizes_of_kept, max_per_cluster)).tolist()
+
+    return DedupResult(
+        cases=list(_select(dataset, keep)),
+        weights=weights,
+        positions=keep.tolist(),
+        labels=labels[keep].tolist(),
+        cluster_sizes=sizes_of_kept.tolist(),
+        total=len(labels),
+        clusters=len(starts),
+        max_per_cluster=max_per_cluster,
+        threshold=threshold
+    )
@@ -1,223 +1,1398 @@
+import asyncio
+import itertools
+import json
 import os
-from typing import Dict, List, Any, Optional
+import re
+from typing import Dict, List, Any, Optional, Callable, Iterable, Tuple
 import time
-from anthropic import Anthropic
-from openai import OpenAI
-import tiktoken
+from contextvars import ContextVar
+from functools import lru_cache
+
+from batch_runner import BatchRunner
+from budget import BudgetScheduler, CURRENT_BUDGET, CURRENT_RESERVATION, Reservation
+from pricing import get_batch_price_factor, get_pricing
+from rate_limiter import AdaptiveRateLimiter, get_rate_limiter, retry_after_seconds, backoff_seconds
+from response_cache import ResponseCache
+from telemetry import Telemetry, NULL_TELEMETRY, TOKEN_BUCKETS, COST_BUCKETS
+from transport import (DEFAULT_TRANSPORT, TransportConfig, get_async_http_client, get_http_client,
+                       measure_connect_time, warm_up)
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+DEFAULT_MODELS = {
+    "anthropic": "claude-sonnet-4-20250514",
+    "openai": "gpt-4o",
+    "openrouter": "openai/gpt-4o",
+}
+
+Usage = Dict[str, int]
+StoppingRule = Callable[[List[float], List[float]], Optional[str]]
+CaseCallback = Callable[[int, Dict[str, Any], Dict[str, Any]], None]
+
+
+class CallCounter:
+    """API requests sent for one evaluation, which may share its evaluator with others."""
+
+    def __init__(self):
+        self.calls = 0
+
+
+# Counter of the evaluation running in the current asyncio task (and the tasks it starts).
+CURRENT_CALLS: ContextVar[Optional[CallCounter]] = ContextVar("neo_calls", default=None)
+
+
+def provider_sdk(provider: str):
+    """
+    Import and return the SDK module for ``provider``.
+
+    The SDKs take a few hundred milliseconds each to import, so they are
+    loaded on first use and only for the provider a run actually selects.
+    OpenRouter speaks the OpenAI API and uses the openai package.
+    """
+    if provider == "anthropic":
+        import anthropic
+        return anthropic
+    import openai
+    return openai
+
+
+@lru_cache(maxsize=None)
+def retryable_errors(provider: str) -> Tuple[type, ...]:
+    """Exception types from ``provider``'s SDK that are retried with backoff."""
+    sdk = provider_sdk(provider)
+    return (sdk.RateLimitError, sdk.InternalServerError, sdk.APIConnectionError)
+
+
+# Status of Anthropic's overloaded_error, which asks clients to slow down like a 429.
+OVERLOADED_STATUS = 529
+
+
+def is_congestion(provider: str, error: Exception) -> bool:
+    """True for 429s and overload responses, the errors that mean the provider wants fewer requests."""
+    return (isinstance(error, provider_sdk(provider).RateLimitError)
+            or getattr(error, "status_code", None) == OVERLOADED_STATUS)
+
+
+JUDGE_PROMPT_TEMPLATE = """You are an expert evaluator. Rate the following response on a scale of 1-10 based on:
+- Relevance to the input
+- Completeness
+- Clarity
+- Accuracy
+- Usefulness
+
+Input: {input}
+
+Response: {response}
+
+Provide ONLY a single number between 1 and 10 as your rating. Do not include any other text."""
+
+BATCH_JUDGE_PROMPT_TEMPLATE = """You are an expert evaluator. Rate each of the following responses on a scale of 1-10 based on:
+- Relevance to the input
+- Completeness
+- Clarity
+- Accuracy
+- Usefulness
+
+Rate every item independently of the others.
+
+{items}
+
+Return ONLY a JSON object of the form {{"scores": [{{"id": 1, "score": 7}}, {{"id": 2, "score": 4}}]}} with exactly one entry per item id. Do not include any other text."""
+
+# Output token limits of generation and single-response judge calls.
+GENERATION_MAX_TOKENS = 1024
+JUDGE_MAX_TOKENS = 10
+
+JUDGE_PROMPT_PREFIX = JUDGE_PROMPT_TEMPLATE.split("{input}", 1)[0]
+BATCH_JUDGE_PROMPT_PREFIX = BATCH_JUDGE_PROMPT_TEMPLATE.split("{items}", 1)[0]
+
+BATCH_JUDGE_ITEM_TEMPLATE = """### Item {id}
+Input: {input}
+
+Response: {response}
+"""
+
+
+def template_prefix(template: str, placeholder: str = "{input}") -> str:
+    """
+    Return the static part of a prompt template before its first placeholder.
+
+    This prefix is identical for every test case, so it is what provider
+    prompt caching can reuse. Templates without the placeholder have no
+    per-case part and are returned whole.
+    """
+    return template.split(placeholder, 1)[0]
+
+
+def prompt_cache_hit_ratio(results: List[Dict[str, Any]]) -> float:
+    """Share of input tokens served from the provider's prompt cache."""
+    input_tokens = sum(r["input_tokens"] for r in results)
+    cache_reads = sum(r.get("cache_read_tokens", 0) for r in results)
+    return cache_reads / input_tokens if input_tokens else 0.0
+
+
+def summarize_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate per-case results for one prompt into the summary shape used by reports.
+
+    Args:
+        results: Per-case result dictionaries for a single prompt
+
+    Returns:
+        Dictionary with the results list, averages, and quality scores (averages are 0 without results)
+    """
+    count = max(1, len(results))
+    ttfts = [r["ttft"] for r in results if r.get("ttft") is not None]
+    return {
+        "results": results,
+        "avg_quality": sum(r["quality"] for r in results) / count,
+        "avg_time": sum(r["time"] for r in results) / count,
+        "avg_tokens": sum(r["total_tokens"] for r in results) / count,
+        "avg_cost": sum(r["cost"] for r in results) / count,
+        "avg_throttle_time": sum(r.get("throttle_time", 0.0) for r in results) / count,
+        "avg_connect_time": sum(r.get("connect_time", 0.0) for r in results) / count,
+        "avg_ttft": (sum(ttfts) / len(ttfts)) if ttfts else None,
+        "quality_scores": [r["quality"] for r in results],
+        "cache_hits": sum(1 for r in results if r.get("cached")),
+        "prompt_cache_hit_ratio": prompt_cache_hit_ratio(results)
+    }
+
 
 class PromptEvaluator:
-    def __init__(self, provider: str = "anthropic", api_key: Optional[str] = None, 
+    def __init__(self, provider: str = "anthropic", api_key: Optional[str] = None,
                  model: Optional[str] = None, openai_api_key: Optional[str] = None,
-                 openrouter_api_key: Optional[str] = None):
+                 openrouter_api_key: Optional[str] = None,
+                 cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 max_retries: int = 5,
+                 stream: bool = False,
+                 base_url: Optional[str] = None,
+                 prompt_caching: bool = True,
+                 transport: Optional[TransportConfig] = None,
+                 telemetry: Optional[Telemetry] = None):
         """
         Initialize the evaluator with specified provider.
-        
+
         Args:
             provider: API provider ('anthropic', 'openai', or 'openrouter')
             api_key: Anthropic API key (for backward compatibility)
             model: Model name to use
             openai_api_key: OpenAI API key
             openrouter_api_key: OpenRouter API key
+            cache: Optional response cache consulted before every API call
+            rate_limiter: Limiter shared by all calls (defaults to the per-provider limiter)
+            max_retries: Retries after 429, overload, 5xx or connection errors
+            stream: Stream generations to measure time to first token and decode rate
+            base_url: Optional API base URL overriding the provider default (e.g. a local stub server)
+            prompt_caching: Mark the static template prefix for provider prompt caching
+            transport: Connection-pool settings; evaluators with equal settings share a pool
+            telemetry: Spans and metrics sink (defaults to a no-op)
         """
         self.provider = provider.lower()
-        
+
         if self.provider == "anthropic":
             if not api_key:
                 raise ValueError("Anthropic API key required for provider 'anthropic'")
-            self.client = Anthropic(api_key=api_key)
-            self.model = model or "claude-sonnet-4-20250514"
-            self.input_token_price = 3.00 / 1_000_000
-            self.output_token_price = 15.00 / 1_000_000
-            
+            self._api_key = api_key
+
         elif self.provider == "openai":
             if not openai_api_key:
                 raise ValueError("OpenAI API key required for provider 'openai'")
-            self.client = OpenAI(api_key=openai_api_key)
-            self.model = model or "gpt-4o"
-            self.input_token_price = 2.50 / 1_000_000
-            self.output_token_price = 10.00 / 1_000_000
-            
+            self._api_key = openai_api_key
+
         elif self.provider == "openrouter":
             if not openrouter_api_key:
                 raise ValueError("OpenRouter API key required for provider 'openrouter'")
-            self.client = OpenAI(
-                api_key=openrouter_api_key,
-                base_url="https://openrouter.ai/api/v1"
-            )
-            self.model = model or "openai/gpt-4o"
-            self.input_token_price = 2.50 / 1_000_000
-            self.output_token_price = 10.00 / 1_000_000
-            
+            self._api_key = openrouter_api_key
+
         else:
             raise ValueError(f"Unsupported provider: {provider}. Use 'anthropic', 'openai', or 'openrouter'")
-    
-    def execute_prompt(self, prompt_template: str, input_text: str) -> Dict[str, Any]:
+
+        self.model = model or DEFAULT_MODELS[self.provider]
+        pricing = get_pricing(self.provider, self.model)
+        self.input_token_price = pricing["input"]
+        self.output_token_price = pricing["output"]
+        self.cache_read_token_price = pricing["cache_read"]
+        self.cache_write_token_price = pricing["cache_write"]
+        self.prompt_caching = prompt_caching
+        self.transport = transport or DEFAULT_TRANSPORT
+        self.telemetry = telemetry or NULL_TELEMETRY
+        self.cache = cache
+        self.rate_limiter = rate_limiter or get_rate_limiter(self.provider)
+        self.max_retries = max_retries
+        self.stream = stream
+        self.base_url = base_url or (OPENROUTER_BASE_URL if self.provider == "openrouter" else None)
+        self.call_count = 0
+        self.client = self._create_client(asynchronous=False)
+        self._async_client = None
+        self._async_client_loop = None
+
+    def _create_client(self, asynchronous: bool):
         """
-        Execute a prompt with given input and measure metrics.
-        
+        Build a sync or async SDK client for the configured provider.
+
+        SDK-level retries are disabled; _call/_acall retry through the rate
+        limiter so backoff time is accounted as throttling. The HTTP
+        connection pool is shared with every other evaluator that uses the
+        same transport settings.
+        """
+        sdk = provider_sdk(self.provider)
+        if self.provider == "anthropic":
+            client_cls = sdk.AsyncAnthropic if asynchronous else sdk.Anthropic
+        else:
+            client_cls = sdk.AsyncOpenAI if asynchronous else sdk.OpenAI
+        http_client = get_async_http_client(self.transport) if asynchronous else get_http_client(self.transport)
+        return client_cls(api_key=self._api_key, base_url=self.base_url, max_retries=0, http_client=http_client)
+
+    async def awarm_up(self, connections: int) -> Dict[str, Any]:
+        """
+        Open keep-alive connections to the provider before timed calls start.
+
         Args:
-            prompt_template: Prompt template with {input} placeholder
-            input_text: Input text to substitute
-        
+            connections: Connections to open (capped by the pool's keep-alive limit)
+
         Returns:
-            Dictionary with response, time, tokens, and cost
+            Dictionary with the number of connections and the seconds spent
         """
-        prompt = prompt_template.replace("{input}", input_text)
-        
-        start_time = time.time()
-        
+        return await warm_up(
+            get_async_http_client(self.transport),
+            str(self.async_client.base_url),
+            min(connections, self.transport.max_keepalive_connections),
+            http2=self.transport.http2
+        )
+
+    @property
+    def async_client(self):
+        """Async SDK client bound to the currently running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = self._create_client(asynchronous=True)
+            self._async_client_loop = loop
+        return self._async_client
+
+    def _request_params(self, prompt: str, max_tokens: int, cache_prefix: str = "") -> Dict[str, Any]:
+        """
+        Build the keyword arguments shared by both provider APIs.
+
+        With prompt caching on, an Anthropic prompt that starts with
+        ``cache_prefix`` is sent as two content blocks, the prefix carrying a
+        ``cache_control`` breakpoint so later calls read it from the cache.
+        OpenAI caches repeated prefixes automatically, so its requests are
+        unchanged. Either way caching only applies once the prefix reaches
+        the provider minimum (1024 tokens for most models).
+        """
+        content: Any = prompt
+        if (self.prompt_caching and self.provider == "anthropic" and cache_prefix
+                and prompt.startswith(cache_prefix)):
+            content = [{"type": "text", "text": cache_prefix, "cache_control": {"type": "ephemeral"}}]
+            if len(prompt) > len(cache_prefix):
+                content.append({"type": "text", "text": prompt[len(cache_prefix):]})
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [
+                {"role": "user", "content": content}
+            ]
+        }
+
+    def _raw_endpoint(self, client):
+        """Completion endpoint that exposes response headers alongside the parsed body."""
         if self.provider == "anthropic":
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            response_text = message.content[0].text
-            input_tokens = message.usage.input_tokens
-            output_tokens = message.usage.output_tokens
-            
+            return client.messages.with_raw_response
+        return client.chat.completions.with_raw_response
+
+    @staticmethod
+    def _estimate_tokens(params: Dict[str, Any]) -> int:
+        """Rough token reservation for the limiter: ~4 characters per input token plus max output."""
+        prompt_chars = 0
+        for message in params["messages"]:
+            content = message["content"]
+            if isinstance(content, str):
+                prompt_chars += len(content)
+            else:
+                prompt_chars += sum(len(block["text"]) for block in content)
+        return prompt_chars // 4 + params["max_tokens"]
+
+    def _record_failure(self, error: Exception, attempt: int, sent_at: float) -> float:
+        """
+        Register a retryable failure and return the seconds to back off before retrying.
+
+        429s and overload responses slow the shared limiter down (honouring
+        Retry-After), which the next acquire waits out; server errors and
+        dropped connections only back this request off.
+        """
+        self.telemetry.count("neo_api_calls_total", provider=self.provider, outcome="retry")
+        self.telemetry.count("neo_api_errors_total", provider=self.provider, error=type(error).__name__)
+        if not is_congestion(self.provider, error):
+            return backoff_seconds(attempt)
+        response = getattr(error, "response", None)
+        headers = response.headers if response is not None else None
+        self.rate_limiter.record_rate_limited(retry_after_seconds(headers), attempt, sent_at=sent_at)
+        return 0.0
+
+    def _stream_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Request arguments for a streamed completion that still reports usage."""
+        streamed = dict(params, stream=True)
+        if self.provider != "anthropic":
+            streamed["stream_options"] = {"include_usage": True}
+        return streamed
+
+    def _stream_endpoint(self, client):
+        if self.provider == "anthropic":
+            return client.messages
+        return client.chat.completions
+
+    def _read_stream_event(self, event, accumulator: Dict[str, Any]) -> Optional[str]:
+        """Fold one streamed event into ``accumulator``; return any new text."""
+        if self.provider == "anthropic":
+            if event.type == "message_start":
+                accumulator["usage"] = self._parse_usage(event.message)
+            elif event.type == "message_delta":
+                accumulator["usage"]["output_tokens"] = event.usage.output_tokens
+            elif event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                return event.delta.text
+            return None
+
+        if getattr(event, "usage", None) is not None:
+            accumulator["usage"] = self._parse_usage(event)
+        if event.choices and event.choices[0].delta.content:
+            return event.choices[0].delta.content
+        return None
+
+    @staticmethod
+    def _new_stream_accumulator() -> Dict[str, Any]:
+        return {"chunks": [], "usage": {"input_tokens": 0, "output_tokens": 0,
+                                        "cache_read_tokens": 0, "cache_write_tokens": 0}, "ttft": None}
+
+    def _finish_stream(self, accumulator: Dict[str, Any], start_time: float) -> Tuple[str, Usage, Dict[str, float]]:
+        timings = {"time": time.perf_counter() - start_time, "ttft": accumulator["ttft"]}
+        return "".join(accumulator["chunks"]), accumulator["usage"], timings
+
+    def _consume_stream(self, stream, start_time: float) -> Tuple[str, Usage, Dict[str, float]]:
+        """Drain a streamed completion, recording time to first token on a monotonic clock."""
+        accumulator = self._new_stream_accumulator()
+        for event in stream:
+            text = self._read_stream_event(event, accumulator)
+            if text:
+                if accumulator["ttft"] is None:
+                    accumulator["ttft"] = time.perf_counter() - start_time
+                accumulator["chunks"].append(text)
+        return self._finish_stream(accumulator, start_time)
+
+    async def _aconsume_stream(self, stream, start_time: float) -> Tuple[str, Usage, Dict[str, float]]:
+        """Async counterpart of _consume_stream."""
+        accumulator = self._new_stream_accumulator()
+        async for event in stream:
+            text = self._read_stream_event(event, accumulator)
+            if text:
+                if accumulator["ttft"] is None:
+                    accumulator["ttft"] = time.perf_counter() - start_time
+                accumulator["chunks"].append(text)
+        return self._finish_stream(accumulator, start_time)
+
+    def _call(self, params: Dict[str, Any], stream: bool = False) -> Tuple[str, Usage, Dict[str, float]]:
+        """
+        Perform one rate-limited completion request with retries.
+
+        Timing uses a monotonic clock. ``time`` covers only the successful
+        attempt; limiter waits, backoff and failed attempts are reported as
+        ``throttle_time``. TCP connect and TLS handshake time of the
+        successful attempt is reported as ``connect_time`` and excluded from
+        ``time`` (and ``ttft``), so latency reflects the model rather than
+        socket setup. Streamed calls also report ``ttft``.
+
+        Returns:
+            Tuple of (text, usage, timings)
+        """
+        estimated_tokens = self._estimate_tokens(params)
+        throttle_time = 0.0
+
+        for attempt in range(self.max_retries + 1):
+            throttle_time += self.rate_limiter.acquire_sync(estimated_tokens)
+            self._count_calls(1)
+            sent_at = time.monotonic()
+            start_time = time.perf_counter()
+            try:
+                with measure_connect_time() as connection:
+                    if stream:
+                        response_stream = self._stream_endpoint(self.client).create(**self._stream_params(params))
+                        headers = response_stream.response.headers
+                        text, usage, timings = self._consume_stream(response_stream, start_time)
+                    else:
+                        raw_response = self._raw_endpoint(self.client).create(**params)
+                        headers = raw_response.headers
+                        timings = {"time": time.perf_counter() - start_time}
+                        text, usage = self._parse_completion(raw_response.parse())
+            except retryable_errors(self.provider) as error:
+                throttle_time += time.perf_counter() - start_time
+                if attempt == self.max_retries:
+                    self._record_final_failure(error, throttle_time)
+                    raise
+                backoff = self._record_failure(error, attempt, sent_at)
+                time.sleep(backoff)
+                throttle_time += backoff
+                continue
+
+            self.rate_limiter.record_success(headers, estimated_tokens, usage["input_tokens"] + usage["output_tokens"])
+            timings["throttle_time"] = throttle_time
+            timings = self._exclude_connect_time(timings, connection["connect_time"])
+            self._record_call(usage, timings)
+            return text, usage, timings
+
+    async def _acall(self, params: Dict[str, Any], stream: bool = False) -> Tuple[str, Usage, Dict[str, float]]:
+        """Async counterpart of _call using the provider's async client."""
+        estimated_tokens = self._estimate_tokens(params)
+        throttle_time = 0.0
+
+        for attempt in range(self.max_retries + 1):
+            throttle_time += await self.rate_limiter.acquire(estimated_tokens)
+            self._count_calls(1)
+            sent_at = time.monotonic()
+            start_time = time.perf_counter()
+            try:
+                with measure_connect_time() as connection:
+                    if stream:
+                        response_stream = await self._stream_endpoint(self.async_client).create(
+                            **self._stream_params(params)
+                        )
+                        headers = response_stream.response.headers
+                        text, usage, timings = await self._aconsume_stream(response_stream, start_time)
+                    else:
+                        raw_response = await self._raw_endpoint(self.async_client).create(**params)
+                        headers = raw_response.headers
+                        timings = {"time": time.perf_counter() - start_time}
+                        text, usage = self._parse_completion(raw_response.parse())
+            except retryable_errors(self.provider) as error:
+                throttle_time += time.perf_counter() - start_time
+                if attempt == self.max_retries:
+                    self._record_final_failure(error, throttle_time)
+                    raise
+                backoff = self._record_failure(error, attempt, sent_at)
+                await asyncio.sleep(backoff)
+                throttle_time += backoff
+                continue
+
+            self.rate_limiter.record_success(headers, estimated_tokens, usage["input_tokens"] + usage["output_tokens"])
+            timings["throttle_time"] = throttle_time
+            timings = self._exclude_connect_time(timings, connection["connect_time"])
+            self._record_call(usage, timings)
+            return text, usage, timings
+
+    def _count_calls(self, calls: int) -> None:
+        """Count requests on this evaluator and on the evaluation that sent them."""
+        self.call_count += calls
+        counter = CURRENT_CALLS.get()
+        if counter is not None:
+            counter.calls += calls
+
+    def _record_call(self, usage: Usage, timings: Dict[str, float]) -> None:
+        """Count a successful request's latency, tokens, cost and throttling."""
+        telemetry = self.telemetry
+        if not telemetry.enabled:
+            return
+        cost = self._call_cost(usage)
+        telemetry.count("neo_api_calls_total", provider=self.provider, outcome="success")
+        for kind in ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens"):
+            if usage.get(kind):
+                telemetry.count("neo_tokens_total", usage[kind], provider=self.provider, model=self.model,
+                                kind=kind[:-len("_tokens")])
+        telemetry.count("neo_cost_usd_total", cost, provider=self.provider, model=self.model)
+        telemetry.count("neo_throttle_seconds_total", timings["throttle_time"], provider=self.provider)
+        telemetry.observe("neo_call_latency_seconds", timings["time"], provider=self.provider)
+        telemetry.observe("neo_call_tokens", usage["input_tokens"] + usage["output_tokens"],
+                          buckets=TOKEN_BUCKETS, provider=self.provider)
+        telemetry.observe("neo_call_cost_usd", cost, buckets=COST_BUCKETS, provider=self.provider)
+
+    def _record_final_failure(self, error: Exception, throttle_time: float) -> None:
+        """Count a request that failed after its last retry."""
+        self.telemetry.count("neo_api_calls_total", provider=self.provider, outcome="error")
+        self.telemetry.count("neo_api_errors_total", provider=self.provider, error=type(error).__name__)
+        self.telemetry.count("neo_throttle_seconds_total", throttle_time, provider=self.provider)
+
+    @staticmethod
+    def _exclude_connect_time(timings: Dict[str, float], connect_time: float) -> Dict[str, float]:
+        """Move connection setup out of the measured latencies into ``connect_time``."""
+        timings["time"] = max(0.0, timings["time"] - connect_time)
+        if timings.get("ttft") is not None:
+            timings["ttft"] = max(0.0, timings["ttft"] - connect_time)
+        timings["connect_time"] = connect_time
+        return timings
+
+    def _parse_usage(self, completion) -> Usage:
+        """
+        Extract token usage from a provider response.
+
+        ``input_tokens`` always counts the whole prompt. Anthropic reports
+        cache reads and writes separately from its uncached ``input_tokens``,
+        so they are added back; OpenAI's ``prompt_tokens`` already include
+        ``cached_tokens``.
+        """
+        usage = completion.usage
+        if self.provider == "anthropic":
+            cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+            cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+            return {
+                "input_tokens": usage.input_tokens + cache_read + cache_write,
+                "output_tokens": usage.output_tokens,
+                "cache_read_tokens": cache_read,
+                "cache_write_tokens": cache_write
+            }
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "input_tokens": usage.prompt_tokens,
+            "output_tokens": usage.completion_tokens,
+            "cache_read_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0,
+            "cache_write_tokens": 0
+        }
+
+    def _parse_completion(self, completion) -> Tuple[str, Usage]:
+        """Extract (text, usage) from a provider response."""
+        if self.provider == "anthropic":
+            text = completion.content[0].text if completion.content else ""
         else:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            response_text = response.choices[0].message.content
-            input_tokens = response.usage.prompt_tokens
-            output_tokens = response.usage.completion_tokens
-        
-        end_time = time.time()
-        response_time = end_time - start_time
-        
+            text = (completion.choices[0].message.content or "") if completion.choices else ""
+        return text, self._parse_usage(completion)
+
+    def _call_cost(self, usage: Usage) -> float:
+        """Price one call, billing prompt-cache reads and writes at their own rates."""
+        uncached_tokens = usage["input_tokens"] - usage["cache_read_tokens"] - usage["cache_write_tokens"]
+        return (uncached_tokens * self.input_token_price
+                + usage["cache_read_tokens"] * self.cache_read_token_price
+                + usage["cache_write_tokens"] * self.cache_write_token_price
+                + usage["output_tokens"] * self.output_token_price)
+
+    def _build_result(self, response_text: str, usage: Usage, timings: Dict[str, float],
+                      price_factor: float = 1.0) -> Dict[str, Any]:
+        """
+        Assemble the per-call metrics dictionary.
+
+        ``tokens_per_sec`` is the decode rate: output tokens over the time
+        after the first token when streamed, over the whole call otherwise.
+        ``price_factor`` scales the cost (e.g. the batch API discount).
+        """
+        input_tokens = usage["input_tokens"]
+        output_tokens = usage["output_tokens"]
         total_tokens = input_tokens + output_tokens
-        cost = (input_tokens * self.input_token_price) + (output_tokens * self.output_token_price)
-        
-        return {
+        cost = self._call_cost(usage) * price_factor
+        ttft = timings.get("ttft")
+        decode_time = timings["time"] - (ttft or 0.0)
+
+        result = {
             "response": response_text,
-            "time": response_time,
+            "time": timings["time"],
             "input_tokens": input_tokens,
             "output_tokens": output_tokens,
             "total_tokens": total_tokens,
-            "cost": cost
+            "cache_read_tokens": usage["cache_read_tokens"],
+            "cache_write_tokens": usage["cache_write_tokens"],
+            "cost": cost,
+            "tokens_per_sec": output_tokens / decode_time if decode_time > 0 else 0.0
         }
-    
+        if ttft is not None:
+            result["ttft"] = ttft
+        if "connect_time" in timings:
+            result["connect_time"] = timings["connect_time"]
+        return result
+
+    def _cache_lookup(self, kind: str, prompt: str,
+                      max_tokens: int) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Return (cache_key, cached_value); both are None when caching is disabled."""
+        if self.cache is None:
+            return None, None
+        key = ResponseCache.make_key(kind, self.provider, self.model, prompt, max_tokens)
+        value = self.cache.get(key)
+        if value is not None:
+            self.telemetry.count("neo_cache_hits_total", kind=kind)
+            self._charge(kind, None, prompt, max_tokens)
+        return key, value
+
+    def _charge(self, kind: str, usage: Optional[Usage], prompt: str, max_tokens: int) -> None:
+        """
+        Charge a finished call (None for a cache hit) to the budget of the running evaluation, if any,
+        and give back the worst-case cost reserved for it.
+        """
+        budget = CURRENT_BUDGET.get()
+        if budget is None:
+            return
+        budget.charge(kind, self._call_cost(usage) if usage else 0.0)
+        reservation = CURRENT_RESERVATION.get()
+        if reservation is not None:
+            reservation.release(self._worst_case_cost(prompt, max_tokens, budget.margin))
+
+    def _worst_case_cost(self, prompt: str, max_tokens: int, margin: float, extra_input_tokens: int = 0) -> float:
+        """
+        Largest USD a call can cost: every counted input token (plus ``margin`` for tokenizer
+        differences) at the dearest input rate, and all ``max_tokens`` at the output rate.
+        """
+        from cost_estimator import count_tokens
+
+        input_tokens = (count_tokens(prompt, self.model) + extra_input_tokens) * (1 + margin)
+        return (input_tokens * max(self.input_token_price, self.cache_write_token_price)
+                + max_tokens * self.output_token_price)
+
+    def _group_worst_case(self, group: List[Tuple[int, Dict[str, str]]], prompt_a: str, prompt_b: str,
+                          judge_batch: int, margin: float) -> float:
+        """
+        Largest USD evaluating ``group`` can cost.
+
+        Unseen responses are assumed to use all GENERATION_MAX_TOKENS in the
+        judge prompts. A listwise-judged group also reserves the per-response
+        judge calls it falls back to when the reply cannot be parsed.
+        """
+        inputs = [test_case["input"] for _, test_case in group]
+        worst = sum(self._worst_case_cost(template.replace("{input}", input_text), GENERATION_MAX_TOKENS, margin)
+                    for input_text in inputs for template in (prompt_a, prompt_b))
+        single_judges = sum(2 * self._worst_case_cost(JUDGE_PROMPT_TEMPLATE.format(input=input_text, response=""),
+                                                      JUDGE_MAX_TOKENS, margin, GENERATION_MAX_TOKENS)
+                            for input_text in inputs)
+        if not judge_batch:
+            return worst + single_judges
+        items = [(input_text, "") for input_text in inputs for _ in (prompt_a, prompt_b)]
+        batch_judge = self._worst_case_cost(self._render_batch_judge_prompt(items),
+                                            self._batch_judge_max_tokens(len(items)), margin,
+                                            GENERATION_MAX_TOKENS * len(items))
+        return worst + batch_judge + single_judges
+
+    def _cache_store(self, key: Optional[str], value: Dict[str, Any]) -> None:
+        """Persist a fresh response when caching is enabled."""
+        if key is not None:
+            self.cache.put(key, value)
+
+    @staticmethod
+    def _cached_result(cached: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Mark a cache hit.
+
+        The originally measured time and cost are kept so averages stay
+        comparable with uncached runs; ``cached`` lets reports tell them apart.
+        """
+        result = dict(cached)
+        result["cached"] = True
+        return result
+
+    @staticmethod
+    def _parse_score(score_text: str) -> float:
+        """Convert the judge's reply into a score clamped to 1-10."""
+        score = float(score_text.strip())
+        return max(1.0, min(10.0, score))
+
+    @staticmethod
+    def _render_batch_judge_prompt(items: List[Tuple[str, str]]) -> str:
+        """Render the listwise judge prompt for (input, response) pairs."""
+        rendered_items = "\n".join(
+            BATCH_JUDGE_ITEM_TEMPLATE.format(id=item_id, input=input_text, response=response)
+            for item_id, (input_text, response) in enumerate(items, start=1)
+        )
+        return BATCH_JUDGE_PROMPT_TEMPLATE.format(items=rendered_items)
+
+    @staticmethod
+    def _batch_judge_max_tokens(count: int) -> int:
+        """Output budget for a listwise judge reply covering ``count`` items."""
+        return 32 + 16 * count
+
+    @staticmethod
+    def _parse_batch_scores(reply: str, count: int) -> List[float]:
+        """
+        Parse a listwise judge reply into one clamped score per item.
+
+        Accepts ``{"scores": [{"id": 1, "score": 7}, ...]}``, a bare list of
+        such objects, or a bare list of numbers, optionally wrapped in prose
+        or a Markdown code fence.
+
+        Raises:
+            ValueError: If the reply does not contain exactly one numeric score per item
+        """
+        match = re.search(r"[\[{].*[\]}]", reply, re.DOTALL)
+        if match is None:
+            raise ValueError("No JSON found in judge reply")
+        parsed = json.loads(match.group(0))
+
+        entries = parsed.get("scores") if isinstance(parsed, dict) else parsed
+        if not isinstance(entries, list) or len(entries) != count:
+            raise ValueError(f"Expected {count} scores in judge reply")
+
+        scores: Dict[int, float] = {}
+        for position, entry in enumerate(entries, start=1):
+            if isinstance(entry, dict):
+                item_id, value = int(entry["id"]), entry["score"]
+            else:
+                item_id, value = position, entry
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError(f"Invalid score for item {item_id}")
+            scores[item_id] = max(1.0, min(10.0, float(value)))
+
+        if sorted(scores) != list(range(1, count + 1)):
+            raise ValueError("Judge reply item ids do not match the request")
+        return [scores[item_id] for item_id in range(1, count + 1)]
+
+    def execute_prompt(self, prompt_template: str, input_text: str) -> Dict[str, Any]:
+        """
+        Execute a prompt with given input and measure metrics.
+
+        Args:
+            prompt_template: Prompt template with {input} placeholder
+            input_text: Input text to substitute
+
+        Returns:
+            Dictionary with response, time, tokens, and cost
+        """
+        prompt = prompt_template.replace("{input}", input_text)
+        cache_key, cached = self._cache_lookup("generation", prompt, GENERATION_MAX_TOKENS)
+        if cached is not None:
+            return self._cached_result(cached)
+
+        params = self._request_params(prompt, max_tokens=GENERATION_MAX_TOKENS, cache_prefix=template_prefix(prompt_template))
+        with self.telemetry.span("generate", provider=self.provider, model=self.model):
+            response_text, usage, timings = self._call(params, stream=self.stream)
+        self._charge("generation", usage, prompt, GENERATION_MAX_TOKENS)
+
+        result = self._build_result(response_text, usage, timings)
+        self._cache_store(cache_key, result)
+        result["throttle_time"] = timings["throttle_time"]
+        result["cached"] = False
+        return result
+
+    async def aexecute_prompt(self, prompt_template: str, input_text: str) -> Dict[str, Any]:
+        """
+        Async counterpart of execute_prompt using the provider's async client.
+
+        Args:
+            prompt_template: Prompt template with {input} placeholder
+            input_text: Input text to substitute
+
+        Returns:
+            Dictionary with response, time, tokens, and cost
+        """
+        prompt = prompt_template.replace("{input}", input_text)
+        cache_key, cached = self._cache_lookup("generation", prompt, GENERATION_MAX_TOKENS)
+        if cached is not None:
+            return self._cached_result(cached)
+
+        params = self._request_params(prompt, max_tokens=GENERATION_MAX_TOKENS, cache_prefix=template_prefix(prompt_template))
+        with self.telemetry.span("generate", provider=self.provider, model=self.model):
+            response_text, usage, timings = await self._acall(params, stream=self.stream)
+        self._charge("generation", usage, prompt, GENERATION_MAX_TOKENS)
+
+        result = self._build_result(response_text, usage, timings)
+        self._cache_store(cache_key, result)
+        result["throttle_time"] = timings["throttle_time"]
+        result["cached"] = False
+        return result
+
     def judge_quality(self, input_text: str, response: str) -> float:
         """
         Use LLM to judge the quality of a response on a 1-10 scale.
-        
+
         Args:
             input_text: Original input/question
             response: Response to evaluate
-        
+
         Returns:
             Quality score from 1-10
         """
-        judge_prompt = f"""You are an expert evaluator. Rate the following response on a scale of 1-10 based on:
-- Relevance to the input
-- Completeness
-- Clarity
-- Accuracy
-- Usefulness
+        judge_prompt = JUDGE_PROMPT_TEMPLATE.format(input=input_text, response=response)
+        cache_key, cached = self._cache_lookup("judge", judge_prompt, JUDGE_MAX_TOKENS)
+        if cached is not None:
+            return cached["score"]
 
-Input: {input_text}
+        params = self._request_params(judge_prompt, max_tokens=JUDGE_MAX_TOKENS, cache_prefix=JUDGE_PROMPT_PREFIX)
 
-Response: {response}
+        with self.telemetry.span("judge", provider=self.provider, model=self.model):
+            reply, usage, _ = self._call(params)
+        self._charge("judge", usage, judge_prompt, JUDGE_MAX_TOKENS)
+        try:
+            score = self._parse_score(reply)
+        except (ValueError, IndexError, AttributeError):
+            self.telemetry.count("neo_judge_parse_fallbacks_total", mode="single")
+            return 5.0
 
-Provide ONLY a single number between 1 and 10 as your rating. Do not include any other text."""
+        self._cache_store(cache_key, {"score": score})
+        return score
+
+    async def ajudge_quality(self, input_text: str, response: str) -> float:
+        """
+        Async counterpart of judge_quality using the provider's async client.
 
+        Args:
+            input_text: Original input/question
+            response: Response to evaluate
+
+        Returns:
+            Quality score from 1-10
+        """
+        judge_prompt = JUDGE_PROMPT_TEMPLATE.format(input=input_text, response=response)
+        cache_key, cached = self._cache_lookup("judge", judge_prompt, JUDGE_MAX_TOKENS)
+        if cached is not None:
+            return cached["score"]
+
+        params = self._request_params(judge_prompt, max_tokens=JUDGE_MAX_TOKENS, cache_prefix=JUDGE_PROMPT_PREFIX)
+
+        with self.telemetry.span("judge", provider=self.provider, model=self.model):
+            reply, usage, _ = await self._acall(params)
+        self._charge("judge", usage, judge_prompt, JUDGE_MAX_TOKENS)
         try:
-            if self.provider == "anthropic":
-                message = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=10,
-                    messages=[
-                        {"role": "user", "content": judge_prompt}
-                    ]
-                )
-                score_text = message.content[0].text.strip()
-            else:
-                response_obj = self.client.chat.completions.create(
-                    model=self.model,
-                    max_tokens=10,
-                    messages=[
-                        {"role": "user", "content": judge_prompt}
-                    ]
-                )
-                score_text = response_obj.choices[0].message.content.strip()
-            
-            score = float(score_text)
-            score = max(1.0, min(10.0, score))
-            return score
+            score = self._parse_score(reply)
         except (ValueError, IndexError, AttributeError):
+            self.telemetry.count("neo_judge_parse_fallbacks_total", mode="single")
             return 5.0
-    
-    def evaluate_prompts(self, prompt_a: str, prompt_b: str, 
-                        dataset: List[Dict[str, str]], 
-                        progress_callback=None) -> Dict[str, Any]:
+
+        self._cache_store(cache_key, {"score": score})
+        return score
+
+    def judge_quality_batch(self, items: List[Tuple[str, str]]) -> List[float]:
+        """
+        Judge several responses with a single listwise LLM call.
+
+        Falls back to one judge_quality call per item when the reply cannot
+        be parsed into exactly one score per item.
+
+        Args:
+            items: List of (input_text, response) pairs
+
+        Returns:
+            Quality scores from 1-10, in the order of ``items``
+        """
+        if len(items) == 1:
+            return [self.judge_quality(*items[0])]
+
+        judge_prompt = self._render_batch_judge_prompt(items)
+        max_tokens = self._batch_judge_max_tokens(len(items))
+        cache_key, cached = self._cache_lookup("judge_batch", judge_prompt, max_tokens)
+        if cached is not None:
+            return cached["scores"]
+
+        params = self._request_params(judge_prompt, max_tokens=max_tokens, cache_prefix=BATCH_JUDGE_PROMPT_PREFIX)
+
+        with self.telemetry.span("judge", provider=self.provider, model=self.model, items=len(items)):
+            reply, usage, _ = self._call(params)
+        self._charge("judge_batch", usage, judge_prompt, max_tokens)
+        try:
+            scores = self._parse_batch_scores(reply, len(items))
+        except (ValueError, KeyError, TypeError, IndexError, AttributeError):
+            self.telemetry.count("neo_judge_parse_fallbacks_total", mode="batch")
+            return [self.judge_quality(input_text, response) for input_text, response in items]
+
+        self._cache_store(cache_key, {"scores": scores})
+        return scores
+
+    async def ajudge_quality_batch(self, items: List[Tuple[str, str]]) -> List[float]:
+        """
+        Async counterpart of judge_quality_batch using the provider's async client.
+
+        The per-item fallback runs sequentially so it never uses more than the
+        single concurrency slot held by the caller.
+
+        Args:
+            items: List of (input_text, response) pairs
+
+        Returns:
+            Quality scores from 1-10, in the order of ``items``
+        """
+        if len(items) == 1:
+            return [await self.ajudge_quality(*items[0])]
+
+        judge_prompt = self._render_batch_judge_prompt(items)
+        max_tokens = self._batch_judge_max_tokens(len(items))
+        cache_key, cached = self._cache_lookup("judge_batch", judge_prompt, max_tokens)
+        if cached is not None:
+            return cached["scores"]
+
+        params = self._request_params(judge_prompt, max_tokens=max_tokens, cache_prefix=BATCH_JUDGE_PROMPT_PREFIX)
+
+        with self.telemetry.span("judge", provider=self.provider, model=self.model, items=len(items)):
+            reply, usage, _ = await self._acall(params)
+        self._charge("judge_batch", usage, judge_prompt, max_tokens)
+        try:
+            scores = self._parse_batch_scores(reply, len(items))
+        except (ValueError, KeyError, TypeError, IndexError, AttributeError):
+            self.telemetry.count("neo_judge_parse_fallbacks_total", mode="batch")
+            return [await self.ajudge_quality(input_text, response) for input_text, response in items]
+
+        self._cache_store(cache_key, {"scores": scores})
+        return scores
+
+    async def evaluate_response(self, prompt_template: str, input_text: str,
+                                semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """
+        Generate and judge one response.
+
+        Args:
+            prompt_template: Prompt template with an {input} placeholder
+            input_text: Input of the test case
+            semaphore: Limits the API calls in flight; each call holds one slot
+
+        Returns:
+            Result dictionary of the generation with its ``quality`` score and ``input``
+        """
+        async with semaphore:
+            result = await self.aexecute_prompt(prompt_template, input_text)
+        async with semaphore:
+            result["quality"] = await self.ajudge_quality(input_text, result["response"])
+        result["input"] = input_text
+        return result
+
+    async def evaluate_case(self, idx: int, prompt_a: str, prompt_b: str, input_text: str,
+                            semaphore: asyncio.Semaphore) -> Tuple[int, Dict[str, Any], Dict[str, Any]]:
+        """
+        Run the Prompt A and Prompt B pipelines for one test case side by side.
+
+        Args:
+            idx: Dataset index of the case (returned unchanged)
+            prompt_a: First prompt template
+            prompt_b: Second prompt template
+            input_text: Input of the test case
+            semaphore: Limits the API calls in flight; each call holds one slot
+
+        Returns:
+            Tuple of (idx, result A, result B)
+        """
+        with self.telemetry.span("case", case_index=idx):
+            result_a, result_b = await asyncio.gather(
+                self.evaluate_response(prompt_a, input_text, semaphore),
+                self.evaluate_response(prompt_b, input_text, semaphore)
+            )
+        return idx, result_a, result_b
+
+    async def _evaluate_group(self, group: List[Tuple[int, Dict[str, str]]], prompt_a: str, prompt_b: str,
+                              semaphore: asyncio.Semaphore,
+                              judge_batch: int) -> List[Tuple[int, Dict[str, Any], Dict[str, Any]]]:
+        """
+        Evaluate a group of test cases.
+
+        Without judge batching the group holds a single case judged per
+        response. Otherwise all A and B responses of the group are generated
+        concurrently and then scored together in one listwise judge call.
+        """
+        if not judge_batch:
+            idx, test_case = group[0]
+            return [await self.evaluate_case(idx, prompt_a, prompt_b, test_case["input"], semaphore)]
+
+        with self.telemetry.span("case_group", cases=len(group)):
+            async def generate(prompt_template: str, input_text: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.aexecute_prompt(prompt_template, input_text)
+
+            inputs = [test_case["input"] for _, test_case in group]
+            responses = await asyncio.gather(*(
+                generate(prompt_template, input_text)
+                for input_text in inputs
+                for prompt_template in (prompt_a, prompt_b)
+            ))
+
+            async with semaphore:
+                scores = await self.ajudge_quality_batch(
+                    [(inputs[position // 2], result["response"]) for position, result in enumerate(responses)]
+                )
+
+            evaluated = []
+            for position, (idx, _) in enumerate(group):
+                pair = responses[2 * position:2 * position + 2]
+                for result, score in zip(pair, scores[2 * position:2 * position + 2]):
+                    result["quality"] = score
+                    result["input"] = inputs[position]
+                evaluated.append((idx, pair[0], pair[1]))
+            return evaluated
+
+    async def evaluate_prompts_async(self, prompt_a: str, prompt_b: str,
+                                     dataset: Iterable[Dict[str, str]],
+                                     progress_callback: Optional[Callable[[int, int], None]] = None,
+                                     concurrency: int = 1,
+                                     judge_batch: int = 0,
+                                     max_cases: Optional[int] = None,
+                                     stopping_rule: Optional[StoppingRule] = None,
+                                     check_every: int = 20,
+                                     completed_results: Optional[Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]] = None,
+                                     on_case_complete: Optional[CaseCallback] = None,
+                                     total: Optional[int] = None,
+                                     semaphore: Optional[Any] = None,
+                                     budget: Optional[BudgetScheduler] = None) -> Dict[str, Any]:
+        """
+        Evaluate two prompts on a dataset with overlapping API calls.
+
+        At most ``concurrency`` API calls are in flight at once. Generation and
+        judging of different test cases overlap, but results keep dataset order.
+        Unless the transport disables it, up to ``concurrency`` connections are
+        opened before the first case so handshakes stay out of the timings.
+
+        When a ``stopping_rule`` is given it is applied to the quality scores
+        of the completed dataset prefix every ``check_every`` cases; once it
+        returns a reason no new cases are started, in-flight cases finish,
+        and the result carries an ``early_stopping`` summary.
+
+        Cases listed in ``completed_results`` (e.g. loaded from a run log)
+        are not re-evaluated; ``on_case_complete`` is called for every newly
+        finished case so it can be persisted immediately.
+
+        The dataset is consumed lazily, so it may be a generator; only the
+        cases currently in flight are held in memory.
+
+        With a ``budget`` every call is charged to it, each case (or judge
+        batch group) starts only if the budget admits it, and the scheduler
+        may switch to listwise judging to fit the plan. Once the budget
+        refuses a case no new cases start; if a limit is reached the cases
+        in flight are cancelled. The result carries a ``budget`` summary
+        marking whether the run was truncated.
+
+        Args:
+            prompt_a: First prompt template
+            prompt_b: Second prompt template
+            dataset: Test cases with 'input' field (any iterable)
+            progress_callback: Optional callback receiving (completed, total)
+            concurrency: Maximum number of concurrent API calls
+            judge_batch: Test cases scored per listwise judge call (0 judges each response separately)
+            max_cases: Optional cap on the number of cases evaluated
+            stopping_rule: Optional callable (scores_a, scores_b) -> stop reason or None
+            check_every: Cases between stopping-rule checks
+            completed_results: Already evaluated cases as {index: (result_a, result_b)}
+            on_case_complete: Optional callback receiving (index, result_a, result_b)
+            total: Number of cases when ``dataset`` has no len() (used for progress only)
+            semaphore: Optional limiter shared with other runs (anything usable with ``async with``);
+                defaults to a private Semaphore(concurrency)
+            budget: Optional cost and deadline limits enforced while the run progresses
+
+        Returns:
+            Dictionary with detailed results for both prompts
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if judge_batch < 0:
+            raise ValueError("judge_batch cannot be negative")
+        if check_every < 1:
+            raise ValueError("check_every must be at least 1")
+
+        if total is None and hasattr(dataset, "__len__"):
+            total = len(dataset)
+        total_tests = total
+        if max_cases is not None:
+            total_tests = max_cases if total_tests is None else min(total_tests, max_cases)
+
+        semaphore = semaphore or asyncio.Semaphore(concurrency)
+        completed: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = dict(completed_results or {})
+        resumed_cases = len(completed)
+        pending = set()
+        started_at: Dict[asyncio.Future, Tuple[float, int, int]] = {}
+        group_size = max(1, judge_batch)
+        group: List[Tuple[int, Dict[str, str]]] = []
+        calls = CallCounter()
+        stop_reason: Optional[str] = None
+        prefix_length = 0
+        checked_length = 0
+        cases_seen = 0
+
+        def check_stopping_rule() -> None:
+            nonlocal stop_reason, prefix_length, checked_length
+            while prefix_length in completed:
+                prefix_length += 1
+            if prefix_length - checked_length < check_every:
+                return
+            checked_length = prefix_length
+            prefix = [completed[idx] for idx in range(prefix_length)]
+            stop_reason = stopping_rule([pair[0]["quality"] for pair in prefix],
+                                        [pair[1]["quality"] for pair in prefix])
+
+        def collect(done) -> None:
+            for task in done:
+                started, cases, group_judge_batch = started_at.pop(task)
+                if budget is not None:
+                    budget.complete(cases, time.monotonic() - started, group_judge_batch)
+                for idx, result_a, result_b in task.result():
+                    completed[idx] = (result_a, result_b)
+                    if on_case_complete:
+                        on_case_complete(idx, result_a, result_b)
+                    if progress_callback:
+                        progress_callback(len(completed), total_tests)
+            if stopping_rule is not None and stop_reason is None:
+                check_stopping_rule()
+
+        async def wait_for_any() -> None:
+            nonlocal pending
+            timeout = budget.time_left() if budget is not None else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            collect(done)
+            if budget is not None and budget.hard_stop():
+                for task in pending:
+                    task.cancel()
+                pending = set()
+
+        def stopped() -> bool:
+            return stop_reason is not None or (budget is not None and budget.stop_reason is not None)
+
+        async def run_group(group: List[Tuple[int, Dict[str, str]]], group_judge_batch: int,
+                            reservation: Optional[Reservation]) -> List[Tuple[int, Dict[str, Any], Dict[str, Any]]]:
+            # Runs in its own task, so the reservation is only seen by this group's calls.
+            CURRENT_RESERVATION.set(reservation)
+            try:
+                return await self._evaluate_group(group, prompt_a, prompt_b, semaphore, group_judge_batch)
+            finally:
+                if reservation is not None:
+                    reservation.close()
+
+        async def submit(group: List[Tuple[int, Dict[str, str]]]) -> None:
+            if len(pending) >= concurrency:
+                await wait_for_any()
+            reservation = None
+            if budget is not None:
+                worst_case = self._group_worst_case(group, prompt_a, prompt_b, judge_batch, budget.margin)
+                while not stopped():
+                    reservation = budget.admit(len(group), judge_batch, worst_case)
+                    if reservation is not None:
+                        break
+                    if not pending:
+                        return
+                    await wait_for_any()
+            if not stopped():
+                task = asyncio.ensure_future(run_group(group, judge_batch, reservation))
+                started_at[task] = (time.monotonic(), len(group), judge_batch)
+                pending.add(task)
+
+        if budget is not None:
+            budget.start()
+        warm_up_summary = None
+        if self.transport.warm_up:
+            with self.telemetry.span("warm_up"):
+                warm_up_summary = await self.awarm_up(concurrency)
+
+        budget_token = CURRENT_BUDGET.set(budget)
+        calls_token = CURRENT_CALLS.set(calls)
+        with self.telemetry.span("evaluate", provider=self.provider, model=self.model):
+            try:
+                if progress_callback and resumed_cases:
+                    progress_callback(resumed_cases, total_tests)
+
+                for idx, test_case in itertools.islice(enumerate(dataset), total_tests):
+                    cases_seen = idx + 1
+                    if idx in completed:
+                        continue
+                    if budget is not None and not group:
+                        remaining = None if total_tests is None else total_tests - resumed_cases - budget.admitted_cases
+                        judge_batch = budget.judge_batch_for(judge_batch, remaining)
+                        group_size = max(1, judge_batch)
+                    group.append((idx, test_case))
+                    if len(group) == group_size:
+                        await submit(group)
+                        group = []
+                    if stopped():
+                        break
+                if group and not stopped():
+                    await submit(group)
+
+                while pending:
+                    await wait_for_any()
+            finally:
+                for task in pending:
+                    task.cancel()
+                CURRENT_BUDGET.reset(budget_token)
+                CURRENT_CALLS.reset(calls_token)
+
+        planned_cases = total_tests if stopped() else cases_seen
+        if stop_reason is None:
+            total_tests = cases_seen
+        elif total_tests is None:
+            total_tests = len(completed)
+
+        ordered = [completed[idx] for idx in sorted(completed)]
+
+        evaluation = {
+            "prompt_a": summarize_results([pair[0] for pair in ordered]),
+            "prompt_b": summarize_results([pair[1] for pair in ordered])
+        }
+        if warm_up_summary:
+            evaluation["warm_up"] = warm_up_summary
+
+        if budget is not None:
+            evaluation["budget"] = budget.summary(evaluated=len(ordered), planned=planned_cases)
+
+        if stopping_rule is not None or max_cases is not None:
+            calls_made = calls.calls
+            evaluated_now = len(ordered) - resumed_cases
+            calls_per_case = calls_made / evaluated_now if evaluated_now else 0.0
+            evaluation["early_stopping"] = {
+                "stopped_early": stop_reason is not None,
+                "reason": stop_reason,
+                "stopping_point": len(ordered),
+                "planned_cases": total_tests,
+                "calls_made": calls_made,
+                "calls_saved": round(calls_per_case * (total_tests - len(ordered)))
+            }
+
+        return evaluation
+
+    def evaluate_prompts(self, prompt_a: str, prompt_b: str,
+                        dataset: List[Dict[str, str]],
+                        progress_callback=None,
+                        concurrency: int = 1,
+                        judge_batch: int = 0,
+                        max_cases: Optional[int] = None,
+                        stopping_rule: Optional[StoppingRule] = None,
+                        check_every: int = 20,
+                        completed_results: Optional[Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]] = None,
+                        on_case_complete: Optional[CaseCallback] = None,
+                        total: Optional[int] = None,
+                        budget: Optional[BudgetScheduler] = None) -> Dict[str, Any]:
         """
         Evaluate two prompts on a dataset.
-        
+
         Args:
             prompt_a: First prompt template
             prompt_b: Second prompt template
-            dataset: List of test cases with 'input' field
+            dataset: Test cases with 'input' field (a list or any iterable, e.g. a generator)
             progress_callback: Optional callback function for progress updates
-        
+            concurrency: Maximum number of concurrent API calls (default 1)
+            judge_batch: Test cases scored per listwise judge call (default 0, one call per response)
+            max_cases: Optional cap on the number of cases evaluated
+            stopping_rule: Optional callable (scores_a, scores_b) -> stop reason or None
+            check_every: Cases between stopping-rule checks (default 20)
+            completed_results: Already evaluated cases to skip, as {index: (result_a, result_b)}
+            on_case_complete: Optional callback receiving (index, result_a, result_b) per finished case
+            total: Number of cases when ``dataset`` has no len() (used for progress only)
+            budget: Optional cost and deadline limits enforced while the run progresses
+
         Returns:
             Dictionary with detailed results for both prompts
         """
-        results_a = []
-        results_b = []
-        
-        total_tests = len(dataset)
-        
-        for idx, test_case in enumerate(dataset):
-            input_text = test_case["input"]
-            
-            result_a = self.execute_prompt(prompt_a, input_text)
-            quality_a = self.judge_quality(input_text, result_a["response"])
-            result_a["quality"] = quality_a
-            result_a["input"] = input_text
-            results_a.append(result_a)
-            
-            result_b = self.execute_prompt(prompt_b, input_text)
-            quality_b = self.judge_quality(input_text, result_b["response"])
-            result_b["quality"] = quality_b
-            result_b["input"] = input_text
-            results_b.append(result_b)
-            
+        return asyncio.run(self.evaluate_prompts_async(
+            prompt_a, prompt_b, dataset,
+            progress_callback=progress_callback,
+            concurrency=concurrency,
+            judge_batch=judge_batch,
+            max_cases=max_cases,
+            stopping_rule=stopping_rule,
+            check_every=check_every,
+            completed_results=completed_results,
+            on_case_complete=on_case_complete,
+            total=total,
+            budget=budget
+        ))
+
+    def evaluate_prompts_batch(self, prompt_a: str, prompt_b: str,
+                               dataset: Iterable[Dict[str, str]],
+                               progress_callback: Optional[Callable[[int, int], None]] = None,
+                               max_cases: Optional[int] = None,
+                               completed_results: Optional[Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]] = None,
+                               on_case_complete: Optional[CaseCallback] = None,
+                               poll_interval: float = 30.0,
+                               status_callback: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Evaluate two prompts through the provider's asynchronous batch API.
+
+        All generations are submitted as one batch job, then all judge calls
+        as a second one; results are matched back to test cases by custom id.
+        Batched requests are billed at the provider's batch discount and skip
+        the interactive rate limits, but take minutes to hours to finish, so
+        per-response latency is not measured (``time`` is 0). Requests the
+        batch reports as failed are retried as regular API calls. Cache hits
+        are served locally and never submitted.
+
+        Args:
+            prompt_a: First prompt template
+            prompt_b: Second prompt template
+            dataset: Test cases with 'input' field (any iterable)
+            progress_callback: Optional callback receiving (completed, total)
+            max_cases: Optional cap on the number of cases evaluated
+            completed_results: Already evaluated cases to skip, as {index: (result_a, result_b)}
+            on_case_complete: Optional callback receiving (index, result_a, result_b) per finished case
+            poll_interval: Seconds between batch status checks
+            status_callback: Optional callback receiving (phase, finished requests, total requests)
+
+        Returns:
+            Dictionary with detailed results for both prompts and a ``batch`` summary
+        """
+        price_factor = get_batch_price_factor(self.provider)
+        if price_factor is None:
+            raise ValueError(f"Batch mode is not available for provider '{self.provider}'")
+
+        completed: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = dict(completed_results or {})
+        cases = [(idx, test_case["input"])
+                 for idx, test_case in itertools.islice(enumerate(dataset), max_cases)
+                 if idx not in completed]
+        total_tests = len(cases) + len(completed)
+        if progress_callback and completed:
+            progress_callback(len(completed), total_tests)
+
+        batch_ids: List[str] = []
+        calls_at_start = self.call_count
+
+        def run_phase(phase: str, requests: Dict[str, Dict[str, Any]]) -> Dict[str, Tuple[str, Usage, Dict[str, float]]]:
+            runner = BatchRunner(
+                self, poll_interval=poll_interval,
+                status_callback=(lambda status, done, count: status_callback(f"{phase} {status}", done, count))
+                if status_callback else None
+            )
+            replies = {custom_id: (text, usage, {"time": 0.0})
+                       for custom_id, (text, usage) in runner.run(requests).items()}
+            batch_ids.extend(runner.batch_ids)
+            self._count_calls(len(replies))
+            for custom_id in requests.keys() - replies.keys():
+                replies[custom_id] = self._call(requests[custom_id])
+            return replies
+
+        sides = (("a", prompt_a), ("b", prompt_b))
+
+        generations: Dict[str, Dict[str, Any]] = {}
+        requests: Dict[str, Dict[str, Any]] = {}
+        cache_keys: Dict[str, Optional[str]] = {}
+        for idx, input_text in cases:
+            for side, template in sides:
+                custom_id = f"gen-{idx}-{side}"
+                prompt = template.replace("{input}", input_text)
+                cache_key, cached = self._cache_lookup("generation", prompt, GENERATION_MAX_TOKENS)
+                if cached is not None:
+                    generations[custom_id] = self._cached_result(cached)
+                    continue
+                requests[custom_id] = self._request_params(prompt, max_tokens=GENERATION_MAX_TOKENS,
+                                                           cache_prefix=template_prefix(template))
+                cache_keys[custom_id] = cache_key
+
+        for custom_id, (text, usage, timings) in run_phase("generation", requests).items():
+            batched = "throttle_time" not in timings
+            result = self._build_result(text, usage, timings,
+                                        price_factor=price_factor if batched else 1.0)
+            self._cache_store(cache_keys[custom_id], result)
+            result["throttle_time"] = timings.get("throttle_time", 0.0)
+            result["cached"] = False
+            result["batch"] = batched
+            generations[custom_id] = result
+
+        requests = {}
+        cache_keys = {}
+        for idx, input_text in cases:
+            for side, _ in sides:
+                result = generations[f"gen-{idx}-{side}"]
+                result["input"] = input_text
+                judge_prompt = JUDGE_PROMPT_TEMPLATE.format(input=input_text, response=result["response"])
+                cache_key, cached = self._cache_lookup("judge", judge_prompt, JUDGE_MAX_TOKENS)
+                if cached is not None:
+                    result["quality"] = cached["score"]
+                    continue
+                requests[f"judge-{idx}-{side}"] = self._request_params(judge_prompt, max_tokens=JUDGE_MAX_TOKENS,
+                                                                       cache_prefix=JUDGE_PROMPT_PREFIX)
+                cache_keys[f"judge-{idx}-{side}"] = cache_key
+
+        for custom_id, (reply, *_) in run_phase("judging", requests).items():
+            try:
+                score = self._parse_score(reply)
+            except (ValueError, IndexError, AttributeError):
+                score = 5.0
+            else:
+                self._cache_store(cache_keys[custom_id], {"score": score})
+            _, idx, side = custom_id.split("-")
+            generations[f"gen-{idx}-{side}"]["quality"] = score
+
+        for idx, _ in cases:
+            result_a, result_b = generations[f"gen-{idx}-a"], generations[f"gen-{idx}-b"]
+            completed[idx] = (result_a, result_b)
+            if on_case_complete:
+                on_case_complete(idx, result_a, result_b)
             if progress_callback:
-                progress_callback(idx + 1, total_tests)
-        
-        avg_quality_a = sum(r["quality"] for r in results_a) / len(results_a)
-        avg_time_a = sum(r["time"] for r in results_a) / len(results_a)
-        avg_tokens_a = sum(r["total_tokens"] for r in results_a) / len(results_a)
-        avg_cost_a = sum(r["cost"] for r in results_a) / len(results_a)
-        
-        avg_quality_b = sum(r["quality"] for r in results_b) / len(results_b)
-        avg_time_b = sum(r["time"] for r in results_b) / len(results_b)
-        avg_tokens_b = sum(r["total_tokens"] for r in results_b) / len(results_b)
-        avg_cost_b = sum(r["cost"] for r in results_b) / len(results_b)
-        
+                progress_callback(len(completed), total_tests)
+
+        ordered = [completed[idx] for idx in sorted(completed)]
         return {
-            "prompt_a": {
-                "results": results_a,
-                "avg_quality": avg_quality_a,
-                "avg_time": avg_time_a,
-                "avg_tokens": avg_tokens_a,
-                "avg_cost": avg_cost_a,
-                "quality_scores": [r["quality"] for r in results_a]
-            },
-            "prompt_b": {
-                "results": results_b,
-                "avg_quality": avg_quality_b,
-                "avg_time": avg_time_b,
-                "avg_tokens": avg_tokens_b,
-                "avg_cost": avg_cost_b,
-                "quality_scores": [r["quality"] for r in results_b]
+            "prompt_a": summarize_results([pair[0] for pair in ordered]),
+            "prompt_b": summarize_results([pair[1] for pair in ordered]),
+            "batch": {
+                "batch_ids": batch_ids,
+                "price_factor": price_factor,
+                "calls_made": self.call_count - calls_at_start
             }
-        }
\ No newline at end of file
+        }
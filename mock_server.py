@@ -0,0 +1,542 @@
+"""
+Local stand-in for the Anthropic and OpenAI APIs.
+
+Serves deterministic completions (with simulated prompt caching, streaming,
+latency, and injected 429/5xx errors) and both providers' batch endpoints so
+neo_test can be exercised and benchmarked end to end without network access
+or API spend:
+
+    python mock_server.py --port 8089 --latency lognormal:0.8,0.4 --rate-limit-rate 0.05
+    python neo_test.py --provider anthropic --anthropic-api-key test --base-url http://localhost:8089 ...
+    python neo_test.py --provider openai --openai-api-key test --base-url http://localhost:8089/v1 ...
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Tuple, Optional, Callable
+from urllib.parse import urlparse
+
+import click
+
+JUDGE_MARKER = "You are an expert evaluator."
+
+# Shortest prompt prefix the providers will cache, in tokens.
+MIN_CACHEABLE_TOKENS = 1024
+
+
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+Sampler = Callable[[random.Random], float]
+
+
+def parse_distribution(spec: str) -> Sampler:
+    """
+    Parse a distribution spec into a sampler of non-negative values.
+
+    Specs are ``fixed:V`` (or just ``V``), ``uniform:LOW,HIGH``,
+    ``normal:MEAN,SD`` (clipped at zero), ``lognormal:MEDIAN,SIGMA`` and
+    ``exponential:MEAN``.
+
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    name, _, args = spec.partition(":")
+    if not args:
+        name, args = "fixed", name
+    try:
+        values = [float(value) for value in args.split(",")]
+    except ValueError:
+        raise ValueError(f"Invalid distribution '{spec}'. Use one of: {', '.join(DISTRIBUTIONS)}")
+    arity = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+    if arity.get(name) != len(values) or any(value < 0 for value in values):
+        raise ValueError(f"Invalid distribution '{spec}'. Use one of: {', '.join(DISTRIBUTIONS)}")
+
+    if name == "fixed":
+        return lambda rng: values[0]
+    if name == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if name == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if name == "lognormal":
+        return lambda rng: values[0] * rng.lognormvariate(0.0, values[1]) if values[0] > 0 else 0.0
+    return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+
+
+class MockBehaviour:
+    """Latency, output length, failure injection and decode speed of the completion endpoints."""
+
+    def __init__(self, latency: str = "fixed:0", output_tokens: Optional[str] = None,
+                 tokens_per_second: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 retry_after: float = 1.0, seed: Optional[int] = None):
+        """
+        Args:
+            latency: Distribution of seconds before the first byte of a response
+            output_tokens: Distribution of generated tokens (default: 20-80 derived from the prompt)
+            tokens_per_second: Decode speed; generated tokens add len / speed seconds (0 = instant)
+            error_rate: Share of requests answered with an overload error (529 / 500)
+            rate_limit_rate: Share of requests answered with a 429 and a Retry-After header
+            retry_after: Seconds advertised in Retry-After on injected 429s
+            seed: Random seed for latency, length and failure draws
+        """
+        if not 0 <= error_rate + rate_limit_rate <= 1:
+            raise ValueError("error_rate + rate_limit_rate must be between 0 and 1")
+        self.latency = parse_distribution(latency)
+        self.output_tokens = parse_distribution(output_tokens) if output_tokens else None
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        with self._lock:
+            return self.latency(self._rng)
+
+    def sample_output_tokens(self) -> Optional[int]:
+        if self.output_tokens is None:
+            return None
+        with self._lock:
+            return max(1, round(self.output_tokens(self._rng)))
+
+    def decode_time(self, output_tokens: int) -> float:
+        return output_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def fault(self) -> Optional[str]:
+        """Draw whether this request fails: 'rate_limit', 'overloaded' or None."""
+        with self._lock:
+            draw = self._rng.random()
+        if draw < self.rate_limit_rate:
+            return "rate_limit"
+        if draw < self.rate_limit_rate + self.error_rate:
+            return "overloaded"
+        return None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def complete(prompt: str, max_tokens: int, output_tokens: Optional[int] = None) -> Tuple[str, int, int]:
+    """
+    Produce a deterministic reply for a prompt.
+
+    Judge prompts get a score derived from a hash of the prompt (listwise
+    judge prompts get one score per item); anything else gets a short
+    synthetic answer of ``output_tokens`` words (derived from the prompt
+    when not given).
+
+    Returns:
+        Tuple of (text, input_tokens, output_tokens)
+    """
+    if prompt.startswith(JUDGE_MARKER):
+        item_ids = re.findall(r"^### Item (\d+)$", prompt, re.MULTILINE)
+        if item_ids:
+            scores = [{"id": int(item_id), "score": 1 + _digest(prompt + item_id) % 10} for item_id in item_ids]
+            text = json.dumps({"scores": scores})
+        else:
+            text = str(1 + _digest(prompt) % 10)
+    else:
+        words = max(1, min(max_tokens, output_tokens or max(5, 20 + _digest(prompt) % 60)))
+        text = " ".join(f"token{i}" for i in range(words))
+    return text, _count_tokens(prompt), _count_tokens(text)
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content)
+    return "\n".join(parts)
+
+
+def anthropic_message(params: Dict[str, Any], state: "MockState") -> Dict[str, Any]:
+    text, input_tokens, output_tokens = complete(_prompt_text(params["messages"]), params["max_tokens"],
+                                                 state.behaviour.sample_output_tokens())
+    cache_read = cache_write = 0
+    for message in params["messages"]:
+        if isinstance(message["content"], str):
+            continue
+        prefix = ""
+        for block in message["content"]:
+            prefix += block.get("text", "")
+            if block.get("cache_control"):
+                tokens = _count_tokens(prefix)
+                if tokens >= MIN_CACHEABLE_TOKENS:
+                    if state.remember_prefix(prefix):
+                        cache_read = tokens
+                    else:
+                        cache_write = tokens
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params["model"],
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": max(0, input_tokens - cache_read - cache_write), "output_tokens": output_tokens,
+                  "cache_read_input_tokens": cache_read, "cache_creation_input_tokens": cache_write}
+    }
+
+
+def openai_completion(params: Dict[str, Any], state: "MockState") -> Dict[str, Any]:
+    max_tokens = params.get("max_tokens") or params.get("max_completion_tokens") or 1024
+    prompt = _prompt_text(params["messages"])
+    text, input_tokens, output_tokens = complete(prompt, max_tokens, state.behaviour.sample_output_tokens())
+    cached_tokens = 0
+    if input_tokens >= MIN_CACHEABLE_TOKENS and state.remember_prefix(prompt[:MIN_CACHEABLE_TOKENS * 4]):
+        cached_tokens = MIN_CACHEABLE_TOKENS
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": params["model"],
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                  "total_tokens": input_tokens + output_tokens,
+                  "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+    }
+
+
+def _text_pieces(text: str) -> List[str]:
+    """Split a reply into the deltas a streamed response would carry (one word each)."""
+    return re.findall(r"\s*\S+", text) or [text]
+
+
+def anthropic_stream_events(message: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Messages API server-sent events (event name, data) for a finished message."""
+    usage = message["usage"]
+    start = dict(message, content=[], stop_reason=None, usage=dict(usage, output_tokens=1))
+    events = [("message_start", {"type": "message_start", "message": start}),
+              ("content_block_start", {"type": "content_block_start", "index": 0,
+                                       "content_block": {"type": "text", "text": ""}})]
+    for piece in _text_pieces(message["content"][0]["text"]):
+        events.append(("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                               "delta": {"type": "text_delta", "text": piece}}))
+    events += [("content_block_stop", {"type": "content_block_stop", "index": 0}),
+               ("message_delta", {"type": "message_delta",
+                                  "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                  "usage": {"output_tokens": usage["output_tokens"]}}),
+               ("message_stop", {"type": "message_stop"})]
+    return events
+
+
+def openai_stream_chunks(completion: Dict[str, Any], include_usage: bool) -> List[Dict[str, Any]]:
+    """Chat Completions stream chunks for a finished completion."""
+    base = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+            "model": completion["model"]}
+    chunks = [dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                   "finish_reason": None}])]
+    for piece in _text_pieces(completion["choices"][0]["message"]["content"]):
+        chunks.append(dict(base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}]))
+    chunks.append(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+    if include_usage:
+        chunks.append(dict(base, choices=[], usage=completion["usage"]))
+    return chunks
+
+
+def error_body(provider: str, fault: str) -> Tuple[int, Dict[str, Any]]:
+    """Status code and provider-shaped error body for an injected failure."""
+    if fault == "rate_limit":
+        message = "Mock rate limit exceeded"
+        if provider == "anthropic":
+            return 429, {"type": "error", "error": {"type": "rate_limit_error", "message": message}}
+        return 429, {"error": {"message": message, "type": "requests", "code": "rate_limit_exceeded"}}
+    message = "Mock server overloaded"
+    if provider == "anthropic":
+        return 529, {"type": "error", "error": {"type": "overloaded_error", "message": message}}
+    return 500, {"error": {"message": message, "type": "server_error", "code": None}}
+
+
+class MockState:
+    """Batches and files held by the server, guarded by a single lock."""
+
+    def __init__(self, batch_delay: float, behaviour: Optional[MockBehaviour] = None):
+        self.batch_delay = batch_delay
+        self.behaviour = behaviour or MockBehaviour()
+        self.lock = threading.Lock()
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, bytes] = {}
+        self.cached_prefixes = set()
+
+    def remember_prefix(self, prefix: str) -> bool:
+        """Record a cacheable prefix; return True if it was already cached."""
+        with self.lock:
+            seen = prefix in self.cached_prefixes
+            self.cached_prefixes.add(prefix)
+        return seen
+
+    def ready(self, batch: Dict[str, Any]) -> bool:
+        return time.monotonic() - batch["submitted"] >= self.batch_delay
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "NeoMock/1.0"
+    protocol_version = "HTTP/1.1"
+    state: MockState = None
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: Any, content_type: str = "application/json",
+              headers: Optional[Dict[str, str]] = None) -> None:
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, payloads: List[bytes], decode_time: float) -> None:
+        """Send server-sent events with chunked encoding, spreading ``decode_time`` across them."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        gap = decode_time / max(1, len(payloads) - 1)
+        for position, payload in enumerate(payloads):
+            if position and gap:
+                time.sleep(gap)
+            self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _complete(self, provider: str, params: Dict[str, Any]) -> None:
+        """Answer a Messages or Chat Completions request, honouring the configured behaviour."""
+        behaviour = self.state.behaviour
+        time.sleep(behaviour.sample_latency())
+        fault = behaviour.fault()
+        if fault:
+            status, body = error_body(provider, fault)
+            headers = {"retry-after": f"{behaviour.retry_after:g}"} if fault == "rate_limit" else None
+            return self._send(status, body, headers=headers)
+
+        if provider == "anthropic":
+            response = anthropic_message(params, self.state)
+            output_tokens = response["usage"]["output_tokens"]
+        else:
+            response = openai_completion(params, self.state)
+            output_tokens = response["usage"]["completion_tokens"]
+        decode_time = behaviour.decode_time(output_tokens)
+
+        if not params.get("stream"):
+            time.sleep(decode_time)
+            return self._send(200, response)
+        if provider == "anthropic":
+            payloads = [f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+                        for name, data in anthropic_stream_events(response)]
+        else:
+            include_usage = bool((params.get("stream_options") or {}).get("include_usage"))
+            payloads = [f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+                        for chunk in openai_stream_chunks(response, include_usage)]
+            payloads.append(b"data: [DONE]\n\n")
+        self._send_stream(payloads, decode_time)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _not_found(self) -> None:
+        self._send(404, {"error": {"type": "not_found_error", "message": f"No route for {self.path}"}})
+
+    def do_POST(self) -> None:
+        path = urlparse(self.path).path.rstrip("/")
+        if path == "/v1/messages":
+            self._complete("anthropic", json.loads(self._body()))
+        elif path == "/v1/messages/batches":
+            self._send(200, self._create_anthropic_batch(json.loads(self._body())))
+        elif path == "/v1/chat/completions":
+            self._complete("openai", json.loads(self._body()))
+        elif path == "/v1/files":
+            self._send(200, self._upload_file(self._body()))
+        elif path == "/v1/batches":
+            self._send(200, self._create_openai_batch(json.loads(self._body())))
+        else:
+            self._not_found()
+
+    def do_HEAD(self) -> None:
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path.rstrip("/")
+        match = re.fullmatch(r"/v1/messages/batches/([^/]+)(/results)?", path)
+        if match:
+            batch = self.state.batches.get(match.group(1))
+            if batch is None:
+                return self._not_found()
+            if match.group(2):
+                return self._send(200, self._anthropic_results(batch), "application/x-jsonl")
+            return self._send(200, self._anthropic_batch_view(batch))
+
+        match = re.fullmatch(r"/v1/batches/([^/]+)", path)
+        if match:
+            batch = self.state.batches.get(match.group(1))
+            if batch is None:
+                return self._not_found()
+            return self._send(200, self._openai_batch_view(batch))
+
+        match = re.fullmatch(r"/v1/files/([^/]+)/content", path)
+        if match and match.group(1) in self.state.files:
+            return self._send(200, self.state.files[match.group(1)], "application/octet-stream")
+        self._not_found()
+
+    # Anthropic Message Batches
+
+    def _create_anthropic_batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        batch = {"id": batch_id, "provider": "anthropic", "requests": body["requests"],
+                 "submitted": time.monotonic(), "created_at": _now()}
+        with self.state.lock:
+            self.state.batches[batch_id] = batch
+        return self._anthropic_batch_view(batch)
+
+    def _anthropic_batch_view(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        ready = self.state.ready(batch)
+        count = len(batch["requests"])
+        host = self.headers.get("Host", "localhost")
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ready else "in_progress",
+            "request_counts": {"processing": 0 if ready else count, "succeeded": count if ready else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": batch["created_at"],
+            "expires_at": (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat(),
+            "ended_at": _now() if ready else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"http://{host}/v1/messages/batches/{batch['id']}/results" if ready else None
+        }
+
+    def _anthropic_results(self, batch: Dict[str, Any]) -> bytes:
+        lines = [
+            json.dumps({"custom_id": request["custom_id"],
+                        "result": {"type": "succeeded", "message": anthropic_message(request["params"], self.state)}})
+            for request in batch["requests"]
+        ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    # OpenAI Files and Batch API
+
+    def _upload_file(self, body: bytes) -> Dict[str, Any]:
+        boundary = self.headers.get("Content-Type", "").split("boundary=")[-1].encode("utf-8")
+        content = b""
+        for part in body.split(b"--" + boundary):
+            if b'name="file"' in part:
+                content = part.split(b"\r\n\r\n", 1)[1].rsplit(b"\r\n", 1)[0]
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self.state.lock:
+            self.state.files[file_id] = content
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": "batch.jsonl", "purpose": "batch", "status": "processed"}
+
+    def _create_openai_batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        lines = self.state.files[body["input_file_id"]].decode("utf-8").splitlines()
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        batch = {"id": batch_id, "provider": "openai", "requests": [json.loads(line) for line in lines if line.strip()],
+                 "submitted": time.monotonic(), "created_at": int(time.time()),
+                 "input_file_id": body["input_file_id"], "output_file_id": None}
+        with self.state.lock:
+            self.state.batches[batch_id] = batch
+        return self._openai_batch_view(batch)
+
+    def _openai_batch_view(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        ready = self.state.ready(batch)
+        count = len(batch["requests"])
+        with self.state.lock:
+            if ready and batch["output_file_id"] is None:
+                output = [
+                    json.dumps({"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": request["custom_id"],
+                                "response": {"status_code": 200, "request_id": uuid.uuid4().hex,
+                                             "body": openai_completion(request["body"], self.state)},
+                                "error": None})
+                    for request in batch["requests"]
+                ]
+                batch["output_file_id"] = f"file-{uuid.uuid4().hex[:24]}"
+                self.state.files[batch["output_file_id"]] = ("\n".join(output) + "\n").encode("utf-8")
+        return {
+            "id": batch["id"],
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "input_file_id": batch["input_file_id"],
+            "completion_window": "24h",
+            "status": "completed" if ready else "in_progress",
+            "output_file_id": batch["output_file_id"],
+            "created_at": batch["created_at"],
+            "request_counts": {"total": count, "completed": count if ready else 0, "failed": 0}
+        }
+
+
+def serve(port: int = 8089, batch_delay: float = 2.0,
+          behaviour: Optional[MockBehaviour] = None) -> ThreadingHTTPServer:
+    """
+    Build the mock server (call ``serve_forever()`` on the result to run it).
+
+    Args:
+        port: Port to listen on (0 picks a free port)
+        batch_delay: Seconds a submitted batch stays in progress
+        behaviour: Latency, length and failure settings of the completion endpoints
+    """
+    handler = type("BoundMockHandler", (MockHandler,), {"state": MockState(batch_delay, behaviour)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server
+
+
+@click.command()
+@click.option('--port', default=8089, help='Port to listen on')
+@click.option('--batch-delay', default=2.0, help='Seconds a submitted batch stays in progress')
+@click.option('--latency', default="fixed:0", show_default=True,
+              help='Seconds before the first byte: V, uniform:LOW,HIGH, normal:MEAN,SD, lognormal:MEDIAN,SIGMA '
+                   'or exponential:MEAN')
+@click.option('--output-tokens', help='Distribution of generated tokens, same syntax as --latency '
+                                      '(default: 20-80 per prompt)')
+@click.option('--tokens-per-second', default=0.0, type=click.FloatRange(min=0), show_default=True,
+              help='Decode speed; 0 returns the whole reply at once')
+@click.option('--error-rate', default=0.0, type=click.FloatRange(0, 1), show_default=True,
+              help='Share of completions answered with an overload error (529 Anthropic / 500 OpenAI)')
+@click.option('--rate-limit-rate', default=0.0, type=click.FloatRange(0, 1), show_default=True,
+              help='Share of completions answered with 429 and Retry-After')
+@click.option('--retry-after', default=1.0, type=click.FloatRange(min=0), show_default=True,
+              help='Seconds advertised in Retry-After on injected 429s')
+@click.option('--seed', type=int, help='Random seed for latency, length and failure draws')
+def main(port, batch_delay, latency, output_tokens, tokens_per_second, error_rate, rate_limit_rate, retry_after,
+         seed):
+    """Local mock of the Anthropic and OpenAI APIs."""
+    try:
+        behaviour = MockBehaviour(latency=latency, output_tokens=output_tokens,
+                                  tokens_per_second=tokens_per_second, error_rate=error_rate,
+                                  rate_limit_rate=rate_limit_rate, retry_after=retry_after, seed=seed)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    server = serve(port, batch_delay, behaviour)
+    click.echo(f"Mock API listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
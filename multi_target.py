@@ -0,0 +1,190 @@
+import asyncio
+import time
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from evaluator import PromptEvaluator, summarize_results
+from stats_calculator import calculate_leaderboard, latency_percentiles
+
+TARGET_PROVIDERS = ("anthropic", "openai", "openrouter")
+
+ResponseCallback = Callable[[str, int, Dict[str, Any]], None]
+
+
+def parse_target(spec: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a ``provider:model`` target spec.
+
+    The model part may itself contain colons (OpenRouter ids such as
+    ``meta-llama/llama-3-70b:free``); only the first colon separates the
+    provider. A bare provider name selects that provider's default model.
+
+    Returns:
+        Tuple of (provider, model or None)
+    """
+    provider, _, model = spec.strip().partition(":")
+    provider = provider.strip().lower()
+    if provider not in TARGET_PROVIDERS:
+        raise ValueError(f"Unknown provider in target '{spec}'. Use one of: {', '.join(TARGET_PROVIDERS)}")
+    return provider, (model.strip() or None)
+
+
+def target_name(evaluator: PromptEvaluator) -> str:
+    """Display name of an evaluator's target, e.g. ``openai:gpt-4.1-mini``."""
+    return f"{evaluator.provider}:{evaluator.model}"
+
+
+class MultiTargetRun:
+    """
+    Run one prompt against several provider/model targets at the same time.
+
+    Each target walks the full dataset in its own task, so the run takes as
+    long as the slowest target rather than the sum of all of them. Targets
+    on the same provider share that provider's concurrency budget (and its
+    process-wide rate limiter); different providers never wait on each
+    other. Every response is scored by the same judge evaluator, so quality
+    scores are comparable across targets.
+    """
+
+    def __init__(self, targets: Dict[str, PromptEvaluator], judge: PromptEvaluator,
+                 prompt: str, dataset: List[Dict[str, str]]):
+        """
+        Initialize the run.
+
+        Args:
+            targets: Generating evaluators by target name
+            judge: Evaluator that scores every target's responses
+            prompt: Prompt template with {input} placeholder
+            dataset: Test cases with 'input' field
+        """
+        if not targets:
+            raise ValueError("At least one target is required")
+        if not dataset:
+            raise ValueError("Dataset cannot be empty")
+
+        self.targets = dict(targets)
+        self.judge = judge
+        self.prompt = prompt
+        self.dataset = list(dataset)
+        self.results: Dict[str, List[Dict[str, Any]]] = {name: [] for name in self.targets}
+        self.wall_times: Dict[str, float] = {}
+
+    async def _evaluate(self, name: str, idx: int, semaphores: Dict[str, asyncio.Semaphore]) -> Dict[str, Any]:
+        evaluator = self.targets[name]
+        input_text = self.dataset[idx]["input"]
+        async with semaphores[evaluator.provider]:
+            result = await evaluator.aexecute_prompt(self.prompt, input_text)
+        async with semaphores[self.judge.provider]:
+            result["quality"] = await self.judge.ajudge_quality(input_text, result["response"])
+        result["input"] = input_text
+        result["case_index"] = idx
+        return result
+
+    async def _run_target(self, name: str, concurrency: int, semaphores: Dict[str, asyncio.Semaphore],
+                          on_response_complete: Optional[ResponseCallback]) -> None:
+        started = time.perf_counter()
+        pending = set()
+
+        def collect(done) -> None:
+            for task in done:
+                result = task.result()
+                self.results[name].append(result)
+                if on_response_complete:
+                    on_response_complete(name, result["case_index"], result)
+
+        try:
+            for idx in range(len(self.dataset)):
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    collect(done)
+                pending.add(asyncio.ensure_future(self._evaluate(name, idx, semaphores)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        self.results[name].sort(key=lambda r: r["case_index"])
+        self.wall_times[name] = time.perf_counter() - started
+
+    async def run_async(self, concurrency: int = 1,
+                        progress_callback: Optional[Callable[[int, int], None]] = None,
+                        on_response_complete: Optional[ResponseCallback] = None) -> Dict[str, Any]:
+        """
+        Run every target over the dataset concurrently.
+
+        Args:
+            concurrency: Maximum number of concurrent API calls per provider
+            progress_callback: Optional callback receiving (responses completed, total responses)
+            on_response_complete: Optional callback receiving (target, case index, result)
+
+        Returns:
+            Dictionary with per-target summaries, the quality leaderboard and wall times
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        evaluators = list(self.targets.values()) + [self.judge]
+        semaphores = {evaluator.provider: asyncio.Semaphore(concurrency) for evaluator in evaluators}
+
+        warm_up: Dict[str, Any] = {}
+        warm_targets = {evaluator.provider: evaluator for evaluator in evaluators
+                        if evaluator.transport.warm_up}
+        if warm_targets:
+            warmed = await asyncio.gather(*(evaluator.awarm_up(concurrency) for evaluator in warm_targets.values()))
+            warm_up = dict(zip(warm_targets, warmed))
+
+        total = len(self.targets) * len(self.dataset)
+        completed = 0
+
+        def response_complete(name: str, idx: int, result: Dict[str, Any]) -> None:
+            nonlocal completed
+            completed += 1
+            if on_response_complete:
+                on_response_complete(name, idx, result)
+            if progress_callback:
+                progress_callback(completed, total)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self._run_target(name, concurrency, semaphores, response_complete) for name in self.targets
+        ))
+        wall_time = time.perf_counter() - started
+
+        targets = {}
+        for name, evaluator in self.targets.items():
+            summary = summarize_results(self.results[name])
+            summary.update(
+                provider=evaluator.provider,
+                model=evaluator.model,
+                wall_time=self.wall_times[name],
+                latency=latency_percentiles([r["time"] for r in self.results[name]]),
+                total_cost=sum(r["cost"] for r in self.results[name])
+            )
+            targets[name] = summary
+
+        leaderboard = calculate_leaderboard({name: summary["quality_scores"] for name, summary in targets.items()},
+                                            confidence=0.95)
+        for row in leaderboard:
+            row["target"] = row.pop("variant")
+
+        return {
+            "prompt": self.prompt,
+            "judge": target_name(self.judge),
+            "targets": targets,
+            "leaderboard": leaderboard,
+            "responses": completed,
+            "wall_time": wall_time,
+            "sequential_wall_time": sum(self.wall_times.values()),
+            "warm_up": warm_up
+        }
+
+    def run(self, concurrency: int = 1,
+            progress_callback: Optional[Callable[[int, int], None]] = None,
+            on_response_complete: Optional[ResponseCallback] = None) -> Dict[str, Any]:
+        """Synchronous wrapper around run_async."""
+        return asyncio.run(self.run_async(
+            concurrency=concurrency,
+            progress_callback=progress_callback,
+            on_response_complete=on_response_complete
+        ))
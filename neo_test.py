@@ -1,6 +1,9 @@
 import click
 import json
 import os
+import subprocess
+import sys
+import time
 import webbrowser
 from pathlib import Path
 from rich.console import Console
@@ -10,17 +13,75 @@ from rich.panel import Panel
 from rich import box
 from dotenv import load_dotenv
 
-from evaluator import PromptEvaluator
-from stats_calculator import calculate_statistics, calculate_roi
-from report_builder import generate_html_report
+from cost_estimator import estimate_run, scale_estimate
+from budget import BudgetScheduler, parse_duration
+from dedup import dedupe_dataset, DEFAULT_THRESHOLD as DEFAULT_DEDUPE_THRESHOLD
+from dataset_loader import JsonlDataset, is_jsonl, sample_dataset
+from evaluator import PromptEvaluator, summarize_results, DEFAULT_MODELS
+from pricing import get_batch_price_factor
+from rate_limiter import get_rate_limiter
+from response_cache import ResponseCache, DEFAULT_CACHE_DIR
+from results_store import ResultsStore, DEFAULT_STORE_DIR, DEFAULT_HISTORY_RUNS, GROUP_BY
+from transport import (TransportConfig, DEFAULT_MAX_CONNECTIONS, DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+                       DEFAULT_KEEPALIVE_EXPIRY)
+from run_log import RunLog, DEFAULT_RUNS_DIR, new_run_id, results_from_log
+from service import (EvaluationService, ServiceClient, ServiceError, serve, DEFAULT_HOST, DEFAULT_PORT,
+                     DEFAULT_MAX_JOBS, DEFAULT_PROVIDER_CONCURRENCY, DEFAULT_KEEP_RESULTS,
+                     DEFAULT_MAX_DATASETS)
+from telemetry import Telemetry, NULL_TELEMETRY
+from work_queue import WorkQueue, QueueWorker, DEFAULT_QUEUE_DIR, DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS
+from stats_calculator import (calculate_statistics, calculate_paired_statistics, calculate_roi, sequential_test,
+                              calculate_latency_statistics, power_analysis)
+from report_builder import generate_html_report, generate_tournament_report, generate_multi_target_report
+from tournament import PromptTournament, STRATEGIES
+from multi_target import MultiTargetRun, parse_target, target_name
 
 load_dotenv()
 
 console = Console()
 
-def load_dataset(dataset_name: str) -> list:
-    """Load a dataset from file."""
-    if not dataset_name.endswith('.json'):
+COVARIATES = {
+    "input_length": lambda result_a, result_b: len(result_a["input"]),
+    "input_tokens": lambda result_a, result_b: (result_a["input_tokens"] + result_b["input_tokens"]) / 2,
+}
+
+def print_banner() -> None:
+    console.print(Panel.fit(
+        "[bold cyan]🧪 Neo Prompt Tester[/bold cyan]\n"
+        "[dim]Scientific A/B Testing for AI Prompts[/dim]",
+        border_style="cyan"
+    ))
+
+def resolve_api_keys(provider: str, anthropic_api_key: str, openai_api_key: str, openrouter_api_key: str):
+    """Fill API keys from the environment; print an error and return None if the provider's key is missing."""
+    anthropic_api_key = anthropic_api_key or os.getenv("ANTHROPIC_API_KEY")
+    openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
+    openrouter_api_key = openrouter_api_key or os.getenv("OPENROUTER_API_KEY")
+    
+    if provider == "anthropic" and not anthropic_api_key:
+        console.print("[red]Error: Anthropic API key required. Set ANTHROPIC_API_KEY environment variable or use --anthropic-api-key[/red]")
+        return None
+    elif provider == "openai" and not openai_api_key:
+        console.print("[red]Error: OpenAI API key required. Set OPENAI_API_KEY environment variable or use --openai-api-key[/red]")
+        return None
+    elif provider == "openrouter" and not openrouter_api_key:
+        console.print("[red]Error: OpenRouter API key required. Set OPENROUTER_API_KEY environment variable or use --openrouter-api-key[/red]")
+        return None
+    return anthropic_api_key, openai_api_key, openrouter_api_key
+
+def load_dataset(dataset_name: str, sample: int = None, stratify_by: str = None, seed: int = 0,
+                 use_index: bool = False):
+    """
+    Load a dataset from file.
+    
+    JSON arrays are read into memory. JSONL files (optionally gzip-compressed)
+    are streamed lazily, so cases reach the evaluator without parsing the
+    whole file first. With ``sample`` a deterministic reservoir (or
+    stratified) sample is returned instead.
+    """
+    if is_jsonl(dataset_name):
+        dataset_path = dataset_name
+    elif not dataset_name.endswith('.json'):
         dataset_path = os.path.join(os.path.dirname(__file__), "datasets", f"{dataset_name}.json")
     else:
         dataset_path = dataset_name
@@ -29,8 +90,21 @@ def load_dataset(dataset_name: str) -> list:
         console.print(f"[red]Error: Dataset not found at {dataset_path}[/red]")
         raise FileNotFoundError(f"Dataset not found: {dataset_path}")
     
-    with open(dataset_path, "r") as f:
-        return json.load(f)
+    if is_jsonl(dataset_path):
+        data = JsonlDataset(dataset_path, use_index=use_index)
+    else:
+        with open(dataset_path, "r") as f:
+            data = json.load(f)
+    
+    if sample:
+        return sample_dataset(data, sample, stratify_by=stratify_by, seed=seed)
+    return data
+
+def dataset_size(dataset_data):
+    """Number of cases if known without a full pass over the data, else None."""
+    if isinstance(dataset_data, JsonlDataset) and dataset_data.offsets is None:
+        return None
+    return len(dataset_data)
 
 def load_prompt(prompt_input: str) -> str:
     """Load prompt from file or return as-is if it's text."""
@@ -39,10 +113,498 @@ def load_prompt(prompt_input: str) -> str:
             return f.read()
     return prompt_input
 
-@click.command()
+def variant_names(variant_inputs) -> list:
+    """Name variants after their prompt files, falling back to 'Variant N' for inline text."""
+    names = []
+    for position, variant_input in enumerate(variant_inputs, start=1):
+        if os.path.exists(variant_input):
+            name = Path(variant_input).stem
+        else:
+            name = f"Variant {position}"
+        if name in names:
+            name = f"{name} ({position})"
+        names.append(name)
+    return names
+
+def parse_deadline(ctx, param, value):
+    """Click callback turning a --deadline duration into seconds."""
+    if value is None:
+        return None
+    try:
+        return parse_duration(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+def apply_dedupe(dataset_data, threshold: float, max_per_cluster: int):
+    """Cluster near-duplicate inputs and return (representative cases, DedupResult)."""
+    with console.status("[cyan]Clustering near-duplicate inputs..."):
+        dedupe = dedupe_dataset(dataset_data, threshold=threshold, max_per_cluster=max_per_cluster)
+    console.print(f"[green]✓[/green] Deduplicated: {dedupe.total} inputs → {dedupe.clusters} clusters; "
+                  f"evaluating {len(dedupe.cases)} ({dedupe.skipped} skipped)")
+    return dedupe.cases, dedupe
+
+def store_run(run_log: RunLog, store_dir: str) -> None:
+    """Append a finished run log to the results store, warning instead of failing the run."""
+    try:
+        rows = ResultsStore(store_dir).append_run_log(run_log)
+        console.print(f"[green]✓[/green] Stored {rows} responses in {store_dir}")
+    except (OSError, ValueError) as e:
+        console.print(f"[yellow]![/yellow] Could not update the results store: {e}")
+
+def prompt_history(store_dir: str, prompt_a_text: str, prompt_b_text: str) -> dict:
+    """Per-run results of both prompts from the results store, for the report's history chart."""
+    if not os.path.exists(store_dir):
+        return None
+    store = ResultsStore(store_dir)
+    return {
+        "prompt_a": store.query(prompt=prompt_a_text, group_by="run", last=DEFAULT_HISTORY_RUNS),
+        "prompt_b": store.query(prompt=prompt_b_text, group_by="run", last=DEFAULT_HISTORY_RUNS)
+    }
+
+def print_estimate(estimate: dict, provider: str, model_name: str, concurrency: int,
+                   title: str = "Dry-Run Estimate (no API calls made)") -> None:
+    """Print a dry-run projection."""
+    table = Table(title=title, box=box.ROUNDED)
+    table.add_column("Item", style="cyan", no_wrap=True)
+    table.add_column("Calls", style="magenta", justify="right")
+    table.add_column("Input Tokens", justify="right")
+    table.add_column("Output Tokens", justify="right")
+    table.add_column("Cost", style="green", justify="right")
+    
+    table.add_row(
+        "Generation",
+        f"{estimate['generation_calls']:,}",
+        f"{estimate['generation_input_tokens']:,}",
+        f"~{estimate['generation_output_tokens']:,}",
+        f"${estimate['generation_cost']:.4f}"
+    )
+    table.add_row(
+        "Judging",
+        f"{estimate['judge_calls']:,}",
+        f"~{estimate['judge_input_tokens']:,}",
+        f"~{estimate['judge_output_tokens']:,}",
+        f"${estimate['judge_cost']:.4f}"
+    )
+    table.add_row(
+        "Total",
+        f"{estimate['total_calls']:,}",
+        "",
+        "",
+        f"${estimate['total_cost']:.4f}"
+    )
+    
+    console.print(table)
+    console.print(f"[dim]Provider: {provider} | Model: {model_name} | Cases: {estimate['cases']:,} | "
+                  f"Token counter: {estimate['token_counter']}[/dim]")
+    console.print(f"[dim]Output tokens/response prior: A {estimate['output_tokens_prior_a']:.0f}, "
+                  f"B {estimate['output_tokens_prior_b']:.0f} ({estimate['output_prior_source']})[/dim]")
+    console.print(f"[green]⏱  Projected wall time at concurrency {concurrency}: "
+                  f"{estimate['wall_time_seconds'] / 60:.1f} min[/green] "
+                  f"[dim](~{estimate['latency_prior']:.2f}s per call)[/dim]\n")
+
+def present_tournament(tournament: dict, dataset: str, output: str, provider: str, model_name: str) -> None:
+    """Print the tournament leaderboard and write and open the HTML report."""
+    table = Table(title=f"Tournament Leaderboard ({tournament['strategy']})", box=box.ROUNDED)
+    table.add_column("Rank", justify="right")
+    table.add_column("Variant", style="cyan")
+    table.add_column("Quality", style="magenta", justify="right")
+    table.add_column("95% CI", justify="right")
+    table.add_column("P(best)", style="green", justify="right")
+    table.add_column("Responses", justify="right")
+    table.add_column("Avg Cost", justify="right")
+    
+    for row in tournament["leaderboard"]:
+        summary = tournament["variants"][row["variant"]]
+        ci = f"[{row['ci'][0]:.2f}, {row['ci'][1]:.2f}]" if row["n"] > 1 else "n/a"
+        name = row["variant"]
+        if row.get("eliminated_in_round"):
+            name += f" [dim](dropped r{row['eliminated_in_round']})[/dim]"
+        table.add_row(
+            str(row["rank"]),
+            name,
+            f"{row['mean']:.2f}/10",
+            ci,
+            f"{row['prob_best'] * 100:.1f}%",
+            str(row["n"]),
+            f"${summary['avg_cost']:.4f}"
+        )
+    
+    console.print(table)
+    console.print()
+    
+    leader = tournament["leaderboard"][0]
+    console.print(Panel.fit(
+        f"[bold green]🏆 Leader: {leader['variant']}[/bold green]\n"
+        f"[green]Probability best: {leader['prob_best'] * 100:.1f}%[/green]\n"
+        f"[dim]Stopped: {tournament['stop_reason']} after {tournament['responses']} of "
+        f"{tournament['full_grid_responses']} full-grid responses "
+        f"(~{tournament['calls_saved']} API calls saved)[/dim]",
+        border_style="green"
+    ))
+    console.print()
+    
+    generate_tournament_report(
+        tournament=tournament,
+        output_path=output,
+        dataset_name=dataset,
+        model_name=model_name,
+        provider=provider
+    )
+    
+    console.print(f"[green]✓[/green] Report generated: {output}")
+    
+    try:
+        webbrowser.open(f"file://{os.path.abspath(output)}")
+        console.print("[green]✓[/green] Report opened in browser\n")
+    except:
+        console.print("[yellow]![/yellow] Could not open browser automatically\n")
+
+def present_multi_target(run: dict, dataset: str, output: str) -> None:
+    """Print the per-target comparison and write and open the HTML report."""
+    table = Table(title=f"Target Comparison (judge: {run['judge']})", box=box.ROUNDED)
+    table.add_column("Rank", justify="right")
+    table.add_column("Target", style="cyan")
+    table.add_column("Quality", style="magenta", justify="right")
+    table.add_column("95% CI", justify="right")
+    table.add_column("P(best)", style="green", justify="right")
+    table.add_column("Latency p50/p90/p99", justify="right")
+    table.add_column("Avg Cost", justify="right")
+    table.add_column("Wall Time", justify="right")
+    
+    for row in run["leaderboard"]:
+        summary = run["targets"][row["target"]]
+        latency = summary["latency"]
+        ci = f"[{row['ci'][0]:.2f}, {row['ci'][1]:.2f}]" if row["n"] > 1 else "n/a"
+        table.add_row(
+            str(row["rank"]),
+            row["target"],
+            f"{row['mean']:.2f}/10",
+            ci,
+            f"{row['prob_best'] * 100:.1f}%",
+            f"{latency['p50']:.2f}/{latency['p90']:.2f}/{latency['p99']:.2f}s",
+            f"${summary['avg_cost']:.4f}",
+            f"{summary['wall_time']:.1f}s"
+        )
+    
+    console.print(table)
+    console.print()
+    
+    leader = run["leaderboard"][0]
+    console.print(Panel.fit(
+        f"[bold green]🏆 Leader: {leader['target']}[/bold green]\n"
+        f"[green]Probability best: {leader['prob_best'] * 100:.1f}%[/green]\n"
+        f"[dim]Wall time {run['wall_time']:.1f}s for {run['responses']} responses "
+        f"(per-target runs sum to {run['sequential_wall_time']:.1f}s)[/dim]",
+        border_style="green"
+    ))
+    console.print()
+    
+    generate_multi_target_report(run=run, output_path=output, dataset_name=dataset)
+    
+    console.print(f"[green]✓[/green] Report generated: {output}")
+    
+    try:
+        webbrowser.open(f"file://{os.path.abspath(output)}")
+        console.print("[green]✓[/green] Report opened in browser\n")
+    except:
+        console.print("[yellow]![/yellow] Could not open browser automatically\n")
+
+def print_profile(telemetry: Telemetry) -> None:
+    """Print the per-phase time breakdown collected by a run's telemetry."""
+    table = Table(title="Profile", box=box.ROUNDED)
+    table.add_column("Phase", style="cyan", no_wrap=True)
+    table.add_column("Total", justify="right")
+    table.add_column("Count", justify="right")
+    table.add_column("Mean", justify="right")
+    for row in telemetry.phase_breakdown():
+        table.add_row(row["phase"], f"{row['seconds']:.3f}s", str(row["count"] or "—"),
+                      f"{row['mean_seconds']:.3f}s" if row["count"] else "—")
+    console.print(table)
+    console.print("[dim]Case and call spans overlap under concurrency, so their totals can exceed wall time[/dim]\n")
+
+def present_results(results: dict, prompt_a_text: str, prompt_b_text: str, dataset: str, output: str,
+                    provider: str, model_name: str, sequential: bool = False, min_effect: float = 0.5,
+                    paired: bool = False, covariate: str = None, telemetry: Telemetry = None,
+                    profile: bool = False, history: dict = None) -> None:
+    """Run the statistics, print the summary, and write and open the HTML report."""
+    telemetry = telemetry or NULL_TELEMETRY
+    
+    completed = len(results["prompt_a"]["results"])
+    if completed < 2:
+        budget = results.get("budget")
+        if budget and budget["truncated"]:
+            console.print(f"[yellow]⚠ Truncated at the {budget['reason']}:[/yellow] spent ${budget['spent']:.4f} "
+                          f"in {budget['elapsed']:.0f}s")
+        console.print(f"[yellow]![/yellow] {completed} test case(s) completed: too few cases for statistics, "
+                      f"no report written\n")
+        return
+    
+    with telemetry.span("statistics"):
+        if paired:
+            covariate_values = None
+            if covariate:
+                covariate_values = [COVARIATES[covariate](result_a, result_b) for result_a, result_b
+                                    in zip(results["prompt_a"]["results"], results["prompt_b"]["results"])]
+            stats = calculate_paired_statistics(
+                results["prompt_a"]["quality_scores"],
+                results["prompt_b"]["quality_scores"],
+                covariate=covariate_values
+            )
+            stats["paired"]["covariate"] = covariate
+        else:
+            stats = calculate_statistics(
+                results["prompt_a"]["quality_scores"],
+                results["prompt_b"]["quality_scores"],
+                weights=results["dedupe"]["weights"] if results.get("dedupe") else None
+            )
+        if sequential:
+            stats["sequential"] = sequential_test(
+                results["prompt_a"]["quality_scores"],
+                results["prompt_b"]["quality_scores"],
+                min_effect=min_effect
+            )
+    
+        batch = results.get("batch")
+        if not batch:
+            stats["latency"] = calculate_latency_statistics(
+                [r["time"] for r in results["prompt_a"]["results"]],
+                [r["time"] for r in results["prompt_b"]["results"]]
+            )
+        ttfts_a = [r["ttft"] for r in results["prompt_a"]["results"] if r.get("ttft") is not None]
+        ttfts_b = [r["ttft"] for r in results["prompt_b"]["results"] if r.get("ttft") is not None]
+        if ttfts_a and ttfts_b:
+            stats["ttft"] = calculate_latency_statistics(ttfts_a, ttfts_b)
+    
+        dedupe = results.get("dedupe")
+        if dedupe:
+            console.print(f"[green]✓[/green] Deduplicated: evaluated {dedupe['evaluated']} cases representing "
+                          f"{dedupe['represented']} inputs, avoiding ~{dedupe['calls_avoided']} API calls\n")
+    
+        budget = results.get("budget")
+        if budget and budget["truncated"]:
+            stats["truncated"] = True
+            forecast = f" of ~${budget['forecast_cost']:.2f} planned" if budget["forecast_cost"] is not None else ""
+            planned = f" of {budget['planned']}" if budget["planned"] is not None else ""
+            console.print(f"[yellow]⚠ Truncated at the {budget['reason']}:[/yellow] evaluated {budget['evaluated']}"
+                          f"{planned} cases, spent ${budget['spent']:.4f}{forecast} in {budget['elapsed']:.0f}s. "
+                          f"Statistics cover the evaluated cases only\n")
+        elif budget:
+            console.print(f"[green]✓[/green] Within budget: spent ${budget['spent']:.4f} in {budget['elapsed']:.0f}s\n")
+        if budget and budget["judge_batch_from_case"] is not None:
+            console.print(f"[yellow]![/yellow] Scaled down to listwise judging after {budget['judge_batch_from_case']} "
+                          f"cases to fit the limits\n")
+    
+        early_stopping = results.get("early_stopping")
+        if early_stopping and early_stopping["stopped_early"]:
+            console.print(f"[green]✓[/green] Stopped early at case {early_stopping['stopping_point']} of "
+                          f"{early_stopping['planned_cases']} ({early_stopping['reason']}), "
+                          f"saving ~{early_stopping['calls_saved']} API calls\n")
+    
+        roi = calculate_roi(
+            results["prompt_a"]["avg_cost"],
+            results["prompt_b"]["avg_cost"],
+            results["prompt_a"]["avg_quality"],
+            results["prompt_b"]["avg_quality"],
+            num_requests=100000,
+            batch_price_factor=None if batch else get_batch_price_factor(provider)
+        )
+    
+    table = Table(title="Test Results Summary", box=box.ROUNDED)
+    table.add_column("Metric", style="cyan", no_wrap=True)
+    table.add_column("Prompt A", style="magenta")
+    table.add_column("Prompt B", style="yellow")
+    table.add_column("Difference", style="green")
+    
+    quality_diff = ((results["prompt_a"]["avg_quality"] - results["prompt_b"]["avg_quality"]) 
+                   / results["prompt_b"]["avg_quality"] * 100)
+    time_diff = ((results["prompt_a"]["avg_time"] - results["prompt_b"]["avg_time"]) 
+                / results["prompt_b"]["avg_time"] * 100) if results["prompt_b"]["avg_time"] else 0.0
+    tokens_diff = ((results["prompt_a"]["avg_tokens"] - results["prompt_b"]["avg_tokens"]) 
+                  / results["prompt_b"]["avg_tokens"] * 100)
+    cost_diff = ((results["prompt_a"]["avg_cost"] - results["prompt_b"]["avg_cost"]) 
+                / results["prompt_b"]["avg_cost"] * 100)
+    
+    table.add_row(
+        "Quality Score",
+        f"{results['prompt_a']['avg_quality']:.2f}/10",
+        f"{results['prompt_b']['avg_quality']:.2f}/10",
+        f"{quality_diff:+.1f}%"
+    )
+    latency = stats.get("latency")
+    if latency:
+        table.add_row(
+            "Response Time",
+            f"{results['prompt_a']['avg_time']:.3f}s",
+            f"{results['prompt_b']['avg_time']:.3f}s",
+            f"{time_diff:+.1f}%"
+        )
+        table.add_row(
+            "Latency p50/p90/p99",
+            f"{latency['p50_a']:.2f}/{latency['p90_a']:.2f}/{latency['p99_a']:.2f}s",
+            f"{latency['p50_b']:.2f}/{latency['p90_b']:.2f}/{latency['p99_b']:.2f}s",
+            f"p={latency['p_value']:.4f}"
+        )
+    if "ttft" in stats:
+        ttft = stats["ttft"]
+        table.add_row(
+            "TTFT p50/p90/p99",
+            f"{ttft['p50_a']:.2f}/{ttft['p90_a']:.2f}/{ttft['p99_a']:.2f}s",
+            f"{ttft['p50_b']:.2f}/{ttft['p90_b']:.2f}/{ttft['p99_b']:.2f}s",
+            f"p={ttft['p_value']:.4f}"
+        )
+    table.add_row(
+        "Throttle Wait",
+        f"{results['prompt_a']['avg_throttle_time']:.3f}s",
+        f"{results['prompt_b']['avg_throttle_time']:.3f}s",
+        "-"
+    )
+    table.add_row(
+        "Connection Setup",
+        f"{results['prompt_a'].get('avg_connect_time', 0.0):.3f}s",
+        f"{results['prompt_b'].get('avg_connect_time', 0.0):.3f}s",
+        "-"
+    )
+    table.add_row(
+        "Tokens/Response",
+        f"{results['prompt_a']['avg_tokens']:.0f}",
+        f"{results['prompt_b']['avg_tokens']:.0f}",
+        f"{tokens_diff:+.1f}%"
+    )
+    table.add_row(
+        "Cost/Response",
+        f"${results['prompt_a']['avg_cost']:.6f}",
+        f"${results['prompt_b']['avg_cost']:.6f}",
+        f"{cost_diff:+.1f}%"
+    )
+    table.add_row(
+        "Prompt Cache Hits",
+        f"{results['prompt_a']['prompt_cache_hit_ratio'] * 100:.1f}%",
+        f"{results['prompt_b']['prompt_cache_hit_ratio'] * 100:.1f}%",
+        "-"
+    )
+    
+    console.print(table)
+    console.print()
+    
+    winner = stats["winner"]
+    winner_style = "magenta" if winner == "Prompt A" else "yellow"
+    
+    if stats["is_significant"]:
+        console.print(Panel.fit(
+            f"[bold {winner_style}]🏆 Winner: {winner}[/bold {winner_style}]\n"
+            f"[green]Confidence: {stats['confidence_pct']:.1f}%[/green]\n"
+            f"[dim]p-value: {stats['p_value']:.4f} (statistically significant)[/dim]",
+            border_style=winner_style
+        ))
+    else:
+        console.print(Panel.fit(
+            f"[yellow]No statistically significant difference[/yellow]\n"
+            f"[dim]p-value: {stats['p_value']:.4f}[/dim]\n"
+            f"[dim]Both prompts perform similarly[/dim]",
+            border_style="yellow"
+        ))
+    
+    if paired:
+        paired_stats = stats["paired"]
+        console.print(f"[dim]Paired analysis: A − B = {paired_stats['mean_difference']:+.2f} "
+                      f"(95% CI [{paired_stats['ci_difference'][0]:.2f}, {paired_stats['ci_difference'][1]:.2f}], "
+                      f"BCa bootstrap [{paired_stats['bootstrap_ci'][0]:.2f}, {paired_stats['bootstrap_ci'][1]:.2f}]) | "
+                      f"Wilcoxon p={paired_stats['wilcoxon_p_value']:.4f}[/dim]")
+        if paired_stats["cuped"]:
+            console.print(f"[dim]CUPED on {covariate}: variance reduced by "
+                          f"{paired_stats['cuped']['variance_reduction'] * 100:.1f}%[/dim]")
+    
+    if "effective_sample_size" in stats:
+        console.print(f"[dim]Weighted by cluster size: quality {stats['mean_a']:.2f} (A) vs {stats['mean_b']:.2f} (B), "
+                      f"effective sample size {stats['effective_sample_size']:.1f}[/dim]")
+    
+    if batch:
+        console.print(f"[dim]Batch run: costs include the {(1 - batch['price_factor']) * 100:.0f}% batch discount; "
+                      f"latency is not measured[/dim]")
+    elif latency["is_significant"]:
+        console.print(f"[green]⚡ Latency: {latency['faster']} is significantly faster "
+                      f"(Mann-Whitney p={latency['p_value']:.4f})[/green]")
+    else:
+        console.print(f"[dim]Latency: no significant difference (Mann-Whitney p={latency['p_value']:.4f})[/dim]")
+    if roi["batch_total_cost_a"] is not None:
+        console.print(f"[dim]💰 With --batch (100k requests): ${roi['batch_total_cost_a']:,.2f} (A) vs "
+                      f"${roi['batch_total_cost_b']:,.2f} (B) instead of ${roi['total_cost_a']:,.2f} vs "
+                      f"${roi['total_cost_b']:,.2f}[/dim]")
+    
+    console.print()
+    
+    os.makedirs(os.path.dirname(output) or "./results", exist_ok=True)
+    
+    with telemetry.span("report"):
+        generate_html_report(
+            results=results,
+            stats=stats,
+            roi=roi,
+            output_path=output,
+            prompt_a=prompt_a_text,
+            prompt_b=prompt_b_text,
+            dataset_name=dataset,
+            model_name=model_name,
+            provider=provider,
+            profile=telemetry.phase_breakdown() if profile else None,
+            history=history
+        )
+    
+    console.print(f"[green]✓[/green] Report generated: {output}")
+    if profile:
+        print_profile(telemetry)
+    
+    try:
+        webbrowser.open(f"file://{os.path.abspath(output)}")
+        console.print("[green]✓[/green] Report opened in browser\n")
+    except:
+        console.print("[yellow]![/yellow] Could not open browser automatically\n")
+
+class DefaultCommandGroup(click.Group):
+    """Click group that runs the ``run`` command when no subcommand is named."""
+    
+    def parse_args(self, ctx, args):
+        # Group help stays reachable, so every subcommand can be discovered.
+        if not args or (args[0] not in self.commands and args[0] not in ctx.help_option_names):
+            args = ["run"] + list(args)
+        return super().parse_args(ctx, args)
+
+@click.group(cls=DefaultCommandGroup, context_settings={"help_option_names": ["-h", "--help"]})
+def main():
+    """
+    Neo Prompt Tester - Scientific A/B Testing for AI Prompts
+    
+    Without a command, the arguments go to `run`, e.g. `neo_test.py --prompt-a a.txt --prompt-b b.txt`.
+    """
+
+@main.command(short_help="A/B test two prompts, or run a tournament (the default command).")
 @click.option("--prompt-a", help="First prompt (text or file path)")
 @click.option("--prompt-b", help="Second prompt (text or file path)")
+@click.option("--variant", "variants", multiple=True,
+              help="Prompt variant (text or file path); repeat for a multi-variant tournament instead of A/B")
+@click.option("--strategy", default="thompson", type=click.Choice(STRATEGIES), show_default=True,
+              help="Call allocation for --variant tournaments")
+@click.option("--budget", type=click.IntRange(min=1),
+              help="Maximum judged responses in a tournament (default: variants x cases)")
+@click.option("--target", "targets", multiple=True, metavar="PROVIDER:MODEL",
+              help="Run --prompt-a on this provider/model; repeat to compare targets concurrently")
+@click.option("--judge", metavar="PROVIDER:MODEL",
+              help="Shared judge for --target runs (default: the first target)")
 @click.option("--dataset", default="customer_support", help="Dataset name or path (default: customer_support)")
+@click.option("--sample", type=click.IntRange(min=1),
+              help="Evaluate a deterministic random sample of this many cases")
+@click.option("--stratify-by", metavar="FIELD",
+              help="Keep the proportions of this case field when sampling")
+@click.option("--seed", default=0, show_default=True, help="Random seed for --sample")
+@click.option("--index", "use_index", is_flag=True,
+              help="Build or reuse a byte-offset index for JSONL datasets (fast counts and sampling)")
+@click.option("--dedupe", is_flag=True,
+              help="Cluster near-duplicate inputs and evaluate a few representatives per cluster, weighting the "
+                   "statistics by cluster size")
+@click.option("--dedupe-threshold", default=DEFAULT_DEDUPE_THRESHOLD, show_default=True,
+              type=click.FloatRange(0, 1, min_open=True), help="Input similarity (0-1) at which --dedupe merges cases")
+@click.option("--dedupe-max-per-cluster", default=1, type=click.IntRange(min=1), show_default=True,
+              help="Representatives evaluated per near-duplicate cluster")
 @click.option("--output", default="./results/report.html", help="Output path for HTML report")
 @click.option("--provider", default="anthropic", type=click.Choice(['anthropic', 'openai', 'openrouter'], case_sensitive=False), 
               help="LLM provider to use (default: anthropic)")
@@ -50,24 +612,150 @@ def load_prompt(prompt_input: str) -> str:
 @click.option("--anthropic-api-key", help="Anthropic API key (or use ANTHROPIC_API_KEY env var)")
 @click.option("--openai-api-key", help="OpenAI API key (or use OPENAI_API_KEY env var)")
 @click.option("--openrouter-api-key", help="OpenRouter API key (or use OPENROUTER_API_KEY env var)")
-def main(prompt_a, prompt_b, dataset, output, provider, model, anthropic_api_key, openai_api_key, openrouter_api_key):
+@click.option("--concurrency", default=1, type=click.IntRange(min=1), show_default=True,
+              help="Maximum number of concurrent API calls")
+@click.option("--batch", is_flag=True,
+              help="Submit generations and judge calls through the provider batch API (cheaper, slower)")
+@click.option("--batch-poll-interval", default=30.0, type=click.FloatRange(min=0), show_default=True,
+              help="Seconds between batch status checks")
+@click.option("--base-url", help="API base URL override, e.g. a local mock_server.py")
+@click.option("--stream", is_flag=True,
+              help="Stream generations to measure time to first token and decode rate")
+@click.option("--prompt-cache/--no-prompt-cache", default=True, show_default=True,
+              help="Let the provider cache the static prompt prefix before {input}")
+@click.option("--max-connections", default=DEFAULT_MAX_CONNECTIONS, type=click.IntRange(min=1), show_default=True,
+              help="Maximum open HTTP connections in the shared pool")
+@click.option("--keepalive-connections", default=DEFAULT_MAX_KEEPALIVE_CONNECTIONS, type=click.IntRange(min=0),
+              show_default=True, help="Idle HTTP connections kept open for reuse")
+@click.option("--keepalive-expiry", default=DEFAULT_KEEPALIVE_EXPIRY, type=click.FloatRange(min=0), show_default=True,
+              help="Seconds an idle connection stays open")
+@click.option("--http2/--no-http2", default=None,
+              help="Use HTTP/2 (default: on when the h2 package is installed)")
+@click.option("--warm-up/--no-warm-up", default=True, show_default=True,
+              help="Open connections before the timed loop so handshakes stay out of latency")
+@click.option("--judge-batch", default=0, type=click.IntRange(min=0), show_default=True,
+              help="Test cases scored per judge call (A and B together); 0 judges each response separately")
+@click.option("--sequential", is_flag=True,
+              help="Stop early once an always-valid sequential test reaches significance or futility")
+@click.option("--paired", is_flag=True,
+              help="Analyse per-case differences (paired t-test, Wilcoxon, BCa bootstrap) instead of an unpaired t-test")
+@click.option("--covariate", type=click.Choice(sorted(COVARIATES)),
+              help="CUPED variance reduction using this pre-response covariate (implies --paired)")
+@click.option("--min-effect", default=0.5, type=click.FloatRange(min=0, min_open=True), show_default=True,
+              help="Smallest quality difference (1-10 scale) worth detecting in sequential mode")
+@click.option("--check-every", default=20, type=click.IntRange(min=1), show_default=True,
+              help="Cases between sequential checks")
+@click.option("--max-cases", type=click.IntRange(min=1), help="Maximum number of test cases to evaluate")
+@click.option("--max-cost", type=click.FloatRange(min=0, min_open=True), metavar="USD",
+              help="Spend limit enforced live: no case starts unless its forecast cost fits")
+@click.option("--deadline", metavar="DURATION", callback=parse_deadline,
+              help="Wall-time limit for the evaluation, e.g. 90s, 30m or 1h30m")
+@click.option("--rpm", type=click.FloatRange(min=1), help="Starting requests/minute for the provider rate limiter")
+@click.option("--tpm", type=click.FloatRange(min=1), help="Starting tokens/minute for the provider rate limiter")
+@click.option("--dry-run", is_flag=True,
+              help="Estimate calls, tokens, cost and wall time locally without calling any provider")
+@click.option("--output-tokens-prior", type=click.FloatRange(min=0),
+              help="Expected output tokens per generation for --dry-run (default: from past runs)")
+@click.option("--runs-dir", default=DEFAULT_RUNS_DIR, show_default=True,
+              help="Directory for crash-safe run logs")
+@click.option("--resume", "resume_run_id", metavar="RUN_ID",
+              help="Resume an interrupted run, skipping cases already in its log")
+@click.option("--rebuild-report", "rebuild_run_id", metavar="RUN_ID",
+              help="Regenerate the report from a run log without calling any provider")
+@click.option("--cache/--no-cache", default=True, show_default=True,
+              help="Reuse stored responses for identical generation and judge requests")
+@click.option("--cache-dir", default=DEFAULT_CACHE_DIR, show_default=True,
+              help="Directory for the on-disk response cache")
+@click.option("--store/--no-store", default=True, show_default=True,
+              help="Append every response to the results store and chart this prompt pair's past runs in the report")
+@click.option("--store-dir", default=DEFAULT_STORE_DIR, show_default=True,
+              help="Directory of the columnar results store (see `neo_test.py query`)")
+@click.option("--metrics-out", metavar="PATH",
+              help="Write run metrics here (.json for JSON, else Prometheus text; default: <runs-dir>/<run id>.metrics.prom)")
+@click.option("--profile", is_flag=True,
+              help="Print and report a per-phase time breakdown (generation, judging, statistics, report)")
+@click.option("--server", metavar="URL", envvar="NEO_SERVER",
+              help="Submit the A/B test to a running `neo_test.py serve` instead of calling providers from this "
+                   "process (or set NEO_SERVER)")
+def run(prompt_a, prompt_b, variants, strategy, budget, targets, judge, dataset, sample, stratify_by, seed, use_index,
+         dedupe, dedupe_threshold, dedupe_max_per_cluster, output, provider, model, anthropic_api_key, openai_api_key, openrouter_api_key,
+         concurrency, batch, batch_poll_interval, base_url, stream, prompt_cache, max_connections,
+         keepalive_connections, keepalive_expiry, http2, warm_up, judge_batch, sequential, paired, covariate, min_effect, check_every, max_cases, max_cost, deadline, rpm, tpm,
+         dry_run, output_tokens_prior, runs_dir, resume_run_id, rebuild_run_id, cache, cache_dir, store, store_dir,
+         metrics_out, profile, server):
     """
     Neo Prompt Tester - Scientific A/B Testing for AI Prompts
     
     Test two prompts against a dataset and generate a comprehensive HTML report.
+    This is the default command; `neo_test.py --help` lists the others
+    (plan, coordinator, worker, serve, query).
     
     Supports multiple LLM providers:
     - anthropic: Claude models (default: claude-sonnet-4-20250514)
     - openai: GPT models (default: gpt-4o)
     - openrouter: Access various models (default: openai/gpt-4o)
     """
-    console.print(Panel.fit(
-        "[bold cyan]🧪 Neo Prompt Tester[/bold cyan]\n"
-        "[dim]Scientific A/B Testing for AI Prompts[/dim]",
-        border_style="cyan"
-    ))
+    print_banner()
+    
+    if rebuild_run_id:
+        try:
+            metadata, results = results_from_log(RunLog(rebuild_run_id, runs_dir))
+            console.print(f"[green]✓[/green] Loaded run {rebuild_run_id}: "
+                          f"{len(results['prompt_a']['results'])} completed test cases\n")
+            present_results(results, metadata["prompt_a"], metadata["prompt_b"], metadata["dataset"], output,
+                            metadata["provider"], metadata["model"],
+                            sequential=metadata.get("sequential", False),
+                            min_effect=metadata.get("min_effect", min_effect),
+                            paired=paired or metadata.get("paired", False),
+                            covariate=covariate or metadata.get("covariate"),
+                            history=prompt_history(store_dir, metadata["prompt_a"], metadata["prompt_b"])
+                            if store else None)
+        except (FileNotFoundError, ValueError) as e:
+            console.print(f"[red]Error: {e}[/red]")
+        return
     
-    if not prompt_a or not prompt_b:
+    paired = paired or bool(covariate)
+    completed_cases = {}
+    resumed_metadata = resumed_summary = None
+    if resume_run_id:
+        try:
+            resumed_metadata, completed_cases, resumed_summary = RunLog(resume_run_id, runs_dir).read()
+        except (FileNotFoundError, ValueError) as e:
+            console.print(f"[red]Error: {e}[/red]")
+            return
+        prompt_a = prompt_b = None
+        dataset = resumed_metadata["dataset"]
+        sample = resumed_metadata.get("sample")
+        stratify_by = resumed_metadata.get("stratify_by")
+        seed = resumed_metadata.get("seed", 0)
+        use_index = resumed_metadata.get("use_index", False)
+        dedupe_config = resumed_metadata.get("dedupe")
+        dedupe = bool(dedupe_config)
+        if dedupe_config:
+            dedupe_threshold = dedupe_config["threshold"]
+            dedupe_max_per_cluster = dedupe_config["max_per_cluster"]
+        batch = batch or resumed_metadata.get("batch", False)
+        sequential = sequential or resumed_metadata.get("sequential", False)
+        min_effect = resumed_metadata.get("min_effect", min_effect)
+        check_every = resumed_metadata.get("check_every", check_every)
+        # Judging mode and planned size come from the log, so both halves of the run stay comparable.
+        judge_batch = resumed_metadata.get("judge_batch", judge_batch)
+        max_cases = max_cases or resumed_metadata.get("max_cases")
+        covariate = covariate or resumed_metadata.get("covariate")
+        paired = paired or resumed_metadata.get("paired", False) or bool(covariate)
+        max_cost = max_cost or resumed_metadata.get("max_cost")
+        deadline = deadline or resumed_metadata.get("deadline")
+        provider = resumed_metadata["provider"]
+        model = resumed_metadata["model"]
+        console.print(f"\n[green]✓[/green] Resuming run {resume_run_id}: "
+                      f"{len(completed_cases)} test cases already completed")
+    elif variants and len(variants) < 2:
+        console.print("[red]Error: A tournament needs at least two --variant prompts[/red]")
+        return
+    elif targets and (prompt_b or variants or not prompt_a):
+        console.print("[red]Error: --target runs one prompt; pass it with --prompt-a and drop --prompt-b/--variant[/red]")
+        return
+    elif not variants and not targets and (not prompt_a or not prompt_b):
         console.print("\n[yellow]Interactive Mode[/yellow]\n")
         
         console.print("[bold]Enter Prompt A[/bold] (can be text or file path):")
@@ -88,31 +776,380 @@ def main(prompt_a, prompt_b, dataset, output, provider, model, anthropic_api_key
         if output_input:
             output = output_input
     
-    anthropic_api_key = anthropic_api_key or os.getenv("ANTHROPIC_API_KEY")
-    openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
-    openrouter_api_key = openrouter_api_key or os.getenv("OPENROUTER_API_KEY")
+    if dry_run and (variants or targets):
+        console.print("[red]Error: --dry-run estimates two-prompt runs; use --prompt-a/--prompt-b[/red]")
+        return
     
-    if provider == "anthropic" and not anthropic_api_key:
-        console.print("[red]Error: Anthropic API key required. Set ANTHROPIC_API_KEY environment variable or use --anthropic-api-key[/red]")
+    if targets and (batch or sequential or resume_run_id):
+        console.print("[red]Error: --target cannot be combined with --batch, --sequential or --resume[/red]")
         return
-    elif provider == "openai" and not openai_api_key:
-        console.print("[red]Error: OpenAI API key required. Set OPENAI_API_KEY environment variable or use --openai-api-key[/red]")
+    
+    if stratify_by and not sample:
+        console.print("[red]Error: --stratify-by requires --sample[/red]")
         return
-    elif provider == "openrouter" and not openrouter_api_key:
-        console.print("[red]Error: OpenRouter API key required. Set OPENROUTER_API_KEY environment variable or use --openrouter-api-key[/red]")
+    
+    if (max_cost or deadline) and (variants or targets or batch or server):
+        console.print("[red]Error: --max-cost and --deadline apply to live two-prompt runs; they cannot be combined "
+                      "with --variant, --target, --batch or --server[/red]")
+        return
+    
+    if dedupe and (variants or targets or batch or sequential or paired or server):
+        console.print("[red]Error: --dedupe weights an unpaired A/B test; it cannot be combined with --variant, "
+                      "--target, --batch, --sequential, --paired/--covariate or --server[/red]")
+        return
+    
+    if batch:
+        if get_batch_price_factor(provider) is None:
+            console.print(f"[red]Error: --batch is not available for provider '{provider}'[/red]")
+            return
+        if variants or sequential:
+            console.print("[red]Error: --batch submits every case up front; it cannot be combined with "
+                          "--variant or --sequential[/red]")
+            return
+    dataset_options = {"sample": sample, "stratify_by": stratify_by, "seed": seed, "use_index": use_index}
+    
+    if dry_run:
+        try:
+            prompt_a_text = load_prompt(prompt_a)
+            prompt_b_text = load_prompt(prompt_b)
+            dataset_data = load_dataset(dataset, **dataset_options)
+            if dedupe:
+                dataset_data, _ = apply_dedupe(dataset_data, dedupe_threshold, dedupe_max_per_cluster)
+        except FileNotFoundError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            return
+        model_name = model or DEFAULT_MODELS[provider]
+        estimate = estimate_run(
+            prompt_a_text, prompt_b_text, dataset_data, provider, model_name,
+            concurrency=concurrency,
+            judge_batch=judge_batch,
+            max_cases=max_cases,
+            output_tokens_prior=output_tokens_prior,
+            requests_per_minute=rpm,
+            runs_dir=runs_dir
+        )
+        console.print()
+        print_estimate(estimate, provider, model_name, concurrency)
+        return
+    
+    if server:
+        if variants or targets or batch or resume_run_id:
+            console.print("[red]Error: --server runs two-prompt A/B tests; it cannot be combined with --variant, "
+                          "--target, --batch or --resume[/red]")
+            return
+        run_on_server(server, prompt_a, prompt_b, dataset, dataset_options, output, provider, model, concurrency,
+                      judge_batch, max_cases, sequential, min_effect, check_every, paired, covariate)
+        return
+    
+    if targets:
+        try:
+            target_specs = [parse_target(spec) for spec in targets]
+            judge_spec = parse_target(judge) if judge else target_specs[0]
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            return
+        target_providers = {spec[0] for spec in target_specs + [judge_spec]}
+        if base_url and len(target_providers) > 1:
+            console.print("[red]Error: --base-url applies to one provider; set ANTHROPIC_BASE_URL / OPENAI_BASE_URL "
+                          "for mixed-provider --target runs[/red]")
+            return
+    else:
+        target_providers = {provider}
+    
+    for key_provider in sorted(target_providers):
+        api_keys = resolve_api_keys(key_provider, anthropic_api_key, openai_api_key, openrouter_api_key)
+        if api_keys is None:
+            return
+        anthropic_api_key, openai_api_key, openrouter_api_key = api_keys
+    
+    try:
+        transport = TransportConfig(max_connections=max_connections, max_keepalive_connections=keepalive_connections,
+                                    keepalive_expiry=keepalive_expiry, http2=http2, warm_up=warm_up)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
         return
     
     console.print("\n")
     
+    if targets:
+        run_targets(prompt_a, target_specs, judge_spec, dataset, dataset_options, output, anthropic_api_key,
+                    openai_api_key, openrouter_api_key, concurrency, stream, rpm, tpm, cache, cache_dir, base_url,
+                    prompt_cache, transport)
+        return
+    
+    if variants:
+        run_tournament(variants, strategy, budget, dataset, dataset_options, output, provider, model, anthropic_api_key,
+                       openai_api_key, openrouter_api_key, concurrency, stream, rpm, tpm, cache, cache_dir, base_url,
+                       prompt_cache, transport)
+        return
+    
     try:
-        prompt_a_text = load_prompt(prompt_a)
-        prompt_b_text = load_prompt(prompt_b)
-        dataset_data = load_dataset(dataset)
+        if resumed_metadata:
+            prompt_a_text = resumed_metadata["prompt_a"]
+            prompt_b_text = resumed_metadata["prompt_b"]
+        else:
+            prompt_a_text = load_prompt(prompt_a)
+            prompt_b_text = load_prompt(prompt_b)
+        dataset_data = load_dataset(dataset, **dataset_options)
+        dedupe_result = None
+        if dedupe:
+            dataset_data, dedupe_result = apply_dedupe(dataset_data, dedupe_threshold, dedupe_max_per_cluster)
+        total_cases = dataset_size(dataset_data)
         
         if "{input}" not in prompt_a_text or "{input}" not in prompt_b_text:
             console.print("[yellow]Warning: Prompts should contain {input} placeholder for variable substitution[/yellow]")
         
         console.print(f"[green]✓[/green] Loaded prompts")
+        if total_cases is None:
+            console.print(f"[green]✓[/green] Streaming dataset: {dataset}")
+        else:
+            console.print(f"[green]✓[/green] Loaded dataset: {total_cases} test cases"
+                          f"{' (sampled)' if sample else ''}")
+        console.print(f"[green]✓[/green] Using provider: {provider}")
+        
+        telemetry = Telemetry()
+        evaluator = PromptEvaluator(
+            provider=provider,
+            api_key=anthropic_api_key,
+            model=model,
+            openai_api_key=openai_api_key,
+            openrouter_api_key=openrouter_api_key,
+            cache=ResponseCache(cache_dir) if cache else None,
+            rate_limiter=get_rate_limiter(provider, requests_per_minute=rpm, tokens_per_minute=tpm),
+            stream=stream,
+            base_url=base_url,
+            prompt_caching=prompt_cache,
+            transport=transport,
+            telemetry=telemetry
+        )
+        
+        console.print(f"[green]✓[/green] Using model: {evaluator.model}")
+        if batch:
+            console.print(f"[green]✓[/green] Batch API: polling every {batch_poll_interval:g}s")
+        else:
+            console.print(f"[green]✓[/green] Concurrency: {concurrency} API calls")
+        
+        run_log = RunLog(resume_run_id or new_run_id(), runs_dir)
+        if not resume_run_id:
+            run_log.write_metadata({
+                "prompt_a": prompt_a_text,
+                "prompt_b": prompt_b_text,
+                "dataset": dataset,
+                "provider": provider,
+                "model": evaluator.model,
+                "sequential": sequential,
+                "min_effect": min_effect,
+                "paired": paired,
+                "covariate": covariate,
+                "sample": sample,
+                "stratify_by": stratify_by,
+                "seed": seed,
+                "use_index": use_index,
+                "dedupe": {"threshold": dedupe_threshold, "max_per_cluster": dedupe_max_per_cluster} if dedupe else None,
+                "batch": batch,
+                "judge_batch": judge_batch,
+                "max_cases": max_cases,
+                "check_every": check_every,
+                "max_cost": max_cost,
+                "deadline": deadline
+            })
+        console.print(f"[green]✓[/green] Run ID: {run_log.run_id} (log: {run_log.path})\n")
+        
+        planned_cases = total_cases
+        if max_cases:
+            planned_cases = max_cases if total_cases is None else min(total_cases, max_cases)
+        
+        budget = None
+        if max_cost or deadline:
+            budget = BudgetScheduler.from_estimate(prompt_a_text, prompt_b_text, dataset_data, provider,
+                                                   evaluator.model, max_cost=max_cost, deadline=deadline,
+                                                   output_tokens_prior=output_tokens_prior, runs_dir=runs_dir)
+            if completed_cases:
+                budget.carry_over(completed_cases.values(), judge_batch=judge_batch,
+                                  summary=(resumed_summary or {}).get("budget"))
+            limits = [f"${max_cost:g}" if max_cost else None, f"{deadline:g}s" if deadline else None]
+            carried = f", ${budget.spent:.4f} spent before resuming" if completed_cases else ""
+            console.print(f"[green]✓[/green] Limits: {' and '.join(limit for limit in limits if limit)} "
+                          f"(forecast ~${budget.case_cost(judge_batch):.4f} per case{carried})\n")
+        
+        def stop_when_decided(scores_a, scores_b):
+            decision = sequential_test(scores_a, scores_b, min_effect=min_effect)["decision"]
+            return None if decision == "continue" else decision
+        
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            console=console
+        ) as progress:
+            task = progress.add_task(
+                f"[cyan]Testing prompts on {planned_cases} cases..." if planned_cases
+                else "[cyan]Testing prompts on streamed cases...",
+                total=planned_cases
+            )
+            
+            def update_progress(current, total):
+                if budget is None:
+                    progress.update(task, completed=current)
+                    return
+                limit = f"/${budget.max_cost:g}" if budget.max_cost else ""
+                clock = f" | {budget.elapsed:.0f}/{budget.deadline:g}s" if budget.deadline else ""
+                progress.update(task, completed=current,
+                                description=f"[cyan]Testing prompts (${budget.spent:.4f}{limit}{clock})...")
+            
+            def update_batch_status(phase, finished, requests):
+                progress.update(task, description=f"[cyan]Batch {phase}: {finished}/{requests} requests...")
+            
+            try:
+                if batch:
+                    results = evaluator.evaluate_prompts_batch(
+                        prompt_a_text,
+                        prompt_b_text,
+                        dataset_data,
+                        progress_callback=update_progress,
+                        max_cases=max_cases,
+                        completed_results=completed_cases,
+                        on_case_complete=run_log.append_case,
+                        poll_interval=batch_poll_interval,
+                        status_callback=update_batch_status
+                    )
+                else:
+                    results = evaluator.evaluate_prompts(
+                        prompt_a_text, 
+                        prompt_b_text, 
+                        dataset_data,
+                        progress_callback=update_progress,
+                        concurrency=concurrency,
+                        judge_batch=judge_batch,
+                        max_cases=max_cases,
+                        stopping_rule=stop_when_decided if sequential else None,
+                        check_every=check_every,
+                        completed_results=completed_cases,
+                        on_case_complete=run_log.append_case,
+                        total=total_cases,
+                        budget=budget
+                    )
+            except Exception:
+                run_log.close()
+                console.print(f"[yellow]![/yellow] Completed cases are saved. Resume with: --resume {run_log.run_id}")
+                raise
+        
+        summary = {key: results[key] for key in ("early_stopping", "batch", "budget") if results.get(key)}
+        if dedupe_result:
+            evaluated = len(results["prompt_a"]["results"])
+            # A cost or deadline stop can cancel cases out of order, so weight the cases that are logged.
+            _, logged_cases, _ = run_log.read()
+            results["dedupe"] = dedupe_result.summary(completed=logged_cases)
+            evaluated_now = evaluated - len(completed_cases)
+            calls_per_case = evaluator.call_count / evaluated_now if evaluated_now else 0.0
+            results["dedupe"]["calls_avoided"] = round(
+                calls_per_case * (results["dedupe"]["represented"] - evaluated))
+            summary["dedupe"] = results["dedupe"]
+        if summary:
+            run_log.write_summary(summary)
+        run_log.close()
+        
+        console.print("\n[green]✓[/green] Evaluation complete!")
+        if results.get("warm_up"):
+            console.print(f"[green]✓[/green] Warmed up {results['warm_up']['connections']} connection(s) "
+                          f"in {results['warm_up']['time']:.2f}s{' over HTTP/2' if transport.http2 else ''}")
+        if evaluator.cache is not None:
+            cache_stats = evaluator.cache.stats()
+            console.print(f"[green]✓[/green] Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                          f"({cache_stats['entries']} entries in {cache_dir})")
+        if store:
+            store_run(run_log, store_dir)
+        console.print()
+        
+        present_results(results, prompt_a_text, prompt_b_text, dataset, output, provider, evaluator.model,
+                        sequential=sequential, min_effect=min_effect, paired=paired, covariate=covariate,
+                        telemetry=telemetry, profile=profile,
+                        history=prompt_history(store_dir, prompt_a_text, prompt_b_text) if store else None)
+        
+        metrics_path = telemetry.write_metrics(
+            metrics_out or os.path.join(runs_dir, f"{run_log.run_id}.metrics.prom"))
+        console.print(f"[green]✓[/green] Metrics written to {metrics_path}\n")
+        
+    except FileNotFoundError as e:
+        console.print(f"[red]Error: {e}[/red]")
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        import traceback
+        traceback.print_exc()
+
+def run_on_server(server, prompt_a, prompt_b, dataset, dataset_options, output, provider, model, concurrency,
+                  judge_batch, max_cases, sequential, min_effect, check_every, paired, covariate):
+    """Submit an A/B test to an evaluation service, follow its progress and present the results locally."""
+    client = ServiceClient(server)
+    try:
+        prompt_a_text = load_prompt(prompt_a)
+        prompt_b_text = load_prompt(prompt_b)
+        if "{input}" not in prompt_a_text or "{input}" not in prompt_b_text:
+            console.print("[yellow]Warning: Prompts should contain {input} placeholder for variable substitution[/yellow]")
+        
+        job = client.submit({
+            "prompt_a": prompt_a_text,
+            "prompt_b": prompt_b_text,
+            # The service resolves paths on its own filesystem, so send local files as absolute paths.
+            "dataset": os.path.abspath(dataset) if os.path.exists(dataset) else dataset,
+            **dataset_options,
+            "max_cases": max_cases,
+            "provider": provider,
+            "model": model,
+            "concurrency": concurrency,
+            "judge_batch": judge_batch,
+            "sequential": sequential,
+            "min_effect": min_effect,
+            "check_every": check_every,
+            "paired": paired
+        })
+        job_id = job["job_id"]
+        console.print(f"[green]✓[/green] Submitted job {job_id} to {server}\n")
+        
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            console=console
+        ) as progress:
+            task = progress.add_task("[cyan]Queued on the server...", total=None)
+            try:
+                for job in client.events(job_id):
+                    if job["status"] == "running":
+                        progress.update(task, completed=job["completed"], total=job["total"],
+                                        description=f"[cyan]Testing prompts on {job['total'] or 'streamed'} cases...")
+            except KeyboardInterrupt:
+                client.cancel(job_id)
+                console.print(f"[yellow]![/yellow] Cancelled job {job_id}")
+                return
+        
+        if job["status"] != "done":
+            console.print(f"[red]Error: Job {job_id} {job['status']}{': ' + job['error'] if job['error'] else ''}[/red]")
+            return
+        results = client.results(job_id)
+        console.print(f"\n[green]✓[/green] Evaluation complete! Server run {job['run_id']} "
+                      f"(rebuild there with --rebuild-report {job['run_id']})\n")
+        present_results(results, prompt_a_text, prompt_b_text, dataset, output, provider, job["model"],
+                        sequential=sequential, min_effect=min_effect, paired=paired, covariate=covariate)
+    except (FileNotFoundError, ServiceError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+
+def run_tournament(variants, strategy, budget, dataset, dataset_options, output, provider, model, anthropic_api_key,
+                   openai_api_key, openrouter_api_key, concurrency, stream, rpm, tpm, cache, cache_dir, base_url=None,
+                   prompt_cache=True, transport=None):
+    """Run a multi-variant tournament from the CLI."""
+    try:
+        variant_prompts = dict(zip(variant_names(variants), (load_prompt(v) for v in variants)))
+        dataset_data = list(load_dataset(dataset, **dataset_options))
+        
+        if any("{input}" not in text for text in variant_prompts.values()):
+            console.print("[yellow]Warning: Prompts should contain {input} placeholder for variable substitution[/yellow]")
+        
+        console.print(f"[green]✓[/green] Loaded {len(variant_prompts)} variants: {', '.join(variant_prompts)}")
         console.print(f"[green]✓[/green] Loaded dataset: {len(dataset_data)} test cases")
         console.print(f"[green]✓[/green] Using provider: {provider}")
         
@@ -121,10 +1158,19 @@ def main(prompt_a, prompt_b, dataset, output, provider, model, anthropic_api_key
             api_key=anthropic_api_key,
             model=model,
             openai_api_key=openai_api_key,
-            openrouter_api_key=openrouter_api_key
+            openrouter_api_key=openrouter_api_key,
+            cache=ResponseCache(cache_dir) if cache else None,
+            rate_limiter=get_rate_limiter(provider, requests_per_minute=rpm, tokens_per_minute=tpm),
+            stream=stream,
+            base_url=base_url,
+            prompt_caching=prompt_cache,
+            transport=transport
         )
+        tournament = PromptTournament(evaluator, variant_prompts, dataset_data, strategy=strategy, budget=budget)
         
-        console.print(f"[green]✓[/green] Using model: {evaluator.model}\n")
+        console.print(f"[green]✓[/green] Using model: {evaluator.model}")
+        console.print(f"[green]✓[/green] Strategy: {strategy} | Budget: {tournament.budget} responses "
+                      f"(full grid: {tournament.full_grid})\n")
         
         with Progress(
             SpinnerColumn(),
@@ -134,128 +1180,672 @@ def main(prompt_a, prompt_b, dataset, output, provider, model, anthropic_api_key
             console=console
         ) as progress:
             task = progress.add_task(
-                f"[cyan]Testing prompts on {len(dataset_data)} cases...", 
-                total=len(dataset_data)
+                f"[cyan]Running tournament of {len(variant_prompts)} variants...",
+                total=tournament.budget
             )
             
             def update_progress(current, total):
                 progress.update(task, completed=current)
             
-            results = evaluator.evaluate_prompts(
-                prompt_a_text, 
-                prompt_b_text, 
-                dataset_data,
-                progress_callback=update_progress
+            results = tournament.run(concurrency=concurrency, progress_callback=update_progress)
+            progress.update(task, completed=tournament.budget)
+        
+        console.print("\n[green]✓[/green] Tournament complete!\n")
+        present_tournament(results, dataset, output, provider, evaluator.model)
+        
+    except FileNotFoundError as e:
+        console.print(f"[red]Error: {e}[/red]")
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        import traceback
+        traceback.print_exc()
+
+def run_targets(prompt, target_specs, judge_spec, dataset, dataset_options, output, anthropic_api_key,
+                openai_api_key, openrouter_api_key, concurrency, stream, rpm, tpm, cache, cache_dir, base_url=None,
+                prompt_cache=True, transport=None):
+    """Run one prompt against several provider/model targets concurrently from the CLI."""
+    try:
+        prompt_text = load_prompt(prompt)
+        dataset_data = list(load_dataset(dataset, **dataset_options))
+        
+        if "{input}" not in prompt_text:
+            console.print("[yellow]Warning: Prompts should contain {input} placeholder for variable substitution[/yellow]")
+        
+        response_cache = ResponseCache(cache_dir) if cache else None
+        
+        def build_evaluator(target_provider, target_model):
+            return PromptEvaluator(
+                provider=target_provider,
+                api_key=anthropic_api_key,
+                model=target_model,
+                openai_api_key=openai_api_key,
+                openrouter_api_key=openrouter_api_key,
+                cache=response_cache,
+                rate_limiter=get_rate_limiter(target_provider, requests_per_minute=rpm, tokens_per_minute=tpm),
+                stream=stream,
+                base_url=base_url,
+                prompt_caching=prompt_cache,
+                transport=transport
             )
         
-        console.print("\n[green]✓[/green] Evaluation complete!\n")
+        evaluators = {}
+        for target_provider, target_model in target_specs:
+            evaluator = build_evaluator(target_provider, target_model)
+            name = target_name(evaluator)
+            if name in evaluators:
+                raise ValueError(f"Target {name} is listed more than once")
+            evaluators[name] = evaluator
+        judge_evaluator = build_evaluator(*judge_spec)
+        judge_evaluator = evaluators.get(target_name(judge_evaluator), judge_evaluator)
+        multi_run = MultiTargetRun(evaluators, judge_evaluator, prompt_text, dataset_data)
         
-        stats = calculate_statistics(
-            results["prompt_a"]["quality_scores"],
-            results["prompt_b"]["quality_scores"]
-        )
+        console.print(f"[green]✓[/green] Loaded prompt")
+        console.print(f"[green]✓[/green] Loaded dataset: {len(dataset_data)} test cases")
+        console.print(f"[green]✓[/green] Targets: {', '.join(evaluators)}")
+        console.print(f"[green]✓[/green] Judge: {target_name(judge_evaluator)}\n")
         
-        roi = calculate_roi(
-            results["prompt_a"]["avg_cost"],
-            results["prompt_b"]["avg_cost"],
-            results["prompt_a"]["avg_quality"],
-            results["prompt_b"]["avg_quality"],
-            num_requests=100000
-        )
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            console=console
+        ) as progress:
+            total = len(evaluators) * len(dataset_data)
+            task = progress.add_task(f"[cyan]Running {len(evaluators)} targets concurrently...", total=total)
+            
+            def update_progress(current, total):
+                progress.update(task, completed=current)
+            
+            results = multi_run.run(concurrency=concurrency, progress_callback=update_progress)
+            progress.update(task, completed=total)
         
-        table = Table(title="Test Results Summary", box=box.ROUNDED)
-        table.add_column("Metric", style="cyan", no_wrap=True)
-        table.add_column("Prompt A", style="magenta")
-        table.add_column("Prompt B", style="yellow")
-        table.add_column("Difference", style="green")
-        
-        quality_diff = ((results["prompt_a"]["avg_quality"] - results["prompt_b"]["avg_quality"]) 
-                       / results["prompt_b"]["avg_quality"] * 100)
-        time_diff = ((results["prompt_a"]["avg_time"] - results["prompt_b"]["avg_time"]) 
-                    / results["prompt_b"]["avg_time"] * 100)
-        tokens_diff = ((results["prompt_a"]["avg_tokens"] - results["prompt_b"]["avg_tokens"]) 
-                      / results["prompt_b"]["avg_tokens"] * 100)
-        cost_diff = ((results["prompt_a"]["avg_cost"] - results["prompt_b"]["avg_cost"]) 
-                    / results["prompt_b"]["avg_cost"] * 100)
+        console.print("\n[green]✓[/green] Comparison complete!\n")
+        present_multi_target(results, dataset, output)
         
-        table.add_row(
-            "Quality Score",
-            f"{results['prompt_a']['avg_quality']:.2f}/10",
-            f"{results['prompt_b']['avg_quality']:.2f}/10",
-            f"{quality_diff:+.1f}%"
-        )
-        table.add_row(
-            "Response Time",
-            f"{results['prompt_a']['avg_time']:.3f}s",
-            f"{results['prompt_b']['avg_time']:.3f}s",
-            f"{time_diff:+.1f}%"
-        )
-        table.add_row(
-            "Tokens/Response",
-            f"{results['prompt_a']['avg_tokens']:.0f}",
-            f"{results['prompt_b']['avg_tokens']:.0f}",
-            f"{tokens_diff:+.1f}%"
-        )
-        table.add_row(
-            "Cost/Response",
-            f"${results['prompt_a']['avg_cost']:.6f}",
-            f"${results['prompt_b']['avg_cost']:.6f}",
-            f"{cost_diff:+.1f}%"
+    except FileNotFoundError as e:
+        console.print(f"[red]Error: {e}[/red]")
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        import traceback
+        traceback.print_exc()
+
+@main.command()
+@click.option("--prompt-a", help="First prompt (text or file path)")
+@click.option("--prompt-b", help="Second prompt (text or file path)")
+@click.option("--dataset", default="customer_support", help="Dataset name or path (default: customer_support)")
+@click.option("--pilot-run", metavar="RUN_ID",
+              help="Use the scores of a previous run log as the pilot instead of running a new one")
+@click.option("--pilot-cases", default=20, type=click.IntRange(min=3), show_default=True,
+              help="Cases evaluated in a fresh pilot run")
+@click.option("--min-effect", default=0.5, type=click.FloatRange(min=0, min_open=True), show_default=True,
+              help="Smallest quality difference (1-10 scale) the full run should detect")
+@click.option("--alpha", default=0.05, type=click.FloatRange(0, 1, min_open=True, max_open=True), show_default=True,
+              help="Significance level")
+@click.option("--power", default=0.8, type=click.FloatRange(0, 1, min_open=True, max_open=True), show_default=True,
+              help="Probability of detecting --min-effect if it is real")
+@click.option("--provider", default="anthropic", type=click.Choice(['anthropic', 'openai', 'openrouter'], case_sensitive=False),
+              help="LLM provider to use (default: anthropic)")
+@click.option("--model", help="Model name (defaults based on provider)")
+@click.option("--anthropic-api-key", help="Anthropic API key (or use ANTHROPIC_API_KEY env var)")
+@click.option("--openai-api-key", help="OpenAI API key (or use OPENAI_API_KEY env var)")
+@click.option("--openrouter-api-key", help="OpenRouter API key (or use OPENROUTER_API_KEY env var)")
+@click.option("--concurrency", default=1, type=click.IntRange(min=1), show_default=True,
+              help="Concurrency of the pilot and of the projected run")
+@click.option("--judge-batch", default=0, type=click.IntRange(min=0), show_default=True,
+              help="Judge batch size of the pilot and of the projected run")
+@click.option("--rpm", type=click.FloatRange(min=1), help="Requests/minute used for the wall-time projection")
+@click.option("--base-url", help="API base URL override for the pilot, e.g. a local mock_server.py")
+@click.option("--runs-dir", default=DEFAULT_RUNS_DIR, show_default=True,
+              help="Directory for run logs (the pilot is logged here too)")
+@click.option("--cache/--no-cache", default=True, show_default=True,
+              help="Reuse stored responses for identical generation and judge requests")
+@click.option("--cache-dir", default=DEFAULT_CACHE_DIR, show_default=True,
+              help="Directory for the on-disk response cache")
+def plan(prompt_a, prompt_b, dataset, pilot_run, pilot_cases, min_effect, alpha, power, provider, model,
+         anthropic_api_key, openai_api_key, openrouter_api_key, concurrency, judge_batch, rpm, base_url, runs_dir,
+         cache, cache_dir):
+    """
+    Plan the dataset size for an A/B test from a pilot run.
+    
+    Estimates score variance and the correlation between the prompts from a
+    pilot, computes the number of cases needed to detect --min-effect at the
+    requested power, and projects calls, tokens, cost and wall time for it.
+    """
+    print_banner()
+    
+    try:
+        if pilot_run:
+            metadata, results = results_from_log(RunLog(pilot_run, runs_dir))
+            prompt_a_text, prompt_b_text = metadata["prompt_a"], metadata["prompt_b"]
+            dataset, provider, model_name = metadata["dataset"], metadata["provider"], metadata["model"]
+            dataset_data = load_dataset(dataset, sample=metadata.get("sample"), stratify_by=metadata.get("stratify_by"),
+                                        seed=metadata.get("seed", 0), use_index=metadata.get("use_index", False))
+            console.print(f"[green]✓[/green] Using run {pilot_run} as pilot: "
+                          f"{len(results['prompt_a']['results'])} cases\n")
+        else:
+            if not prompt_a or not prompt_b:
+                console.print("[red]Error: --prompt-a and --prompt-b are required unless --pilot-run is given[/red]")
+                return
+            api_keys = resolve_api_keys(provider, anthropic_api_key, openai_api_key, openrouter_api_key)
+            if api_keys is None:
+                return
+            prompt_a_text = load_prompt(prompt_a)
+            prompt_b_text = load_prompt(prompt_b)
+            dataset_data = load_dataset(dataset)
+            
+            evaluator = PromptEvaluator(
+                provider=provider,
+                api_key=api_keys[0],
+                model=model,
+                openai_api_key=api_keys[1],
+                openrouter_api_key=api_keys[2],
+                cache=ResponseCache(cache_dir) if cache else None,
+                rate_limiter=get_rate_limiter(provider, requests_per_minute=rpm),
+                base_url=base_url
+            )
+            model_name = evaluator.model
+            run_log = RunLog(new_run_id(), runs_dir)
+            run_log.write_metadata({
+                "prompt_a": prompt_a_text,
+                "prompt_b": prompt_b_text,
+                "dataset": dataset,
+                "provider": provider,
+                "model": model_name,
+                "pilot": True
+            })
+            
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                console=console
+            ) as progress:
+                task = progress.add_task(f"[cyan]Pilot run on {pilot_cases} cases...", total=pilot_cases)
+                
+                def update_progress(current, total):
+                    progress.update(task, completed=current)
+                
+                try:
+                    results = evaluator.evaluate_prompts(
+                        prompt_a_text,
+                        prompt_b_text,
+                        dataset_data,
+                        progress_callback=update_progress,
+                        concurrency=concurrency,
+                        judge_batch=judge_batch,
+                        max_cases=pilot_cases,
+                        on_case_complete=run_log.append_case
+                    )
+                finally:
+                    run_log.close()
+            console.print(f"[green]✓[/green] Pilot logged as run {run_log.run_id} "
+                          f"(reuse with --pilot-run {run_log.run_id})\n")
+        
+        analysis = power_analysis(
+            results["prompt_a"]["quality_scores"],
+            results["prompt_b"]["quality_scores"],
+            min_effect=min_effect,
+            alpha=alpha,
+            power=power
         )
         
+        table = Table(title="Pilot Estimates", box=box.ROUNDED)
+        table.add_column("Metric", style="cyan", no_wrap=True)
+        table.add_column("Value", style="magenta", justify="right")
+        table.add_row("Pilot cases", str(analysis["pilot_size"]))
+        table.add_row("Mean quality A / B", f"{analysis['mean_a']:.2f} / {analysis['mean_b']:.2f}")
+        table.add_row("Std dev A / B", f"{analysis['std_a']:.2f} / {analysis['std_b']:.2f}")
+        table.add_row("Correlation of A and B", f"{analysis['correlation']:.2f}")
+        table.add_row("Std dev of A − B", f"{analysis['std_difference']:.2f}")
+        table.add_row("Observed A − B", f"{analysis['observed_difference']:+.2f}")
+        table.add_row("Cases needed (paired, --paired)", f"{analysis['n_paired']:,}")
+        table.add_row("Cases needed (unpaired)", f"{analysis['n_unpaired']:,}")
         console.print(table)
-        console.print()
+        console.print(f"[dim]To detect a difference of {min_effect} with {power * 100:.0f}% power "
+                      f"at alpha={alpha}[/dim]\n")
         
-        winner = "Prompt A" if stats["winner"] == "a" else "Prompt B"
-        winner_style = "magenta" if stats["winner"] == "a" else "yellow"
+        cases_needed = analysis["n_paired"]
+        available = len(dataset_data)
+        estimate = estimate_run(
+            prompt_a_text, prompt_b_text, dataset_data, provider, model_name,
+            concurrency=concurrency,
+            judge_batch=judge_batch,
+            max_cases=cases_needed,
+            requests_per_minute=rpm,
+            runs_dir=runs_dir
+        )
+        if cases_needed > available:
+            console.print(f"[yellow]![/yellow] The dataset has only {available} cases; "
+                          f"projection extrapolated to {cases_needed:,} cases\n")
+            estimate = scale_estimate(estimate, cases_needed)
         
-        if stats["is_significant"]:
-            console.print(Panel.fit(
-                f"[bold {winner_style}]🏆 Winner: {winner}[/bold {winner_style}]\n"
-                f"[green]Confidence: {stats['confidence_pct']:.1f}%[/green]\n"
-                f"[dim]p-value: {stats['p_value']:.4f} (statistically significant)[/dim]",
-                border_style=winner_style
-            ))
+        print_estimate(estimate, provider, model_name, concurrency,
+                       title=f"Projected Run ({cases_needed:,} cases)")
+        if cases_needed > available:
+            console.print(f"[red]✗[/red] The dataset is too small for {power * 100:.0f}% power: "
+                          f"{available} cases available, {cases_needed:,} needed. Add cases or raise --min-effect")
         else:
-            console.print(Panel.fit(
-                f"[yellow]No statistically significant difference[/yellow]\n"
-                f"[dim]p-value: {stats['p_value']:.4f}[/dim]\n"
-                f"[dim]Both prompts perform similarly[/dim]",
-                border_style="yellow"
-            ))
+            console.print(f"[green]→[/green] Suggested run: --max-cases {cases_needed} --paired "
+                          f"--min-effect {min_effect}")
+    
+    except (FileNotFoundError, ValueError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+
+@main.command()
+@click.option("--prompt-a", help="First prompt (text or file path)")
+@click.option("--prompt-b", help="Second prompt (text or file path)")
+@click.option("--dataset", default="customer_support", help="Dataset name or path (default: customer_support)")
+@click.option("--sample", type=click.IntRange(min=1),
+              help="Evaluate a deterministic random sample of this many cases")
+@click.option("--stratify-by", metavar="FIELD",
+              help="Keep the proportions of this case field when sampling")
+@click.option("--seed", default=0, show_default=True, help="Random seed for --sample")
+@click.option("--max-cases", type=click.IntRange(min=1), help="Maximum number of test cases to enqueue")
+@click.option("--provider", default="anthropic", type=click.Choice(['anthropic', 'openai', 'openrouter'], case_sensitive=False),
+              help="LLM provider workers use (default: anthropic)")
+@click.option("--model", help="Model name (defaults based on provider)")
+@click.option("--queue", "queue_path", metavar="PATH",
+              help="Queue file; an existing queue is re-attached instead of created (default: results/queues/<RUN_ID>.sqlite3)")
+@click.option("--workers", default=0, type=click.IntRange(min=0), show_default=True,
+              help="Local worker processes to start (remote workers can join with `neo_test.py worker --queue PATH`)")
+@click.option("--worker-concurrency", default=1, type=click.IntRange(min=1), show_default=True,
+              help="Concurrent API calls per local worker")
+@click.option("--lease-seconds", default=DEFAULT_LEASE_SECONDS, type=click.FloatRange(min=1), show_default=True,
+              help="Seconds a worker holds a case before it is re-queued")
+@click.option("--max-attempts", default=DEFAULT_MAX_ATTEMPTS, type=click.IntRange(min=1), show_default=True,
+              help="Leases a case gets before it is marked failed")
+@click.option("--poll-interval", default=2.0, type=click.FloatRange(min=0.1), show_default=True,
+              help="Seconds between queue progress checks")
+@click.option("--base-url", help="API base URL override passed to local workers")
+@click.option("--paired", is_flag=True,
+              help="Analyse per-case differences (paired t-test, Wilcoxon, BCa bootstrap) instead of an unpaired t-test")
+@click.option("--covariate", type=click.Choice(sorted(COVARIATES)),
+              help="CUPED variance reduction using this pre-response covariate (implies --paired)")
+@click.option("--output", default="./results/report.html", help="Output path for HTML report")
+@click.option("--runs-dir", default=DEFAULT_RUNS_DIR, show_default=True,
+              help="Directory for run logs (merged results are logged here)")
+@click.option("--store/--no-store", default=True, show_default=True,
+              help="Append the merged responses to the results store and chart past runs in the report")
+@click.option("--store-dir", default=DEFAULT_STORE_DIR, show_default=True,
+              help="Directory of the columnar results store")
+def coordinator(prompt_a, prompt_b, dataset, sample, stratify_by, seed, max_cases, provider, model, queue_path,
+                workers, worker_concurrency, lease_seconds, max_attempts, poll_interval, base_url, paired, covariate,
+                output, runs_dir, store, store_dir):
+    """
+    Shard an A/B test into a durable queue and merge the workers' results.
+    
+    Every test case becomes a queue entry. Workers on this or other machines
+    (each with its own API key if needed) lease cases, evaluate them and
+    write the results back; cases whose lease expires are re-queued. Once
+    the queue is drained the results are analysed and reported as in a
+    local run.
+    """
+    print_banner()
+    paired = paired or bool(covariate)
+    
+    run_id = new_run_id()
+    queue_path = queue_path or os.path.join(DEFAULT_QUEUE_DIR, f"{run_id}.sqlite3")
+    local_workers = []
+    try:
+        work_queue = WorkQueue(queue_path)
+        try:
+            metadata = work_queue.metadata()
+            console.print(f"\n[green]✓[/green] Attached to queue {queue_path} (run {metadata['run_id']})")
+        except ValueError:
+            if not prompt_a or not prompt_b:
+                console.print("[red]Error: --prompt-a and --prompt-b are required to create a queue[/red]")
+                return
+            metadata = {
+                "run_id": run_id,
+                "prompt_a": load_prompt(prompt_a),
+                "prompt_b": load_prompt(prompt_b),
+                "dataset": dataset,
+                "provider": provider,
+                "model": model or DEFAULT_MODELS[provider],
+                "sample": sample,
+                "stratify_by": stratify_by,
+                "seed": seed,
+                "lease_seconds": lease_seconds
+            }
+            dataset_data = load_dataset(dataset, sample=sample, stratify_by=stratify_by, seed=seed)
+            cases = []
+            for idx, case in enumerate(dataset_data):
+                if max_cases is not None and idx >= max_cases:
+                    break
+                cases.append((idx, case))
+            enqueued = work_queue.initialize(metadata, cases, max_attempts=max_attempts)
+            console.print(f"\n[green]✓[/green] Queued {enqueued} test cases in {queue_path}")
+        
+        console.print(f"[green]✓[/green] Provider: {metadata['provider']} | Model: {metadata['model']}")
+        console.print(f"[dim]Add workers with: python neo_test.py worker --queue {queue_path}[/dim]")
         
+        worker_command = [sys.executable, os.path.abspath(__file__), "worker", "--queue", queue_path,
+                          "--concurrency", str(worker_concurrency)]
+        if base_url:
+            worker_command += ["--base-url", base_url]
+        for _ in range(workers):
+            local_workers.append(subprocess.Popen(worker_command, stdout=subprocess.DEVNULL,
+                                                  stderr=subprocess.DEVNULL))
+        if workers:
+            console.print(f"[green]✓[/green] Started {workers} local worker(s)")
         console.print()
         
-        os.makedirs(os.path.dirname(output) or "./results", exist_ok=True)
+        counts = work_queue.counts()
+        total = sum(counts.values())
+        requeued = 0
+        warned_idle = False
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            console=console
+        ) as progress:
+            task = progress.add_task("[cyan]Waiting for workers...", total=total)
+            while True:
+                requeued += work_queue.requeue_expired()
+                counts = work_queue.counts()
+                progress.update(task, completed=counts["done"] + counts["failed"],
+                                description=f"[cyan]{counts['leased']} leased, {counts['pending']} pending"
+                                            f"{f', {requeued} re-queued' if requeued else ''}...")
+                if counts["pending"] == 0 and counts["leased"] == 0:
+                    break
+                if local_workers and not warned_idle and all(w.poll() is not None for w in local_workers):
+                    warned_idle = True
+                    progress.console.print("[yellow]![/yellow] Local workers exited; waiting for remote workers "
+                                           "(Ctrl+C to stop, re-attach later with --queue)")
+                time.sleep(poll_interval)
         
-        generate_html_report(
-            results=results,
-            stats=stats,
-            roi=roi,
-            output_path=output,
-            prompt_a=prompt_a_text,
-            prompt_b=prompt_b_text,
-            dataset_name=dataset,
-            model_name=evaluator.model,
-            provider=provider
-        )
+        cases = work_queue.results()
+        failures = work_queue.failures()
+        work_queue.close()
+        console.print(f"\n[green]✓[/green] Queue drained: {counts['done']} done, {counts['failed']} failed"
+                      f"{f', {requeued} lease(s) re-queued' if requeued else ''}")
+        for idx, error in list(failures.items())[:5]:
+            console.print(f"[yellow]![/yellow] Case {idx} failed: {error}")
+        if not cases:
+            console.print("[red]Error: No test cases completed[/red]")
+            return
         
-        console.print(f"[green]✓[/green] Report generated: {output}")
+        run_log = RunLog(metadata["run_id"], runs_dir)
+        logged = {}
+        if run_log.exists():
+            _, logged, _ = run_log.read()
+        else:
+            run_log.write_metadata({key: value for key, value in metadata.items()
+                                    if key not in ("run_id", "lease_seconds", "max_attempts")})
+        for idx in sorted(cases):
+            if idx not in logged:
+                run_log.append_case(idx, *cases[idx])
+        run_log.close()
+        console.print(f"[green]✓[/green] Results merged into run {run_log.run_id} (log: {run_log.path})")
+        if store:
+            store_run(run_log, store_dir)
+        console.print()
         
-        try:
-            webbrowser.open(f"file://{os.path.abspath(output)}")
-            console.print("[green]✓[/green] Report opened in browser\n")
-        except:
-            console.print("[yellow]![/yellow] Could not open browser automatically\n")
+        ordered = [cases[idx] for idx in sorted(cases)]
+        results = {
+            "prompt_a": summarize_results([pair[0] for pair in ordered]),
+            "prompt_b": summarize_results([pair[1] for pair in ordered])
+        }
+        present_results(results, metadata["prompt_a"], metadata["prompt_b"], metadata["dataset"], output,
+                        metadata["provider"], metadata["model"], paired=paired, covariate=covariate,
+                        history=prompt_history(store_dir, metadata["prompt_a"], metadata["prompt_b"])
+                        if store else None)
         
+    except KeyboardInterrupt:
+        console.print(f"\n[yellow]![/yellow] Stopped. The queue is kept; re-attach with: --queue {queue_path}")
     except FileNotFoundError as e:
         console.print(f"[red]Error: {e}[/red]")
     except ValueError as e:
         console.print(f"[red]Error: {e}[/red]")
-    except Exception as e:
+    finally:
+        for local_worker in local_workers:
+            if local_worker.poll() is None:
+                local_worker.terminate()
+
+@main.command()
+@click.option("--queue", "queue_path", required=True, metavar="PATH", help="Queue file created by the coordinator")
+@click.option("--concurrency", default=1, type=click.IntRange(min=1), show_default=True,
+              help="Maximum number of concurrent API calls")
+@click.option("--worker-id", help="Identifier recorded on leases (default: host-pid-random)")
+@click.option("--lease-seconds", type=click.FloatRange(min=1),
+              help="Seconds a leased case stays reserved without renewal (default: the coordinator's setting)")
+@click.option("--poll-interval", default=5.0, type=click.FloatRange(min=0.1), show_default=True,
+              help="Seconds to wait while other workers hold every remaining case")
+@click.option("--anthropic-api-key", help="Anthropic API key (or use ANTHROPIC_API_KEY env var)")
+@click.option("--openai-api-key", help="OpenAI API key (or use OPENAI_API_KEY env var)")
+@click.option("--openrouter-api-key", help="OpenRouter API key (or use OPENROUTER_API_KEY env var)")
+@click.option("--base-url", help="API base URL override, e.g. a local mock_server.py")
+@click.option("--rpm", type=click.FloatRange(min=1), help="Starting requests/minute for the provider rate limiter")
+@click.option("--tpm", type=click.FloatRange(min=1), help="Starting tokens/minute for the provider rate limiter")
+@click.option("--cache/--no-cache", default=True, show_default=True,
+              help="Reuse stored responses for identical generation and judge requests")
+@click.option("--cache-dir", default=DEFAULT_CACHE_DIR, show_default=True,
+              help="Directory for the on-disk response cache")
+def worker(queue_path, concurrency, worker_id, lease_seconds, poll_interval, anthropic_api_key, openai_api_key,
+           openrouter_api_key, base_url, rpm, tpm, cache, cache_dir):
+    """
+    Evaluate test cases from a coordinator's queue until it is drained.
+    
+    Provider, model and prompts come from the queue; the API key is this
+    worker's own, so workers with different keys add up their quotas.
+    """
+    if not os.path.exists(queue_path):
+        console.print(f"[red]Error: Queue not found: {queue_path}[/red]")
+        return
+    
+    try:
+        work_queue = WorkQueue(queue_path)
+        metadata = work_queue.metadata()
+        provider = metadata["provider"]
+        api_keys = resolve_api_keys(provider, anthropic_api_key, openai_api_key, openrouter_api_key)
+        if api_keys is None:
+            return
+        
+        evaluator = PromptEvaluator(
+            provider=provider,
+            api_key=api_keys[0],
+            model=metadata["model"],
+            openai_api_key=api_keys[1],
+            openrouter_api_key=api_keys[2],
+            cache=ResponseCache(cache_dir) if cache else None,
+            rate_limiter=get_rate_limiter(provider, requests_per_minute=rpm, tokens_per_minute=tpm),
+            base_url=base_url
+        )
+        queue_worker = QueueWorker(
+            work_queue,
+            evaluator,
+            worker_id=worker_id,
+            concurrency=concurrency,
+            lease_seconds=lease_seconds or metadata.get("lease_seconds", DEFAULT_LEASE_SECONDS),
+            poll_interval=poll_interval
+        )
+        console.print(f"[green]✓[/green] Worker {queue_worker.worker_id} on run {metadata['run_id']} "
+                      f"({provider}:{metadata['model']})")
+        
+        def report_case(idx, result_a, result_b):
+            console.print(f"[dim]Case {idx}: A {result_a['quality']:.0f}/10, B {result_b['quality']:.0f}/10[/dim]")
+        
+        stats = queue_worker.run(on_case_complete=report_case)
+        work_queue.close()
+        console.print(f"[green]✓[/green] Queue drained: {stats['completed']} case(s) completed by this worker, "
+                      f"{stats['failed']} attempt(s) failed")
+    except ValueError as e:
         console.print(f"[red]Error: {e}[/red]")
-        import traceback
-        traceback.print_exc()
+
+@main.command()
+@click.option("--store-dir", default=DEFAULT_STORE_DIR, show_default=True, help="Directory of the results store")
+@click.option("--prompt", help="Only this prompt (text, file path, or the 16-digit hash shown by --group-by prompt)")
+@click.option("--dataset", help="Only runs on this dataset (name or path as given to `run`)")
+@click.option("--model", help="Only runs with this model")
+@click.option("--provider", help="Only runs with this provider")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M:%S"]),
+              help="Only runs created on or after this date")
+@click.option("--last", type=click.IntRange(min=1), help="Only the most recent N matching runs")
+@click.option("--group-by", default="prompt", type=click.Choice(GROUP_BY), show_default=True,
+              help="Aggregate per run, prompt, model, dataset or provider")
+@click.option("--json", "as_json", is_flag=True, help="Print the groups as JSON instead of a table")
+@click.option("--import-runs", is_flag=True,
+              help="First append run logs from --runs-dir that are not in the store yet (e.g. runs made with --no-store)")
+@click.option("--runs-dir", default=DEFAULT_RUNS_DIR, show_default=True, help="Run logs read by --import-runs")
+def query(store_dir, prompt, dataset, model, provider, since, last, group_by, as_json, import_runs, runs_dir):
+    """
+    Aggregate quality, latency, tokens and cost across stored runs.
+    
+    Every `run` appends its responses to a columnar results store; this
+    command filters them by prompt, dataset, model, provider and date and
+    aggregates them without calling any provider.
+    """
+    store = ResultsStore(store_dir)
+    try:
+        if import_runs:
+            imported = store.import_runs(runs_dir)
+            if not as_json:
+                console.print(f"[green]✓[/green] Imported {imported} run(s) from {runs_dir}")
+        started = time.perf_counter()
+        rows = store.query(prompt=load_prompt(prompt) if prompt else None, dataset=dataset, model=model,
+                           provider=provider, since=since.timestamp() if since else None, last=last,
+                           group_by=group_by)
+        elapsed = time.perf_counter() - started
+    except (OSError, ValueError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        return
+    
+    if as_json:
+        click.echo(json.dumps(rows, indent=2))
+        return
+    if not rows:
+        console.print(f"[yellow]No stored responses match (store: {store_dir})[/yellow]")
+        return
+    
+    table = Table(title=f"Results by {group_by}", box=box.ROUNDED)
+    table.add_column(group_by.capitalize(), style="cyan", max_width=40)
+    if group_by == "run":
+        table.add_column("Created")
+        table.add_column("Model")
+    else:
+        table.add_column("Runs", justify="right", no_wrap=True)
+    table.add_column("Responses", justify="right", no_wrap=True)
+    table.add_column("Quality", style="magenta", justify="right", no_wrap=True)
+    table.add_column("Latency (p90)", justify="right", no_wrap=True)
+    table.add_column("Tokens", justify="right", no_wrap=True)
+    table.add_column("Cost", style="green", justify="right", no_wrap=True)
+    
+    for row in rows:
+        if group_by == "run":
+            labels = [row["run_id"], time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created_at"])), row["model"]]
+        elif group_by == "prompt":
+            labels = [f"{row['prompt_hash']} {' '.join(row['prompt'].split())}", f"{row['runs']:,}"]
+        else:
+            labels = [row[group_by] or "-", f"{row['runs']:,}"]
+        table.add_row(
+            *labels,
+            f"{row['responses']:,}",
+            f"{row['quality_mean']:.2f}",
+            f"{row['time_mean']:.2f}s ({row['time_p90']:.2f}s)",
+            f"{row['tokens_mean']:.0f}",
+            f"${row['cost_total']:.4f}"
+        )
+    
+    console.print(table)
+    stats = store.stats()
+    console.print(f"[dim]{len(rows)} group(s) from {stats['runs']:,} stored runs ({stats['rows']:,} responses) "
+                  f"in {elapsed * 1000:.0f} ms[/dim]")
+
+@main.command(name="serve")
+@click.option("--host", default=DEFAULT_HOST, show_default=True,
+              help="Interface to bind; the API has no authentication, so keep it on a trusted network")
+@click.option("--port", default=DEFAULT_PORT, type=click.IntRange(min=0), show_default=True, help="Port to listen on")
+@click.option("--max-jobs", default=DEFAULT_MAX_JOBS, type=click.IntRange(min=1), show_default=True,
+              help="Jobs evaluated at the same time; later submissions queue")
+@click.option("--concurrency", default=DEFAULT_PROVIDER_CONCURRENCY, type=click.IntRange(min=1), show_default=True,
+              help="API calls in flight per provider, shared fairly by the running jobs")
+@click.option("--keep-results", default=DEFAULT_KEEP_RESULTS, type=click.IntRange(min=0), show_default=True,
+              help="Finished jobs whose results stay in memory; older ones are read back from their run logs")
+@click.option("--max-datasets", default=DEFAULT_MAX_DATASETS, type=click.IntRange(min=1), show_default=True,
+              help="Loaded datasets kept warm between jobs; the least recently used is dropped first")
+@click.option("--anthropic-api-key", help="Anthropic API key (or use ANTHROPIC_API_KEY env var)")
+@click.option("--openai-api-key", help="OpenAI API key (or use OPENAI_API_KEY env var)")
+@click.option("--openrouter-api-key", help="OpenRouter API key (or use OPENROUTER_API_KEY env var)")
+@click.option("--base-url", help="API base URL override, e.g. a local mock_server.py")
+@click.option("--rpm", type=click.FloatRange(min=1), help="Starting requests/minute for the provider rate limiters")
+@click.option("--tpm", type=click.FloatRange(min=1), help="Starting tokens/minute for the provider rate limiters")
+@click.option("--stream", is_flag=True,
+              help="Stream generations to measure time to first token and decode throughput")
+@click.option("--prompt-cache/--no-prompt-cache", default=True, show_default=True,
+              help="Mark the static prompt prefix for provider prompt caching")
+@click.option("--max-connections", default=DEFAULT_MAX_CONNECTIONS, type=click.IntRange(min=1), show_default=True,
+              help="Connection-pool size shared by every job")
+@click.option("--cache/--no-cache", default=True, show_default=True,
+              help="Reuse stored responses for identical generation and judge requests")
+@click.option("--cache-dir", default=DEFAULT_CACHE_DIR, show_default=True,
+              help="Directory for the on-disk response cache")
+@click.option("--runs-dir", default=DEFAULT_RUNS_DIR, show_default=True,
+              help="Directory for the jobs' run logs")
+@click.option("--store/--no-store", default=True, show_default=True,
+              help="Append every finished job to the results store")
+@click.option("--store-dir", default=DEFAULT_STORE_DIR, show_default=True,
+              help="Directory of the columnar results store")
+def serve_command(host, port, max_jobs, concurrency, keep_results, max_datasets, anthropic_api_key, openai_api_key, openrouter_api_key, base_url,
+                  rpm, tpm, stream, prompt_cache, max_connections, cache, cache_dir, runs_dir, store, store_dir):
+    """
+    Run a long-lived evaluation service for `run --server`.
+    
+    Provider clients, connection pools, loaded datasets and the response
+    cache stay warm between jobs. API keys live on the server; clients
+    only send prompts and settings.
+    """
+    api_keys = {
+        "anthropic": anthropic_api_key or os.getenv("ANTHROPIC_API_KEY"),
+        "openai": openai_api_key or os.getenv("OPENAI_API_KEY"),
+        "openrouter": openrouter_api_key or os.getenv("OPENROUTER_API_KEY"),
+    }
+    if not any(api_keys.values()):
+        console.print("[red]Error: No API keys. Set ANTHROPIC_API_KEY, OPENAI_API_KEY or OPENROUTER_API_KEY, "
+                      "or pass the --*-api-key options[/red]")
+        return
+    
+    service = EvaluationService(
+        dataset_loader=load_dataset,
+        api_keys=api_keys,
+        runs_dir=runs_dir,
+        cache_dir=cache_dir if cache else None,
+        store_dir=store_dir if store else None,
+        max_jobs=max_jobs,
+        provider_concurrency=concurrency,
+        keep_results=keep_results,
+        max_datasets=max_datasets,
+        base_url=base_url,
+        rpm=rpm,
+        tpm=tpm,
+        stream=stream,
+        prompt_caching=prompt_cache,
+        transport=TransportConfig(max_connections=max_connections)
+    )
+    try:
+        http_server = serve(service, host, port)
+    except OSError as e:
+        console.print(f"[red]Error: Cannot listen on {host}:{port}: {e}[/red]")
+        return
+    service.start()
+    url = f"http://{host}:{http_server.server_address[1]}"
+    console.print(f"[green]✓[/green] Evaluation service on {url} "
+                  f"(providers: {', '.join(name for name, key in api_keys.items() if key)})")
+    console.print(f"[dim]Submit with: neo_test.py --server {url} --prompt-a ... --prompt-b ...[/dim]")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[yellow]![/yellow] Shutting down")
+    finally:
+        http_server.server_close()
+        service.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,110 @@
+from typing import Dict, Optional
+
+# USD per million tokens. Keep in sync with the providers' public price lists.
+MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "claude-opus-4-20250514": {"input": 15.00, "output": 75.00},
+    "claude-sonnet-4-20250514": {"input": 3.00, "output": 15.00},
+    "claude-3-7-sonnet-20250219": {"input": 3.00, "output": 15.00},
+    "claude-3-5-sonnet-20241022": {"input": 3.00, "output": 15.00},
+    "claude-3-5-haiku-20241022": {"input": 0.80, "output": 4.00},
+    "claude-3-haiku-20240307": {"input": 0.25, "output": 1.25},
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+    "gpt-4.1": {"input": 2.00, "output": 8.00},
+    "gpt-4.1-mini": {"input": 0.40, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "output": 0.40},
+    "gpt-4-turbo": {"input": 10.00, "output": 30.00},
+    "o3-mini": {"input": 1.10, "output": 4.40},
+}
+
+# Aliases and families resolve by longest matching prefix, e.g.
+# "claude-sonnet-4-0" -> "claude-sonnet-4", "gpt-4o-2024-08-06" -> "gpt-4o".
+MODEL_FAMILY_PRICING: Dict[str, Dict[str, float]] = {
+    "claude-opus-4": {"input": 15.00, "output": 75.00},
+    "claude-sonnet-4": {"input": 3.00, "output": 15.00},
+    "claude-3-7-sonnet": {"input": 3.00, "output": 15.00},
+    "claude-3-5-sonnet": {"input": 3.00, "output": 15.00},
+    "claude-3.5-sonnet": {"input": 3.00, "output": 15.00},
+    "claude-3-5-haiku": {"input": 0.80, "output": 4.00},
+    "claude-3-haiku": {"input": 0.25, "output": 1.25},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "gpt-4.1-nano": {"input": 0.10, "output": 0.40},
+    "gpt-4.1-mini": {"input": 0.40, "output": 1.60},
+    "gpt-4.1": {"input": 2.00, "output": 8.00},
+    "gpt-4-turbo": {"input": 10.00, "output": 30.00},
+    "o3-mini": {"input": 1.10, "output": 4.40},
+}
+
+PROVIDER_DEFAULT_PRICING: Dict[str, Dict[str, float]] = {
+    "anthropic": {"input": 3.00, "output": 15.00},
+    "openai": {"input": 2.50, "output": 10.00},
+    "openrouter": {"input": 2.50, "output": 10.00},
+}
+
+# Prompt-cache prices as multiples of the input price. Anthropic bills cache
+# writes (5-minute TTL) at 1.25x and reads at 0.1x; OpenAI caches
+# automatically, with no write surcharge, and bills reads at 0.5x (0.25x for
+# the GPT-4.1 family). Models are matched by longest prefix.
+CACHE_PRICE_FACTORS: Dict[str, Dict[str, float]] = {
+    "claude": {"cache_read": 0.10, "cache_write": 1.25},
+    "gpt-4.1": {"cache_read": 0.25, "cache_write": 1.00},
+    "gpt": {"cache_read": 0.50, "cache_write": 1.00},
+    "o3": {"cache_read": 0.50, "cache_write": 1.00},
+}
+
+PROVIDER_CACHE_PRICE_FACTORS: Dict[str, Dict[str, float]] = {
+    "anthropic": {"cache_read": 0.10, "cache_write": 1.25},
+    "openai": {"cache_read": 0.50, "cache_write": 1.00},
+    "openrouter": {"cache_read": 0.50, "cache_write": 1.00},
+}
+
+# Share of the list price charged for requests sent through a provider's
+# asynchronous batch API. Providers without a batch API are absent.
+BATCH_PRICE_FACTOR: Dict[str, float] = {
+    "anthropic": 0.5,
+    "openai": 0.5,
+}
+
+
+def get_pricing(provider: str, model: str) -> Dict[str, float]:
+    """
+    Look up per-token prices for a model.
+
+    OpenRouter model ids ("anthropic/claude-3.5-sonnet") are matched on the
+    part after the vendor prefix. Unknown models fall back to the provider's
+    default model pricing.
+
+    Args:
+        provider: API provider name
+        model: Model name as sent to the API
+
+    Returns:
+        Dictionary with 'input', 'output', 'cache_read' and 'cache_write'
+        prices in USD per token
+    """
+    name = model.split("/", 1)[1] if "/" in model else model
+
+    per_million = MODEL_PRICING.get(name)
+    if per_million is None:
+        families = [family for family in MODEL_FAMILY_PRICING if name.startswith(family)]
+        if families:
+            per_million = MODEL_FAMILY_PRICING[max(families, key=len)]
+    if per_million is None:
+        per_million = PROVIDER_DEFAULT_PRICING.get(provider.lower(), PROVIDER_DEFAULT_PRICING["openai"])
+
+    prices = {kind: price / 1_000_000 for kind, price in per_million.items()}
+
+    cache_families = [family for family in CACHE_PRICE_FACTORS if name.startswith(family)]
+    if cache_families:
+        factors = CACHE_PRICE_FACTORS[max(cache_families, key=len)]
+    else:
+        factors = PROVIDER_CACHE_PRICE_FACTORS.get(provider.lower(), PROVIDER_CACHE_PRICE_FACTORS["openai"])
+    for kind, factor in factors.items():
+        prices[kind] = prices["input"] * factor
+    return prices
+
+
+def get_batch_price_factor(provider: str) -> Optional[float]:
+    """Return the batch API price factor for a provider, or None if it has no batch API."""
+    return BATCH_PRICE_FACTOR.get(provider.lower())
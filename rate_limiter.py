@@ -0,0 +1,330 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Mapping, Tuple
+
+DEFAULT_LIMITS = {
+    "anthropic": (50, 40_000),
+    "openai": (500, 30_000),
+    "openrouter": (200, 100_000),
+}
+
+MIN_REQUESTS_PER_MINUTE = 1.0
+MIN_TOKENS_PER_MINUTE = 1_000.0
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+_HEADER_NAMES = {
+    "requests": {
+        "limit": ("anthropic-ratelimit-requests-limit", "x-ratelimit-limit-requests"),
+        "remaining": ("anthropic-ratelimit-requests-remaining", "x-ratelimit-remaining-requests"),
+        "reset": ("anthropic-ratelimit-requests-reset", "x-ratelimit-reset-requests"),
+    },
+    "tokens": {
+        "limit": ("anthropic-ratelimit-tokens-limit", "x-ratelimit-limit-tokens"),
+        "remaining": ("anthropic-ratelimit-tokens-remaining", "x-ratelimit-remaining-tokens"),
+        "reset": ("anthropic-ratelimit-tokens-reset", "x-ratelimit-reset-tokens"),
+    },
+}
+
+_registry: Dict[str, "AdaptiveRateLimiter"] = {}
+_registry_lock = threading.Lock()
+
+
+def parse_reset_seconds(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Convert a rate-limit reset header into seconds from now.
+
+    Understands plain seconds (``Retry-After: 12``), OpenAI-style durations
+    (``6m0s``, ``250ms``) and Anthropic-style RFC 3339 timestamps.
+
+    Args:
+        value: Raw header value
+        now: Current wall-clock time (defaults to time.time())
+
+    Returns:
+        Seconds until reset, or None if the value is missing or unparseable
+    """
+    if not value:
+        return None
+    value = value.strip()
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if reset_at.tzinfo is None:
+        reset_at = reset_at.replace(tzinfo=timezone.utc)
+    current = time.time() if now is None else now
+    return max(0.0, reset_at.timestamp() - current)
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Read ``retry-after-ms`` or ``retry-after`` from response headers."""
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000.0)
+        except ValueError:
+            pass
+    return parse_reset_seconds(headers.get("retry-after"))
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``rate_per_minute``.
+
+    Reservations may drive the level negative; the deficit is the queue of
+    work already promised, so each caller is told how long to wait for its
+    own share instead of everyone polling.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = float(rate_per_minute)
+        self.level = self.rate_per_minute
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.level = min(self.rate_per_minute, self.level + elapsed * self.rate_per_minute / 60.0)
+        self.updated_at = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount`` from the bucket and return the wait in seconds."""
+        self._refill(now)
+        self.level -= amount
+        if self.level >= 0:
+            return 0.0
+        return -self.level * 60.0 / self.rate_per_minute
+
+    def adjust(self, amount: float, now: float) -> None:
+        """Correct a previous reservation by ``amount`` (positive returns capacity)."""
+        self._refill(now)
+        self.level = min(self.rate_per_minute, self.level + amount)
+
+    def set_rate(self, rate_per_minute: float, now: float) -> None:
+        self._refill(now)
+        self.rate_per_minute = float(rate_per_minute)
+        self.level = min(self.level, self.rate_per_minute)
+
+
+class AdaptiveRateLimiter:
+    """
+    Requests/min and tokens/min limiter for one provider.
+
+    Rates follow additive-increase / multiplicative-decrease: each successful
+    call nudges both rates up by ``increase_ratio``, and each congestion event
+    (429 or overload) halves them once and blocks all callers until the
+    server's Retry-After has passed. Requests that were already in flight
+    when the rates were cut belong to the same event, so their 429s only
+    extend the block. Server errors and dropped connections are retried
+    with backoff without touching the rates. Limits
+    advertised in rate-limit headers cap the growth, and a depleted
+    ``remaining`` count pauses callers until the advertised reset.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float,
+                 increase_ratio: float = 0.02, decrease_factor: float = 0.5):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Starting request rate
+            tokens_per_minute: Starting token rate
+            increase_ratio: Fractional rate increase after each successful call
+            decrease_factor: Multiplier applied to both rates after a 429
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.increase_ratio = increase_ratio
+        self.decrease_factor = decrease_factor
+        self.requests_ceiling: Optional[float] = None
+        self.tokens_ceiling: Optional[float] = None
+        self.blocked_until = 0.0
+        self.decreased_at = float("-inf")
+        self.throttle_events = 0
+        self._lock = threading.Lock()
+
+    def configure(self, requests_per_minute: Optional[float] = None,
+                  tokens_per_minute: Optional[float] = None) -> None:
+        """Reset the current rates, e.g. from CLI flags."""
+        now = time.monotonic()
+        with self._lock:
+            if requests_per_minute:
+                self.requests.set_rate(requests_per_minute, now)
+            if tokens_per_minute:
+                self.tokens.set_rate(tokens_per_minute, now)
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            delay = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(estimated_tokens, now),
+                self.blocked_until - now,
+            )
+        return max(0.0, delay)
+
+    async def acquire(self, estimated_tokens: int) -> float:
+        """
+        Wait for capacity for one request of about ``estimated_tokens`` tokens.
+
+        Returns:
+            Seconds spent waiting
+        """
+        delay = self._reserve(estimated_tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def acquire_sync(self, estimated_tokens: int) -> float:
+        """Blocking counterpart of acquire."""
+        delay = self._reserve(estimated_tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def _read_headers(self, headers: Mapping[str, str], now: float) -> None:
+        for dimension, names in _HEADER_NAMES.items():
+            bucket = self.requests if dimension == "requests" else self.tokens
+            ceiling = _as_float(_first_header(headers, names["limit"]))
+            if ceiling:
+                setattr(self, f"{dimension}_ceiling", ceiling)
+                if bucket.rate_per_minute > ceiling:
+                    bucket.set_rate(ceiling, now)
+
+            remaining = _as_float(_first_header(headers, names["remaining"]))
+            if remaining is not None and remaining <= 0:
+                reset = parse_reset_seconds(_first_header(headers, names["reset"]))
+                if reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+
+    def record_success(self, headers: Optional[Mapping[str, str]], estimated_tokens: int,
+                       actual_tokens: int) -> None:
+        """
+        Feed a successful response back into the limiter.
+
+        Args:
+            headers: Response headers (may be None)
+            estimated_tokens: Tokens reserved before the call
+            actual_tokens: Tokens reported in the response usage
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.tokens.adjust(estimated_tokens - actual_tokens, now)
+            if headers:
+                self._read_headers(headers, now)
+
+            for bucket, ceiling in ((self.requests, self.requests_ceiling), (self.tokens, self.tokens_ceiling)):
+                increased = bucket.rate_per_minute * (1 + self.increase_ratio)
+                if ceiling is not None:
+                    increased = min(increased, ceiling)
+                bucket.set_rate(max(bucket.rate_per_minute, increased), now)
+
+    def record_rate_limited(self, retry_after: Optional[float], attempt: int,
+                            sent_at: Optional[float] = None) -> float:
+        """
+        Register a 429/overload response and compute the backoff.
+
+        The rates are cut at most once per congestion event: a 429 for a
+        request sent before the last cut was caused by the old rate and
+        only extends the block.
+
+        Args:
+            retry_after: Server-provided Retry-After in seconds, if any
+            attempt: Zero-based retry attempt number
+            sent_at: time.monotonic() when the failed request was sent (None counts as new)
+
+        Returns:
+            Seconds to wait before retrying
+        """
+        now = time.monotonic()
+        if retry_after is None:
+            retry_after = backoff_seconds(attempt)
+        with self._lock:
+            self.throttle_events += 1
+            if sent_at is None or sent_at >= self.decreased_at:
+                self.requests.set_rate(max(MIN_REQUESTS_PER_MINUTE,
+                                           self.requests.rate_per_minute * self.decrease_factor), now)
+                self.tokens.set_rate(max(MIN_TOKENS_PER_MINUTE,
+                                         self.tokens.rate_per_minute * self.decrease_factor), now)
+                self.decreased_at = now
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            return max(0.0, self.blocked_until - now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current rates and counters, for logging and reports."""
+        with self._lock:
+            return {
+                "requests_per_minute": self.requests.rate_per_minute,
+                "tokens_per_minute": self.tokens.rate_per_minute,
+                "requests_ceiling": self.requests_ceiling,
+                "tokens_ceiling": self.tokens_ceiling,
+                "throttle_events": self.throttle_events,
+            }
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Jittered exponential backoff for retry ``attempt`` (zero-based), capped at a minute."""
+    return min(60.0, 2.0 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def _first_header(headers: Mapping[str, str], names: Tuple[str, ...]) -> Optional[str]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def _as_float(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def get_rate_limiter(provider: str, requests_per_minute: Optional[float] = None,
+                     tokens_per_minute: Optional[float] = None) -> AdaptiveRateLimiter:
+    """
+    Return the process-wide limiter for ``provider``, creating it on first use.
+
+    All evaluators for the same provider share one limiter so parallel runs
+    draw from the same quota.
+
+    Args:
+        provider: API provider name
+        requests_per_minute: Optional starting request rate override
+        tokens_per_minute: Optional starting token rate override
+
+    Returns:
+        The shared AdaptiveRateLimiter
+    """
+    provider = provider.lower()
+    with _registry_lock:
+        limiter = _registry.get(provider)
+        if limiter is None:
+            default_rpm, default_tpm = DEFAULT_LIMITS.get(provider, (60, 60_000))
+            limiter = AdaptiveRateLimiter(requests_per_minute or default_rpm,
+                                          tokens_per_minute or default_tpm)
+            _registry[provider] = limiter
+            return limiter
+    limiter.configure(requests_per_minute, tokens_per_minute)
+    return limiter
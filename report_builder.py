@@ -1,7 +1,121 @@
+import html
 import json
 import os
+import re
 from datetime import datetime
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Union, Callable, IO
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+CHART_JS_PATH = os.path.join(TEMPLATES_DIR, "vendor", "chart.umd.min.js")
+# Bundled renderer for the Chart.js subset the templates use, inlined when the full build is absent.
+CHART_LITE_PATH = os.path.join(TEMPLATES_DIR, "vendor", "chart-lite.js")
+
+# Per-response values stored for the client-side case viewer, in this order.
+CASE_FIELDS = ("response", "quality", "time", "ttft", "total_tokens", "cost", "throttle_time", "cached")
+
+_PLACEHOLDER = re.compile(r"\{\{([A-Z0-9_]+)\}\}")
+_SCRIPT_ESCAPES = {"<": "\\u003c", ">": "\\u003e", "&": "\\u0026", "\u2028": "\\u2028", "\u2029": "\\u2029"}
+
+Replacement = Union[str, Callable[[IO[str]], None]]
+
+
+@lru_cache(maxsize=None)
+def _template_parts(template_name: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Split a template once into literal chunks and the placeholder names between them."""
+    with open(os.path.join(TEMPLATES_DIR, template_name), "r") as f:
+        parts = _PLACEHOLDER.split(f.read())
+    return tuple(parts[0::2]), tuple(parts[1::2])
+
+
+def _write_report(template_name: str, replacements: Dict[str, Replacement], output_path: str) -> str:
+    """
+    Stream a template to ``output_path``, filling placeholders in one pass.
+
+    Values are either strings or callables that write their content directly
+    to the open file, so large sections never have to exist as one string.
+    """
+    chunks, names = _template_parts(template_name)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        for chunk, name in zip(chunks, names + ("",)):
+            f.write(chunk)
+            if not name:
+                continue
+            value = replacements.get(name, "")
+            if callable(value):
+                value(f)
+            else:
+                f.write(str(value))
+    return output_path
+
+
+def _to_json_serializable(obj):
+    """Convert numpy types to native Python types for JSON serialization."""
+    if isinstance(obj, dict):
+        return {k: _to_json_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_to_json_serializable(item) for item in obj]
+    elif hasattr(obj, 'item'):
+        return obj.item()
+    elif isinstance(obj, bool):
+        return bool(obj)
+    elif isinstance(obj, (int, float)):
+        return float(obj) if isinstance(obj, float) else int(obj)
+    return obj
+
+
+def _script_json(obj: Any) -> str:
+    """Compact JSON that is safe to embed inside a <script> element."""
+    text = json.dumps(_to_json_serializable(obj), ensure_ascii=False, separators=(",", ":"))
+    return re.sub("[<>&\u2028\u2029]", lambda match: _SCRIPT_ESCAPES[match.group()], text)
+
+
+def chart_js_tag() -> str:
+    """Inline script for the report charts: the vendored Chart.js build if present, else the bundled chart-lite.js."""
+    path = CHART_JS_PATH if os.path.exists(CHART_JS_PATH) else CHART_LITE_PATH
+    with open(path, "r", encoding="utf-8") as f:
+        return "<script>" + f.read().replace("</script", "<\\/script") + "</script>"
+
+
+def _case_row(result: Dict[str, Any]) -> List[Any]:
+    row = [result.get(field) for field in CASE_FIELDS]
+    row[2] = round(row[2], 3)
+    row[3] = round(row[3], 3) if row[3] is not None else None
+    row[5] = round(row[5], 6)
+    row[6] = round(row[6] or 0.0, 3)
+    row[7] = 1 if row[7] else 0
+    return row
+
+
+def _case_data_writer(results_a: List[Dict[str, Any]], results_b: List[Dict[str, Any]]) -> Callable[[IO[str]], None]:
+    """Write every test case once, as compact [input, [A fields], [B fields]] rows."""
+    def write(f: IO[str]) -> None:
+        f.write("[")
+        for idx, (result_a, result_b) in enumerate(zip(results_a, results_b)):
+            if idx:
+                f.write(",")
+            f.write(_script_json([result_a["input"], _case_row(result_a), _case_row(result_b)]))
+        f.write("]")
+    return write
+
+def _history_series(history: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Merge per-run store rows of both prompts into one series, oldest run first; None where a prompt did not run."""
+    runs: Dict[str, Dict[str, Any]] = {}
+    for side in ("a", "b"):
+        for row in history.get(f"prompt_{side}") or []:
+            run = runs.setdefault(row["run_id"], {
+                "label": datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M"),
+                "created_at": row["created_at"],
+                "run_id": row["run_id"],
+                "model": row["model"],
+                "dataset": row["dataset"],
+                "quality_a": None, "quality_b": None, "time_a": None, "time_b": None
+            })
+            run[f"quality_{side}"] = round(row["quality_mean"], 3)
+            run[f"time_{side}"] = round(row["time_mean"], 3)
+    return sorted(runs.values(), key=lambda run: run["created_at"])
+
 
 def generate_html_report(results: Dict[str, Any], 
                          stats: Dict[str, Any],
@@ -11,7 +125,9 @@ def generate_html_report(results: Dict[str, Any],
                          prompt_b: str = "",
                          dataset_name: str = "",
                          model_name: str = "",
-                         provider: str = "anthropic") -> str:
+                         provider: str = "anthropic",
+                         profile: Optional[List[Dict[str, Any]]] = None,
+                         history: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> str:
     """
     Generate a self-contained HTML report with embedded data and visualizations.
     
@@ -25,6 +141,8 @@ def generate_html_report(results: Dict[str, Any],
         dataset_name: Name of the dataset used
         model_name: Model name used for testing
         provider: LLM provider used
+        profile: Optional phase breakdown from Telemetry.phase_breakdown()
+        history: Optional per-run ResultsStore.query rows of each prompt, as {"prompt_a": [...], "prompt_b": [...]}
     
     Returns:
         Path to the generated HTML file
@@ -32,63 +150,122 @@ def generate_html_report(results: Dict[str, Any],
     evaluation_results = results
     stats_results = stats
     roi_results = roi
-    template_path = os.path.join(os.path.dirname(__file__), "templates", "report_template.html")
-    
-    with open(template_path, "r") as f:
-        html_template = f.read()
-    
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     winner_class = "" if stats_results.get("significant", stats_results.get("is_significant", False)) else "no-diff"
-    winner_label = "Prompt A" if stats_results["winner"] == "a" else "Prompt B"
-    winner_text = f"🏆 Winner: {winner_label}"
+    winner_text = f"🏆 Winner: {stats_results['winner']}"
     
     config_info = f"Provider: {provider} | Model: {model_name} | Dataset: {dataset_name}"
     if not stats_results["is_significant"]:
         winner_text = "📊 No Significant Difference Detected"
     
-    detailed_results_html = ""
-    for idx, (result_a, result_b) in enumerate(zip(
-        evaluation_results["prompt_a"]["results"],
-        evaluation_results["prompt_b"]["results"]
-    )):
-        detailed_results_html += f"""
-        <div class="test-case">
-            <div class="test-case-header">Test Case {idx + 1}: {result_a['input']}</div>
-            <div class="response-comparison">
-                <div class="response-box">
-                    <h4 class="prompt-a">Prompt A Response</h4>
-                    <div class="response-text">{result_a['response']}</div>
-                    <div class="response-score prompt-a">Quality: {result_a['quality']:.1f}/10</div>
-                    <div style="font-size: 0.8em; color: #666; margin-top: 5px;">
-                        Time: {result_a['time']:.2f}s | Tokens: {result_a['total_tokens']} | Cost: ${result_a['cost']:.4f}
-                    </div>
-                </div>
-                <div class="response-box">
-                    <h4 class="prompt-b">Prompt B Response</h4>
-                    <div class="response-text">{result_b['response']}</div>
-                    <div class="response-score prompt-b">Quality: {result_b['quality']:.1f}/10</div>
-                    <div style="font-size: 0.8em; color: #666; margin-top: 5px;">
-                        Time: {result_b['time']:.2f}s | Tokens: {result_b['total_tokens']} | Cost: ${result_b['cost']:.4f}
-                    </div>
-                </div>
-            </div>
-        </div>
-        """
-    
-    def convert_to_json_serializable(obj):
-        """Convert numpy types to native Python types for JSON serialization."""
-        if isinstance(obj, dict):
-            return {k: convert_to_json_serializable(v) for k, v in obj.items()}
-        elif isinstance(obj, (list, tuple)):
-            return [convert_to_json_serializable(item) for item in obj]
-        elif hasattr(obj, 'item'):
-            return obj.item()
-        elif isinstance(obj, bool):
-            return bool(obj)
-        elif isinstance(obj, (int, float)):
-            return float(obj) if isinstance(obj, float) else int(obj)
-        return obj
+    def format_percentiles(percentiles, side):
+        if not percentiles:
+            return "n/a"
+        return " / ".join(f"{percentiles[f'{p}_{side}']:.2f}" for p in ("p50", "p90", "p99"))
+    
+    latency = stats_results.get("latency")
+    ttft = stats_results.get("ttft")
+    if latency:
+        latency_verdict = latency["faster"] + " faster" if latency["is_significant"] else "No significant difference"
+        latency_significance = f"{latency_verdict} (Mann-Whitney p={latency['p_value']:.4f})"
+    elif evaluation_results.get("batch"):
+        latency_significance = "Not measured for batch API runs"
+    else:
+        latency_significance = ""
+    
+    if evaluation_results.get("batch"):
+        batch_cost = "Already applied"
+    elif roi_results.get("batch_total_cost_a") is not None:
+        batch_cost = f"${roi_results['batch_total_cost_a']:,.2f} / ${roi_results['batch_total_cost_b']:,.2f}"
+    else:
+        batch_cost = "n/a"
+    
+    early_stopping_html = ""
+    early_stopping = evaluation_results.get("early_stopping")
+    if early_stopping:
+        if early_stopping["stopped_early"]:
+            early_stopping_html = (
+                f"<strong>⏱️ Stopped early</strong> after {early_stopping['stopping_point']} of "
+                f"{early_stopping['planned_cases']} cases ({early_stopping['reason']}) — "
+                f"{early_stopping['calls_saved']} API calls saved"
+            )
+        else:
+            early_stopping_html = (
+                f"<strong>⏱️ Sequential test</strong> ran all {early_stopping['stopping_point']} planned cases "
+                f"({early_stopping['calls_made']} API calls)"
+            )
+        sequential = stats_results.get("sequential")
+        if sequential:
+            early_stopping_html += (
+                f" | Always-valid p-value: {sequential['p_value']:.4f} | "
+                f"95% CI for A − B: [{sequential['ci'][0]:.2f}, {sequential['ci'][1]:.2f}]"
+            )
+    
+    paired_html = ""
+    paired = stats_results.get("paired")
+    if paired:
+        paired_html = (
+            f"<strong>🔗 Paired analysis</strong> A − B = {paired['mean_difference']:+.2f} | "
+            f"95% CI [{paired['ci_difference'][0]:.2f}, {paired['ci_difference'][1]:.2f}] | "
+            f"BCa bootstrap [{paired['bootstrap_ci'][0]:.2f}, {paired['bootstrap_ci'][1]:.2f}] | "
+            f"Wilcoxon p={paired['wilcoxon_p_value']:.4f}"
+        )
+        if paired.get("cuped"):
+            paired_html += (
+                f" | CUPED ({paired.get('covariate')}): variance "
+                f"−{paired['cuped']['variance_reduction'] * 100:.1f}%"
+            )
+    
+    budget_html = ""
+    budget = evaluation_results.get("budget")
+    if budget:
+        limits = " and ".join(part for part in (
+            f"${budget['max_cost']:g}" if budget["max_cost"] else "",
+            f"{budget['deadline']:g}s" if budget["deadline"] else ""
+        ) if part)
+        if budget["truncated"]:
+            planned = f" of {budget['planned']}" if budget["planned"] is not None else ""
+            budget_html = (
+                f"<strong>⚠️ Truncated run</strong> stopped at the {budget['reason']} ({limits}) after "
+                f"{budget['evaluated']}{planned} cases — spent ${budget['spent']:.4f} in {budget['elapsed']:.0f}s. "
+                f"All statistics cover the evaluated cases only"
+            )
+            if budget["forecast_cost"] is not None:
+                budget_html += f" (full run forecast ~${budget['forecast_cost']:.2f})"
+        else:
+            budget_html = (
+                f"<strong>💵 Budget</strong> finished within {limits}: spent ${budget['spent']:.4f} "
+                f"in {budget['elapsed']:.0f}s"
+            )
+        if budget["judge_batch_from_case"] is not None:
+            budget_html += f" | Listwise judging from case {budget['judge_batch_from_case'] + 1} to fit the limits"
+    
+    dedupe_html = ""
+    dedupe = evaluation_results.get("dedupe")
+    if dedupe:
+        dedupe_html = (
+            f"<strong>🧬 Deduplicated</strong> {dedupe['total_inputs']} inputs into {dedupe['clusters']} "
+            f"near-duplicate clusters (similarity ≥ {dedupe['threshold']:g}); evaluated {dedupe['evaluated']} "
+            f"representing {dedupe['represented']} — ~{dedupe['calls_avoided']} API calls avoided"
+        )
+        if "effective_sample_size" in stats_results:
+            dedupe_html += (
+                f" | Weighted by cluster size: quality {stats_results['mean_a']:.2f} (A) vs "
+                f"{stats_results['mean_b']:.2f} (B), effective n = {stats_results['effective_sample_size']:.1f}"
+            )
+    
+    profile_html = ""
+    if profile:
+        profile_html = "<strong>🔍 Profile</strong> " + " | ".join(
+            f"{row['phase']}: {row['seconds']:.2f}s" + (f" ({row['count']}×)" if row["count"] > 1 else "")
+            for row in profile
+        )
+    
+    prompt_cache_a = evaluation_results["prompt_a"].get("prompt_cache_hit_ratio", 0.0)
+    prompt_cache_b = evaluation_results["prompt_b"].get("prompt_cache_hit_ratio", 0.0)
+    
+    history_series = _history_series(history) if history else []
     
     test_data = {
         "metrics": {
@@ -99,47 +276,199 @@ def generate_html_report(results: Dict[str, Any],
             "tokens_a": evaluation_results["prompt_a"]["avg_tokens"],
             "tokens_b": evaluation_results["prompt_b"]["avg_tokens"],
             "cost_a": evaluation_results["prompt_a"]["avg_cost"],
-            "cost_b": evaluation_results["prompt_b"]["avg_cost"]
+            "cost_b": evaluation_results["prompt_b"]["avg_cost"],
+            "prompt_cache_a": prompt_cache_a,
+            "prompt_cache_b": prompt_cache_b
         },
         "stats": stats_results,
         "roi": roi_results,
-        "quality_scores_a": evaluation_results["prompt_a"]["quality_scores"],
-        "quality_scores_b": evaluation_results["prompt_b"]["quality_scores"],
-        "test_cases": evaluation_results["prompt_a"]["results"]
+        "case_fields": CASE_FIELDS,
+        "history": history_series
     }
     
-    test_data_json = json.dumps(convert_to_json_serializable(test_data))
+    replacements = {
+        "TIMESTAMP": timestamp,
+        "WINNER_CLASS": winner_class,
+        "WINNER_TEXT": winner_text,
+        "CONFIDENCE": f"{stats_results['confidence_pct']:.2f}",
+        "P_VALUE": f"{stats_results['p_value']:.4f}",
+        "EFFECT_SIZE": f"{stats_results['effect_size']:.3f}",
+        "QUALITY_A": f"{evaluation_results['prompt_a']['avg_quality']:.2f}",
+        "QUALITY_B": f"{evaluation_results['prompt_b']['avg_quality']:.2f}",
+        "TIME_A": f"{evaluation_results['prompt_a']['avg_time']:.3f}",
+        "TIME_B": f"{evaluation_results['prompt_b']['avg_time']:.3f}",
+        "CONNECT_A": f"{evaluation_results['prompt_a'].get('avg_connect_time', 0.0):.3f}",
+        "CONNECT_B": f"{evaluation_results['prompt_b'].get('avg_connect_time', 0.0):.3f}",
+        "LATENCY_A": format_percentiles(latency, "a"),
+        "LATENCY_B": format_percentiles(latency, "b"),
+        "LATENCY_SIGNIFICANCE": latency_significance,
+        "TTFT_A": format_percentiles(ttft, "a"),
+        "TTFT_B": format_percentiles(ttft, "b"),
+        "TOKENS_A": f"{evaluation_results['prompt_a']['avg_tokens']:.0f}",
+        "TOKENS_B": f"{evaluation_results['prompt_b']['avg_tokens']:.0f}",
+        "COST_A": f"{evaluation_results['prompt_a']['avg_cost']:.4f}",
+        "COST_B": f"{evaluation_results['prompt_b']['avg_cost']:.4f}",
+        "PROMPT_CACHE_A": f"{prompt_cache_a * 100:.1f}",
+        "PROMPT_CACHE_B": f"{prompt_cache_b * 100:.1f}",
+        "CHEAPER_PROMPT": roi_results["cheaper_prompt"],
+        "COST_SAVINGS": f"{roi_results['cost_savings']:.2f}",
+        "SAVINGS_PCT": f"{roi_results['savings_pct']:.2f}",
+        "BETTER_VALUE": roi_results["better_value"],
+        "BATCH_COST": batch_cost,
+        "EARLY_STOPPING": early_stopping_html,
+        "PAIRED_ANALYSIS": paired_html,
+        "BUDGET": budget_html,
+        "BUDGET_CLASS": " truncated" if budget and budget["truncated"] else "",
+        "DEDUPE": dedupe_html,
+        "PROFILE": profile_html,
+        "HISTORY_CLASS": "" if len(history_series) > 1 else " hidden",
+        "CHART_JS": chart_js_tag(),
+        "TEST_DATA_JSON": _script_json(test_data),
+        "CASE_DATA_JSON": _case_data_writer(evaluation_results["prompt_a"]["results"],
+                                            evaluation_results["prompt_b"]["results"])
+    }
+    
+    return _write_report("report_template.html", replacements, output_path)
+
+def generate_tournament_report(tournament: Dict[str, Any],
+                               output_path: str,
+                               dataset_name: str = "",
+                               model_name: str = "",
+                               provider: str = "anthropic") -> str:
+    """
+    Generate a self-contained HTML leaderboard for a multi-variant tournament.
+    
+    Args:
+        tournament: Results from PromptTournament.run
+        output_path: Path where the HTML file should be saved
+        dataset_name: Name of the dataset used
+        model_name: Model name used for testing
+        provider: LLM provider used
+    
+    Returns:
+        Path to the generated HTML file
+    """
+    leaderboard = tournament["leaderboard"]
+    variants = tournament["variants"]
+    leader = leaderboard[0]
+    
+    rows_html = ""
+    for row in leaderboard:
+        summary = variants[row["variant"]]
+        ci = f"[{row['ci'][0]:.2f}, {row['ci'][1]:.2f}]" if row["n"] > 1 else "n/a"
+        dropped = f" (dropped in round {row['eliminated_in_round']})" if row.get("eliminated_in_round") else ""
+        rows_html += f"""
+                <tr class="{'eliminated' if dropped else ''}">
+                    <td>{row['rank']}</td>
+                    <td>{html.escape(row['variant'])}{dropped}</td>
+                    <td>{row['mean']:.2f}</td>
+                    <td>{ci}</td>
+                    <td>{row['prob_best'] * 100:.1f}%</td>
+                    <td>{row['n']}</td>
+                    <td>{summary['avg_time']:.2f}s</td>
+                    <td>${summary['avg_cost']:.4f}</td>
+                </tr>"""
+    
+    prompts_html = ""
+    for name, summary in variants.items():
+        prompts_html += f"""
+        <div class="prompt-box">
+            <h4>{html.escape(name)}</h4>
+            <pre>{html.escape(summary['prompt'])}</pre>
+        </div>"""
+    
+    allocation_summary = (
+        f"<strong>Strategy:</strong> {tournament['strategy']} | "
+        f"<strong>Stopped:</strong> {tournament['stop_reason']} | "
+        f"{tournament['responses']} of {tournament['full_grid_responses']} full-grid responses "
+        f"({tournament['calls_made']} API calls, ~{tournament['calls_saved']} saved)"
+    )
+    
+    tournament_data = {
+        "leaderboard": [
+            {"variant": row["variant"], "mean": row["mean"], "n": row["n"], "prob_best": row["prob_best"]}
+            for row in leaderboard
+        ]
+    }
     
     replacements = {
-        "{{TIMESTAMP}}": timestamp,
-        "{{WINNER_CLASS}}": winner_class,
-        "{{WINNER_TEXT}}": winner_text,
-        "{{CONFIDENCE}}": f"{stats_results['confidence_pct']:.2f}",
-        "{{P_VALUE}}": f"{stats_results['p_value']:.4f}",
-        "{{EFFECT_SIZE}}": f"{stats_results['effect_size']:.3f}",
-        "{{QUALITY_A}}": f"{evaluation_results['prompt_a']['avg_quality']:.2f}",
-        "{{QUALITY_B}}": f"{evaluation_results['prompt_b']['avg_quality']:.2f}",
-        "{{TIME_A}}": f"{evaluation_results['prompt_a']['avg_time']:.3f}",
-        "{{TIME_B}}": f"{evaluation_results['prompt_b']['avg_time']:.3f}",
-        "{{TOKENS_A}}": f"{evaluation_results['prompt_a']['avg_tokens']:.0f}",
-        "{{TOKENS_B}}": f"{evaluation_results['prompt_b']['avg_tokens']:.0f}",
-        "{{COST_A}}": f"{evaluation_results['prompt_a']['avg_cost']:.4f}",
-        "{{COST_B}}": f"{evaluation_results['prompt_b']['avg_cost']:.4f}",
-        "{{CHEAPER_PROMPT}}": roi_results["cheaper_prompt"],
-        "{{COST_SAVINGS}}": f"{roi_results['cost_savings']:.2f}",
-        "{{SAVINGS_PCT}}": f"{roi_results['savings_pct']:.2f}",
-        "{{BETTER_VALUE}}": roi_results["better_value"],
-        "{{DETAILED_RESULTS}}": detailed_results_html,
-        "{{TEST_DATA_JSON}}": test_data_json
+        "TIMESTAMP": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "CONFIG_INFO": f"Provider: {provider} | Model: {model_name} | Dataset: {dataset_name}",
+        "WINNER": html.escape(leader["variant"]),
+        "WINNER_MEAN": f"{leader['mean']:.2f}",
+        "WINNER_PROB_BEST": f"{leader['prob_best'] * 100:.1f}",
+        "ALLOCATION_SUMMARY": allocation_summary,
+        "LEADERBOARD_ROWS": rows_html,
+        "VARIANT_PROMPTS": prompts_html,
+        "CHART_JS": chart_js_tag(),
+        "TOURNAMENT_DATA_JSON": _script_json(tournament_data)
     }
     
-    html_output = html_template
-    for placeholder, value in replacements.items():
-        html_output = html_output.replace(placeholder, str(value))
+    return _write_report("tournament_template.html", replacements, output_path)
+
+def generate_multi_target_report(run: Dict[str, Any],
+                                 output_path: str,
+                                 dataset_name: str = "") -> str:
+    """
+    Generate a self-contained HTML comparison of several provider/model targets.
     
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    Args:
+        run: Results from MultiTargetRun.run
+        output_path: Path where the HTML file should be saved
+        dataset_name: Name of the dataset used
     
-    with open(output_path, "w") as f:
-        f.write(html_output)
+    Returns:
+        Path to the generated HTML file
+    """
+    leaderboard = run["leaderboard"]
+    targets = run["targets"]
+    leader = leaderboard[0]
+    
+    rows_html = ""
+    for row in leaderboard:
+        summary = targets[row["target"]]
+        latency = summary["latency"]
+        ci = f"[{row['ci'][0]:.2f}, {row['ci'][1]:.2f}]" if row["n"] > 1 else "n/a"
+        rows_html += f"""
+                <tr>
+                    <td>{row['rank']}</td>
+                    <td>{html.escape(row['target'])}</td>
+                    <td>{row['mean']:.2f}</td>
+                    <td>{ci}</td>
+                    <td>{row['prob_best'] * 100:.1f}%</td>
+                    <td>{latency['p50']:.2f} / {latency['p90']:.2f} / {latency['p99']:.2f}s</td>
+                    <td>${summary['avg_cost']:.4f}</td>
+                    <td>${summary['total_cost']:.4f}</td>
+                    <td>{summary['wall_time']:.1f}s</td>
+                </tr>"""
+    
+    run_summary = (
+        f"<strong>Targets:</strong> {len(targets)} | "
+        f"<strong>Responses:</strong> {run['responses']} | "
+        f"<strong>Wall time:</strong> {run['wall_time']:.1f}s "
+        f"(per-target runs sum to {run['sequential_wall_time']:.1f}s)"
+    )
+    
+    target_data = {
+        "leaderboard": [
+            {"target": row["target"], "mean": row["mean"], "n": row["n"], "prob_best": row["prob_best"],
+             "p50": targets[row["target"]]["latency"]["p50"]}
+            for row in leaderboard
+        ]
+    }
+    
+    replacements = {
+        "TIMESTAMP": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "CONFIG_INFO": f"Targets: {len(targets)} | Dataset: {dataset_name}",
+        "WINNER": html.escape(leader["target"]),
+        "WINNER_MEAN": f"{leader['mean']:.2f}",
+        "WINNER_PROB_BEST": f"{leader['prob_best'] * 100:.1f}",
+        "JUDGE": html.escape(run["judge"]),
+        "RUN_SUMMARY": run_summary,
+        "LEADERBOARD_ROWS": rows_html,
+        "PROMPT": html.escape(run["prompt"]),
+        "CHART_JS": chart_js_tag(),
+        "TARGET_DATA_JSON": _script_json(target_data)
+    }
     
-    return output_path
\ No newline at end of file
+    return _write_report("multi_target_template.html", replacements, output_path)
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+DEFAULT_CACHE_DIR = ".neo_cache"
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for generation and judge responses.
+
+    Entries live in a single SQLite file and are keyed by a SHA-256 digest of
+    everything that determines the provider's output. Entries older than
+    ``max_age_days`` are dropped, and once the store grows past
+    ``max_size_mb`` the least recently used entries are evicted.
+    """
+
+    EVICTION_INTERVAL = 100
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_size_mb: float = 512,
+                 max_age_days: float = 30):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            cache_dir: Directory holding the cache database
+            max_size_mb: Maximum total size of cached values in megabytes
+            max_age_days: Maximum age of an entry before it is discarded
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "responses.sqlite3")
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self.evict()
+
+    @staticmethod
+    def make_key(kind: str, provider: str, model: str, prompt: str, max_tokens: int) -> str:
+        """
+        Build the content address for a request.
+
+        Args:
+            kind: Call type ('generation' or 'judge')
+            provider: API provider name
+            model: Model name
+            prompt: Fully rendered prompt (judge prompts include the rubric template)
+            max_tokens: Output token limit of the request
+
+        Returns:
+            Hex SHA-256 digest identifying the request
+        """
+        payload = json.dumps([kind, provider, model, prompt, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for ``key`` or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store ``value`` under ``key``, evicting old entries periodically."""
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded.encode("utf-8")), now, now)
+            )
+            self._writes_since_eviction += 1
+            due = self._writes_since_eviction >= self.EVICTION_INTERVAL
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Apply age and size limits.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            self._writes_since_eviction = 0
+            removed = self._conn.execute(
+                "DELETE FROM entries WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+            ).rowcount
+
+            total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total_size <= self.max_size_bytes:
+                return removed
+
+            excess = total_size - self.max_size_bytes
+            stale_keys = []
+            for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                if excess <= 0:
+                    break
+                stale_keys.append((key,))
+                excess -= size
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", stale_keys)
+            return removed + len(stale_keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current store size."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "size_bytes": size}
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,466 @@
+import glob
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from concurrent processes are not serialized
+    fcntl = None
+
+from run_log import RunLog, DEFAULT_RUNS_DIR
+
+DEFAULT_STORE_DIR = os.path.join("results", "store")
+STORE_VERSION = 1
+PROMPT_PREVIEW_CHARS = 200
+# Runs of each prompt charted in a report's history.
+DEFAULT_HISTORY_RUNS = 50
+
+# One row per response: every test case contributes a Prompt A and a Prompt B row.
+ROW_COLUMNS = {
+    "run": np.int32,
+    "case_index": np.int32,
+    "side": np.uint8,
+    "input_hash": np.uint64,
+    "prompt_hash": np.uint64,
+    "quality": np.float32,
+    "time": np.float32,
+    "input_tokens": np.int32,
+    "output_tokens": np.int32,
+    "cost": np.float64,
+}
+
+# One row per run; the run's responses are rows row_start..row_end of the row columns.
+RUN_COLUMNS = {
+    "created_at": np.float64,
+    "provider": np.int32,
+    "model": np.int32,
+    "dataset": np.int32,
+    "prompt_a": np.uint64,
+    "prompt_b": np.uint64,
+    "row_start": np.int64,
+    "row_end": np.int64,
+    "superseded": np.uint8,
+}
+
+# Run attributes stored as codes into meta.json's value lists.
+DICTIONARY_COLUMNS = ("provider", "model", "dataset")
+
+# Run-level indexes: sorted (key, run) pairs, looked up with a binary search.
+INDEXES = {
+    "prompt_hash": ("prompt_a", "prompt_b"),
+    "dataset": ("dataset",),
+    "model": ("model",),
+}
+
+GROUP_BY = ("run", "prompt", "model", "dataset", "provider")
+
+
+def text_hash(text: str) -> int:
+    """Stable 64-bit hash of ``text`` (BLAKE2b), used for inputs and prompts."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def format_hash(value: int) -> str:
+    """Hash as 16 hex digits, the form accepted by ResultsStore.query(prompt=...)."""
+    return f"{int(value):016x}"
+
+
+def _timestamp(value: Optional[str]) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp() if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+class ResultsStore:
+    """
+    Append-only columnar store of per-response results across runs.
+
+    Each column is a flat binary file of one NumPy dtype under ``root``:
+    ``rows/<column>.bin`` with one row per response and ``runs/<column>.bin``
+    with one row per run. Provider, model and dataset names are dictionary
+    encoded, prompts and inputs are stored as 64-bit hashes, and
+    ``meta.json`` holds the row and run counts, the dictionaries and a
+    preview of every prompt. A run is appended by extending every column
+    file and then atomically replacing ``meta.json``, which is the commit
+    point: readers never see a partial run, and a crashed append is
+    truncated away by the next one. Appends from several processes are
+    serialized with a lock file.
+
+    A run's rows are contiguous, so the indexes on prompt hash, dataset and
+    model map keys to runs; a query binary-searches them, slices the
+    matching row ranges out of memory-mapped columns and aggregates them
+    with vectorized NumPy.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        """
+        Args:
+            root: Directory holding the store (created on the first append)
+        """
+        self.root = root
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def _read_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"version": STORE_VERSION, "rows": 0, "runs": 0, "run_ids": [],
+                    "values": {name: [] for name in DICTIONARY_COLUMNS}, "prompts": {}}
+
+    def _write_json(self, name: str, value: Any) -> None:
+        path = self._path(name)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _column(self, table: str, name: str, dtype, count: int) -> np.ndarray:
+        """First ``count`` values of a column, memory-mapped read-only."""
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._path(table, f"{name}.bin"), dtype=dtype, mode="r", shape=(count,))
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._path("store.lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _append_columns(self, table: str, schema: Dict[str, Any], committed: int,
+                        values: Dict[str, np.ndarray]) -> None:
+        """Truncate each column of ``table`` to ``committed`` values, then append ``values``."""
+        os.makedirs(self._path(table), exist_ok=True)
+        for name, dtype in schema.items():
+            with open(self._path(table, f"{name}.bin"), "ab") as f:
+                f.truncate(committed * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(values[name], dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _write_indexes(self, runs: int) -> None:
+        for name, columns in INDEXES.items():
+            keys = np.concatenate([np.asarray(self._column("runs", column, RUN_COLUMNS[column], runs))
+                                   for column in columns]).astype(np.uint64)
+            run_ids = np.tile(np.arange(runs, dtype=np.int32), len(columns))
+            order = np.lexsort((run_ids, keys))
+            path = self._path("index", f"{name}.npy")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, np.stack([keys[order], run_ids[order].astype(np.uint64)]))
+            os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def _response_rows(metadata: Dict[str, Any],
+                       cases: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]) -> Dict[str, np.ndarray]:
+        """Row columns (all but ``run``) of one run's completed cases, Prompt A before Prompt B."""
+        indices = sorted(cases)
+        count = 2 * len(indices)
+        prompt_hashes = (text_hash(metadata["prompt_a"]), text_hash(metadata["prompt_b"]))
+        rows = {
+            "case_index": np.repeat(np.asarray(indices, dtype=np.int32), 2),
+            "side": np.tile(np.array([0, 1], dtype=np.uint8), len(indices)),
+            "prompt_hash": np.tile(np.array(prompt_hashes, dtype=np.uint64), len(indices)),
+        }
+        results = [result for idx in indices for result in cases[idx]]
+        rows["input_hash"] = np.fromiter((text_hash(str(result.get("input", ""))) for result in results),
+                                         dtype=np.uint64, count=count)
+        for name in ("quality", "time", "input_tokens", "output_tokens", "cost"):
+            rows[name] = np.fromiter((result.get(name) or 0 for result in results),
+                                     dtype=ROW_COLUMNS[name], count=count)
+        return rows
+
+    def append_runs(self, entries: List[Tuple[str, Dict[str, Any],
+                                              Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]]]) -> int:
+        """
+        Append the responses of several runs in one commit.
+
+        Every column file is extended and synced once and ``meta.json`` is
+        replaced once, so importing many runs costs about as much as one.
+        A run appended again (e.g. after --resume) supersedes its earlier copy.
+
+        Args:
+            entries: (run_id, metadata, cases) per run; metadata holds prompt_a, prompt_b,
+                dataset, provider, model and created_at, cases is {index: (result_a, result_b)}
+
+        Returns:
+            Number of rows appended
+        """
+        if not entries:
+            return 0
+        batches = [(run_id, metadata, self._response_rows(metadata, cases)) for run_id, metadata, cases in entries]
+
+        with self._lock():
+            meta = self._read_meta()
+            first_row, first_run = meta["rows"], meta["runs"]
+            row_values: Dict[str, List[np.ndarray]] = {name: [] for name in ROW_COLUMNS}
+            run_values: Dict[str, List[Any]] = {name: [] for name in RUN_COLUMNS}
+            positions = {run_id: run for run, run_id in enumerate(meta["run_ids"])}
+            superseded = []
+            row = first_row
+            for run_id, metadata, rows in batches:
+                run = meta["runs"]
+                count = len(rows["side"])
+                rows["run"] = np.full(count, run, dtype=np.int32)
+                for name in ROW_COLUMNS:
+                    row_values[name].append(rows[name])
+                for name in DICTIONARY_COLUMNS:
+                    value = str(metadata.get(name) or "")
+                    values = meta["values"][name]
+                    if value not in values:
+                        values.append(value)
+                    run_values[name].append(values.index(value))
+                prompt_hashes = (text_hash(metadata["prompt_a"]), text_hash(metadata["prompt_b"]))
+                for prompt, value in zip((metadata["prompt_a"], metadata["prompt_b"]), prompt_hashes):
+                    meta["prompts"].setdefault(format_hash(value), prompt[:PROMPT_PREVIEW_CHARS])
+                if run_id in positions:
+                    superseded.append(positions[run_id])
+                positions[run_id] = run
+                run_values["created_at"].append(_timestamp(metadata.get("created_at")))
+                run_values["prompt_a"].append(prompt_hashes[0])
+                run_values["prompt_b"].append(prompt_hashes[1])
+                run_values["row_start"].append(row)
+                run_values["row_end"].append(row + count)
+                run_values["superseded"].append(0)
+                row += count
+                meta["runs"] = run + 1
+                meta["run_ids"].append(run_id)
+
+            for previous in superseded:
+                if previous >= first_run:
+                    run_values["superseded"][previous - first_run] = 1
+
+            self._append_columns("rows", ROW_COLUMNS, first_row,
+                                 {name: np.concatenate(values) for name, values in row_values.items()})
+            self._append_columns("runs", RUN_COLUMNS, first_run, run_values)
+            self._write_indexes(meta["runs"])
+            # Copies committed earlier are flagged in place, just before the new copies are committed.
+            with open(self._path("runs", "superseded.bin"), "r+b") as f:
+                for previous in superseded:
+                    if previous < first_run:
+                        f.seek(previous * np.dtype(RUN_COLUMNS["superseded"]).itemsize)
+                        f.write(np.uint8(1).tobytes())
+            meta["rows"] = row
+            self._write_json("meta.json", meta)
+        return row - first_row
+
+    def append_run(self, run_id: str, metadata: Dict[str, Any],
+                   cases: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]) -> int:
+        """
+        Append the responses of one run; see append_runs.
+
+        Returns:
+            Number of rows appended
+        """
+        return self.append_runs([(run_id, metadata, cases)])
+
+    def append_run_log(self, run_log: RunLog) -> int:
+        """Append the completed cases of a run log; returns the number of rows appended."""
+        metadata, cases, _ = run_log.read()
+        return self.append_run(run_log.run_id, metadata, cases)
+
+    def import_runs(self, runs_dir: str = DEFAULT_RUNS_DIR) -> int:
+        """
+        Append every run log in ``runs_dir`` that is not in the store yet, in one commit.
+
+        Returns:
+            Number of runs imported
+        """
+        known = set(self._read_meta()["run_ids"])
+        entries = []
+        for path in sorted(glob.glob(os.path.join(runs_dir, "*.jsonl"))):
+            run_id = os.path.splitext(os.path.basename(path))[0]
+            if run_id in known:
+                continue
+            try:
+                metadata, cases, _ = RunLog(run_id, runs_dir).read()
+            except ValueError:
+                continue
+            if cases and metadata.get("prompt_a") is not None and metadata.get("prompt_b") is not None:
+                entries.append((run_id, metadata, cases))
+        self.append_runs(entries)
+        return len(entries)
+
+    def resolve_prompt(self, prompt: str) -> int:
+        """Hash of ``prompt``, given as its text or as a 16-hex-digit hash already in the store."""
+        if len(prompt) == 16 and prompt in self._read_meta()["prompts"]:
+            return int(prompt, 16)
+        return text_hash(prompt)
+
+    def _lookup(self, name: str, key: int, runs: int) -> np.ndarray:
+        """Runs whose index ``name`` holds ``key``."""
+        try:
+            index = np.load(self._path("index", f"{name}.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            return np.zeros(0, dtype=np.int64)
+        keys = index[0]
+        start = np.searchsorted(keys, np.uint64(key), side="left")
+        end = np.searchsorted(keys, np.uint64(key), side="right")
+        matches = np.asarray(index[1][start:end], dtype=np.int64)
+        return np.unique(matches[matches < runs])
+
+    def query(self, prompt: Optional[str] = None, dataset: Optional[str] = None, model: Optional[str] = None,
+              provider: Optional[str] = None, since: Optional[float] = None, last: Optional[int] = None,
+              group_by: str = "prompt") -> List[Dict[str, Any]]:
+        """
+        Aggregate stored responses across runs.
+
+        Filters combine with AND. With ``prompt`` only that prompt's
+        responses count, even in runs where it was compared with another.
+
+        Args:
+            prompt: Prompt text or its 16-hex-digit hash
+            dataset: Dataset name or path as recorded by the run
+            model: Model name
+            provider: Provider name
+            since: Only runs created at or after this Unix timestamp
+            last: Only the most recent ``last`` matching runs
+            group_by: 'run', 'prompt', 'model', 'dataset' or 'provider'
+
+        Returns:
+            One dictionary per group with runs, responses, mean quality, mean and
+            p50/p90 latency, mean tokens and total and mean cost; run groups are
+            in creation order, other groups by descending response count
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        meta = self._read_meta()
+        runs = meta["runs"]
+        if runs == 0:
+            return []
+        run_columns = {name: self._column("runs", name, dtype, runs) for name, dtype in RUN_COLUMNS.items()}
+
+        selected = np.flatnonzero(np.asarray(run_columns["superseded"]) == 0)
+        prompt_key = self.resolve_prompt(prompt) if prompt is not None else None
+        lookups = [("prompt_hash", prompt_key)]
+        for name, value in (("dataset", dataset), ("model", model)):
+            if value is not None:
+                values = meta["values"][name]
+                lookups.append((name, values.index(value) if value in values else -1))
+        for name, key in lookups:
+            if key is None:
+                continue
+            if key < 0:
+                return []
+            selected = np.intersect1d(selected, self._lookup(name, key, runs), assume_unique=True)
+        if provider is not None:
+            values = meta["values"]["provider"]
+            code = values.index(provider) if provider in values else -1
+            selected = selected[np.asarray(run_columns["provider"])[selected] == code]
+        if since is not None:
+            selected = selected[np.asarray(run_columns["created_at"])[selected] >= since]
+        if last is not None:
+            selected = selected[np.argsort(np.asarray(run_columns["created_at"])[selected], kind="stable")][-last:]
+        if len(selected) == 0:
+            return []
+
+        # Row positions of the selected runs: concatenated row_start..row_end ranges.
+        starts = np.asarray(run_columns["row_start"])[selected]
+        lengths = np.asarray(run_columns["row_end"])[selected] - starts
+        offsets = np.repeat(starts - np.r_[0, np.cumsum(lengths)[:-1]], lengths)
+        positions = np.arange(lengths.sum()) + offsets
+
+        columns = {name: np.asarray(self._column("rows", name, dtype, meta["rows"])[positions])
+                   for name, dtype in ROW_COLUMNS.items() if name not in ("case_index", "side", "input_hash")}
+        if prompt_key is not None:
+            keep = columns["prompt_hash"] == np.uint64(prompt_key)
+            columns = {name: values[keep] for name, values in columns.items()}
+        if len(columns["run"]) == 0:
+            return []
+        return self._aggregate(columns, run_columns, meta, group_by)
+
+    @staticmethod
+    def _aggregate(columns: Dict[str, np.ndarray], run_columns: Dict[str, np.ndarray], meta: Dict[str, Any],
+                   group_by: str) -> List[Dict[str, Any]]:
+        run = columns["run"]
+        if group_by == "run":
+            keys = run.astype(np.uint64)
+        elif group_by == "prompt":
+            keys = columns["prompt_hash"]
+        else:
+            keys = np.asarray(run_columns[group_by])[run].astype(np.uint64)
+        unique_keys, groups = np.unique(keys, return_inverse=True)
+        groups = groups.ravel()
+        count = np.bincount(groups)
+
+        def mean(values: np.ndarray) -> np.ndarray:
+            return np.bincount(groups, weights=values.astype(np.float64)) / count
+
+        # Latency percentiles per group: sort by (group, time) and read each group's nearest ranks.
+        order = np.lexsort((columns["time"], groups))
+        starts = np.r_[0, np.cumsum(count)[:-1]]
+        sorted_time = columns["time"][order]
+        p50 = sorted_time[starts + np.floor(0.5 * (count - 1)).astype(np.int64)]
+        p90 = sorted_time[starts + np.floor(0.9 * (count - 1)).astype(np.int64)]
+        quality, latency = mean(columns["quality"]), mean(columns["time"])
+        tokens = mean(columns["input_tokens"] + columns["output_tokens"].astype(np.int64))
+        cost_total = np.bincount(groups, weights=columns["cost"])
+        first_run = np.full(len(unique_keys), np.iinfo(np.int64).max)
+        np.minimum.at(first_run, groups, run.astype(np.int64))
+        group_runs = np.unique(groups.astype(np.int64) * meta["runs"] + run)
+        run_counts = np.bincount(group_runs // meta["runs"], minlength=len(unique_keys))
+        created_at = np.asarray(run_columns["created_at"])
+
+        rows = []
+        for group, key in enumerate(unique_keys):
+            row: Dict[str, Any] = {
+                "runs": int(run_counts[group]),
+                "responses": int(count[group]),
+                "quality_mean": float(quality[group]),
+                "time_mean": float(latency[group]),
+                "time_p50": float(p50[group]),
+                "time_p90": float(p90[group]),
+                "tokens_mean": float(tokens[group]),
+                "cost_total": float(cost_total[group]),
+                "cost_mean": float(cost_total[group] / count[group]),
+            }
+            if group_by == "run":
+                run_index = int(key)
+                row.update({
+                    "run_id": meta["run_ids"][run_index],
+                    "created_at": float(created_at[run_index]),
+                    "provider": meta["values"]["provider"][run_columns["provider"][run_index]],
+                    "model": meta["values"]["model"][run_columns["model"][run_index]],
+                    "dataset": meta["values"]["dataset"][run_columns["dataset"][run_index]],
+                    "prompt_a": format_hash(run_columns["prompt_a"][run_index]),
+                    "prompt_b": format_hash(run_columns["prompt_b"][run_index]),
+                })
+            elif group_by == "prompt":
+                row["prompt_hash"] = format_hash(key)
+                row["prompt"] = meta["prompts"].get(format_hash(key), "")
+            else:
+                row[group_by] = meta["values"][group_by][int(key)]
+            rows.append((created_at[int(first_run[group])], row))
+
+        if group_by == "run":
+            rows.sort(key=lambda item: item[0])
+        else:
+            rows.sort(key=lambda item: -item[1]["responses"])
+        return [row for _, row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Row, run and distinct-value counts of the store."""
+        meta = self._read_meta()
+        return {
+            "rows": meta["rows"],
+            "runs": meta["runs"],
+            "prompts": len(meta["prompts"]),
+            "models": len(meta["values"]["model"]),
+            "datasets": len(meta["values"]["dataset"]),
+        }
@@ -0,0 +1,136 @@
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+DEFAULT_RUNS_DIR = os.path.join("results", "runs")
+
+CaseResults = Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]
+
+
+def new_run_id() -> str:
+    """Generate a sortable, unique run identifier."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class RunLog:
+    """
+    Append-only JSONL log of an evaluation run.
+
+    The first record describes the run (prompts, dataset, provider, model,
+    options). Every finished test case is appended and fsynced immediately,
+    so a crash loses at most the cases that were still in flight. A final
+    summary record is written when the run completes.
+    """
+
+    def __init__(self, run_id: str, runs_dir: str = DEFAULT_RUNS_DIR):
+        """
+        Args:
+            run_id: Identifier of the run (used as the file name)
+            runs_dir: Directory holding run logs
+        """
+        self.run_id = run_id
+        self.path = os.path.join(runs_dir, f"{run_id}.jsonl")
+        self._file = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            needs_newline = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, "rb") as existing:
+                    existing.seek(-1, os.SEEK_END)
+                    needs_newline = existing.read(1) != b"\n"
+            self._file = open(self.path, "a", encoding="utf-8")
+            if needs_newline:
+                self._file.write("\n")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def write_metadata(self, metadata: Dict[str, Any]) -> None:
+        """Record the run configuration; must be the first record of a new log."""
+        record = {"type": "run", "run_id": self.run_id, "created_at": datetime.now().isoformat()}
+        record.update(metadata)
+        self._append(record)
+
+    def append_case(self, idx: int, result_a: Dict[str, Any], result_b: Dict[str, Any]) -> None:
+        """Durably record one completed test case."""
+        self._append({"type": "case", "index": idx, "a": result_a, "b": result_b})
+
+    def write_summary(self, summary: Dict[str, Any]) -> None:
+        """Record end-of-run information such as early-stopping details."""
+        record = {"type": "summary", "finished_at": datetime.now().isoformat()}
+        record.update(summary)
+        self._append(record)
+
+    def read(self) -> Tuple[Dict[str, Any], CaseResults, Optional[Dict[str, Any]]]:
+        """
+        Load a run log.
+
+        A truncated trailing line (from a crash mid-write) is ignored.
+
+        Returns:
+            Tuple of (metadata, completed cases by dataset index, merged summary records or None)
+
+        Raises:
+            FileNotFoundError: If the log does not exist
+            ValueError: If the log has no run metadata record
+        """
+        if not self.exists():
+            raise FileNotFoundError(f"Run log not found: {self.path}")
+
+        metadata: Optional[Dict[str, Any]] = None
+        summary: Optional[Dict[str, Any]] = None
+        cases: CaseResults = {}
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("type") == "run":
+                    metadata = record
+                elif record.get("type") == "case":
+                    cases[record["index"]] = (record["a"], record["b"])
+                elif record.get("type") == "summary":
+                    # A resumed run can add later summaries; merge them so no outcome is lost.
+                    summary = dict(summary or {}, **record)
+
+        if metadata is None:
+            raise ValueError(f"Run log has no metadata record: {self.path}")
+        return metadata, cases, summary
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def results_from_log(run_log: RunLog) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Rebuild the evaluate_prompts result structure from a run log without calling any provider."""
+    # Imported here so reading logs does not pull in the evaluator for every user of this module.
+    from evaluator import summarize_results
+
+    metadata, cases, summary = run_log.read()
+    if not cases:
+        raise ValueError(f"Run {run_log.run_id} has no completed test cases")
+    ordered = [cases[idx] for idx in sorted(cases)]
+    results = {
+        "prompt_a": summarize_results([pair[0] for pair in ordered]),
+        "prompt_b": summarize_results([pair[1] for pair in ordered])
+    }
+    if summary and summary.get("early_stopping"):
+        results["early_stopping"] = summary["early_stopping"]
+    if summary and summary.get("batch"):
+        results["batch"] = summary["batch"]
+    if summary and summary.get("dedupe"):
+        results["dedupe"] = summary["dedupe"]
+    if summary and summary.get("budget"):
+        results["budget"] = summary["budget"]
+    return metadata, results
@@ -0,0 +1,752 @@
+"""
+Long-lived evaluation service.
+
+``neo_test.py serve`` starts an HTTP daemon that keeps provider clients,
+connection pools, loaded datasets and the response cache warm between
+experiments. Clients submit A/B jobs over a small JSON API, follow their
+progress as a stream of JSON lines, and fetch the results when they are
+done; ``neo_test.py run --server URL`` is such a client.
+
+Endpoints:
+
+    POST   /jobs               submit a job (see validate_spec), returns 202 with the job
+    GET    /jobs               all jobs, newest first
+    GET    /jobs/<id>          one job
+    GET    /jobs/<id>/events   job snapshots as JSON lines until the job finishes
+    GET    /jobs/<id>/results  evaluate_prompts results of a finished job
+    DELETE /jobs/<id>          cancel a queued or running job
+    GET    /health             service status
+    GET    /metrics            Prometheus metrics of every job run so far
+
+All jobs share one event loop. Up to ``max_jobs`` run at once and the rest
+wait in submission order. Running jobs on the same provider share that
+provider's concurrency budget through a FairLimiter, which hands freed
+slots to the jobs in turn, so a large job cannot starve small ones. They
+also share the process-wide rate limiter for the provider.
+
+Only the last ``keep_results`` finished jobs hold their results in memory;
+/results rebuilds older ones from the job's run log. Run logs are written
+and datasets loaded on worker threads, so their fsyncs and file scans do
+not stall the loop.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from evaluator import PromptEvaluator
+from rate_limiter import get_rate_limiter
+from response_cache import ResponseCache
+from results_store import ResultsStore
+from run_log import RunLog, DEFAULT_RUNS_DIR, new_run_id, results_from_log
+from stats_calculator import (calculate_statistics, calculate_paired_statistics, calculate_latency_statistics,
+                              sequential_test)
+from telemetry import Telemetry
+from transport import TransportConfig
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_JOBS = 4
+DEFAULT_PROVIDER_CONCURRENCY = 16
+DEFAULT_KEEP_RESULTS = 8
+DEFAULT_MAX_DATASETS = 8
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+PROVIDERS = ("anthropic", "openai", "openrouter")
+
+# Spec fields accepted by POST /jobs, with their defaults.
+SPEC_DEFAULTS = {
+    "prompt_a": None,
+    "prompt_b": None,
+    "dataset": "customer_support",
+    "sample": None,
+    "stratify_by": None,
+    "seed": 0,
+    "use_index": False,
+    "max_cases": None,
+    "provider": "anthropic",
+    "model": None,
+    "concurrency": 1,
+    "judge_batch": 0,
+    "sequential": False,
+    "min_effect": 0.5,
+    "check_every": 20,
+    "paired": False,
+}
+
+
+def validate_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check a submitted job spec and fill in defaults.
+
+    Prompts are sent as text; the dataset is a built-in name or a path on
+    the server's filesystem.
+
+    Raises:
+        ValueError: If a field is unknown, missing or out of range
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Job spec must be a JSON object")
+    unknown = sorted(set(spec) - set(SPEC_DEFAULTS))
+    if unknown:
+        raise ValueError(f"Unknown job fields: {', '.join(unknown)}")
+    spec = {**SPEC_DEFAULTS, **spec}
+    for field in ("prompt_a", "prompt_b"):
+        if not isinstance(spec[field], str) or not spec[field]:
+            raise ValueError(f"'{field}' is required")
+    spec["provider"] = str(spec["provider"]).lower()
+    if spec["provider"] not in PROVIDERS:
+        raise ValueError(f"Unknown provider '{spec['provider']}'. Use one of: {', '.join(PROVIDERS)}")
+    for field, minimum in (("concurrency", 1), ("judge_batch", 0), ("check_every", 1), ("sample", 1),
+                           ("max_cases", 1)):
+        value = spec[field]
+        if value is None and field in ("sample", "max_cases"):
+            continue
+        if not isinstance(value, int) or value < minimum:
+            raise ValueError(f"'{field}' must be an integer >= {minimum}")
+    return spec
+
+
+def json_default(value: Any) -> Any:
+    """Serialize numpy scalars (and anything else with ``item()``) in stats dictionaries."""
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class FairLimiter:
+    """
+    Concurrency limit shared by several jobs, granted to waiting jobs in turn.
+
+    An asyncio.Semaphore wakes waiters first-come first-served, so a job
+    that queued a thousand calls would hold every slot until its backlog
+    drained. This limiter keeps a queue per job and hands each freed slot
+    to the next job in round-robin order, so every running job gets an
+    equal share of the slots it can use. Must be used from one event loop.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Args:
+            capacity: Maximum number of slots held at once across all jobs
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.in_use = 0
+        self._waiters: "OrderedDict[str, deque]" = OrderedDict()
+
+    def share(self, job_id: str) -> "FairShare":
+        """Handle for ``job_id`` that can be used with ``async with`` like a semaphore."""
+        return FairShare(self, job_id)
+
+    async def acquire(self, job_id: str) -> None:
+        if self.in_use < self.capacity and not self._waiters:
+            self.in_use += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(job_id, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation.
+                self.release()
+            else:
+                self._discard(job_id, future)
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            job_id, queue = next(iter(self._waiters.items()))
+            future = queue.popleft()
+            del self._waiters[job_id]
+            if queue:
+                self._waiters[job_id] = queue
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_use -= 1
+
+    def _discard(self, job_id: str, future: asyncio.Future) -> None:
+        queue = self._waiters.get(job_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiters[job_id]
+
+
+class FairShare:
+    """One job's view of a FairLimiter."""
+
+    def __init__(self, limiter: FairLimiter, job_id: str):
+        self.limiter = limiter
+        self.job_id = job_id
+
+    async def __aenter__(self) -> None:
+        await self.limiter.acquire(self.job_id)
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.limiter.release()
+
+
+class Job:
+    """State of one submitted experiment, read by HTTP threads and written by the service loop."""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.spec = spec
+        self.status = "queued"
+        self.completed = 0
+        self.total: Optional[int] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.run_id: Optional[str] = None
+        self.model: Optional[str] = None
+        self.stats: Optional[Dict[str, Any]] = None
+        self.results: Optional[Dict[str, Any]] = None
+        self.task: Optional[asyncio.Task] = None
+        # Bumped on every change so /events can wait for the next one.
+        self.version = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-safe view of the job without its per-case results."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "completed": self.completed,
+            "total": self.total,
+            "provider": self.spec["provider"],
+            "model": self.model or self.spec["model"],
+            "dataset": self.spec["dataset"],
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "run_id": self.run_id,
+            "error": self.error,
+            "stats": self.stats,
+        }
+
+
+class EvaluationService:
+    """
+    Runs A/B jobs on a background event loop with clients and datasets kept warm.
+
+    Evaluators are cached per (provider, model), so their SDK clients and
+    the shared connection pools survive between jobs. Loaded datasets are
+    cached per loader arguments and reloaded when the file changes. Every
+    job is written to a run log, so ``neo_test.py --rebuild-report`` works
+    on the server's runs directory, and finished jobs are appended to the
+    results store when ``store_dir`` is set.
+    """
+
+    def __init__(self, dataset_loader: Callable[..., Any],
+                 api_keys: Optional[Dict[str, Optional[str]]] = None,
+                 runs_dir: str = DEFAULT_RUNS_DIR,
+                 cache_dir: Optional[str] = None,
+                 store_dir: Optional[str] = None,
+                 max_jobs: int = DEFAULT_MAX_JOBS,
+                 provider_concurrency: int = DEFAULT_PROVIDER_CONCURRENCY,
+                 keep_results: int = DEFAULT_KEEP_RESULTS,
+                 max_datasets: int = DEFAULT_MAX_DATASETS,
+                 base_url: Optional[str] = None,
+                 rpm: Optional[float] = None,
+                 tpm: Optional[float] = None,
+                 stream: bool = False,
+                 prompt_caching: bool = True,
+                 transport: Optional[TransportConfig] = None):
+        """
+        Initialize the service (call start() to run it).
+
+        Args:
+            dataset_loader: Callable (dataset, sample=, stratify_by=, seed=, use_index=) returning test cases
+            api_keys: API keys by provider name
+            runs_dir: Directory for the jobs' run logs
+            cache_dir: Directory for the shared response cache (None disables it)
+            store_dir: Results store that finished jobs are appended to (None disables it)
+            max_jobs: Jobs evaluated at the same time; later jobs queue
+            provider_concurrency: API calls in flight per provider across all running jobs
+            keep_results: Finished jobs whose results stay in memory; older ones are read from their run logs
+            max_datasets: Loaded datasets kept for reuse; the least recently used is dropped first
+            base_url: Optional API base URL override for every provider
+            rpm: Starting requests/minute for the provider rate limiters
+            tpm: Starting tokens/minute for the provider rate limiters
+            stream: Stream generations to measure time to first token
+            prompt_caching: Mark the static template prefix for provider prompt caching
+            transport: Connection-pool settings shared by every evaluator
+        """
+        self.dataset_loader = dataset_loader
+        self.api_keys = dict(api_keys or {})
+        self.runs_dir = runs_dir
+        self.cache_dir = cache_dir
+        self.store_dir = store_dir
+        self.max_jobs = max_jobs
+        self.provider_concurrency = provider_concurrency
+        self.keep_results = keep_results
+        self.max_datasets = max_datasets
+        self.base_url = base_url
+        self.rpm = rpm
+        self.tpm = tpm
+        self.stream = stream
+        self.prompt_caching = prompt_caching
+        self.transport = transport
+        self.telemetry = Telemetry()
+        self.started_at = time.time()
+
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._changed = threading.Condition()
+        self.loop = asyncio.new_event_loop()
+        self._thread: Optional[threading.Thread] = None
+        # Created on the loop thread by _setup().
+        self._job_slots: Optional[asyncio.Semaphore] = None
+        self._limiters: Dict[str, FairLimiter] = {}
+        self._evaluators: Dict[Tuple[str, Optional[str]], PromptEvaluator] = {}
+        self._datasets: "OrderedDict[Tuple, Tuple[Optional[float], Any, Optional[int]]]" = OrderedDict()
+        self._datasets_lock = threading.Lock()
+        # One thread writes every run log, so each log's records stay in order.
+        self._log_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="neo-run-log")
+        self._cache: Optional[ResponseCache] = None
+
+    def start(self) -> None:
+        """Start the event loop thread."""
+        self._thread = threading.Thread(target=self.loop.run_forever, name="neo-service-loop", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._setup(), self.loop).result()
+
+    def stop(self) -> None:
+        """Cancel running jobs and stop the event loop."""
+        for job in list(self.jobs.values()):
+            self.cancel(job.id)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread:
+            self._thread.join(timeout=10)
+        self._log_writer.shutdown(wait=True)
+        if self._cache is not None:
+            self._cache.close()
+
+    async def _setup(self) -> None:
+        self._job_slots = asyncio.Semaphore(self.max_jobs)
+        if self.cache_dir:
+            self._cache = ResponseCache(self.cache_dir)
+
+    def _notify(self, job: Job, **changes: Any) -> None:
+        with self._changed:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._changed.notify_all()
+
+    def submit(self, spec: Dict[str, Any]) -> Job:
+        """
+        Validate and queue a job.
+
+        Raises:
+            ValueError: If the spec is invalid or the provider has no API key on this server
+        """
+        spec = validate_spec(spec)
+        if not self.api_keys.get(spec["provider"]):
+            raise ValueError(f"The server has no API key for provider '{spec['provider']}'")
+        job = Job(spec)
+        with self._changed:
+            self.jobs[job.id] = job
+        self.loop.call_soon_threadsafe(self._schedule, job)
+        return job
+
+    def _schedule(self, job: Job) -> None:
+        if job.status != "queued":
+            return
+        job.task = self.loop.create_task(self._run_job(job))
+
+        def finished(task: asyncio.Task) -> None:
+            # A task cancelled before its first step never runs _run_job's handlers.
+            if not job.finished:
+                self._notify(job, status="cancelled", finished_at=time.time())
+
+        job.task.add_done_callback(finished)
+
+    def _evict_results(self) -> None:
+        """Drop the in-memory results of all but the last ``keep_results`` finished jobs."""
+        with self._changed:
+            done = [job for job in self.jobs.values() if job.results is not None]
+            done.sort(key=lambda job: job.finished_at or 0.0)
+            for job in done[:max(0, len(done) - self.keep_results)]:
+                job.results = None
+
+    def results(self, job: Job) -> Dict[str, Any]:
+        """Results of a finished job, from memory or, once evicted, from its run log."""
+        results = job.results
+        if results is not None:
+            return results
+        return results_from_log(RunLog(job.run_id, self.runs_dir))[1]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._changed:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        with self._changed:
+            return [job.snapshot() for job in reversed(self.jobs.values())]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are left as they are."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+
+        def cancel_on_loop() -> None:
+            if job.task is not None:
+                job.task.cancel()
+            elif not job.finished:
+                self._notify(job, status="cancelled", finished_at=time.time())
+
+        self.loop.call_soon_threadsafe(cancel_on_loop)
+        return job
+
+    def wait_for_change(self, job: Job, version: int, timeout: float) -> int:
+        """Block until ``job`` changes after ``version`` (or ``timeout`` passes); returns its current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: job.version != version, timeout=timeout)
+            return job.version
+
+    def health(self) -> Dict[str, Any]:
+        with self._changed:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            "status": "ok",
+            "uptime": time.time() - self.started_at,
+            "jobs": {status: statuses.count(status) for status in JOB_STATUSES},
+            "evaluators": [f"{provider}:{evaluator.model}" for (provider, _), evaluator in self._evaluators.items()],
+            "datasets": len(self._datasets),
+            "slots": {provider: {"capacity": limiter.capacity, "in_use": limiter.in_use}
+                      for provider, limiter in self._limiters.items()},
+        }
+
+    def _evaluator(self, provider: str, model: Optional[str]) -> PromptEvaluator:
+        key = (provider, model)
+        if key not in self._evaluators:
+            self._evaluators[key] = PromptEvaluator(
+                provider=provider,
+                api_key=self.api_keys.get("anthropic"),
+                model=model,
+                openai_api_key=self.api_keys.get("openai"),
+                openrouter_api_key=self.api_keys.get("openrouter"),
+                cache=self._cache,
+                rate_limiter=get_rate_limiter(provider, requests_per_minute=self.rpm, tokens_per_minute=self.tpm),
+                stream=self.stream,
+                base_url=self.base_url,
+                prompt_caching=self.prompt_caching,
+                transport=self.transport,
+                telemetry=self.telemetry
+            )
+        return self._evaluators[key]
+
+    def _limiter(self, provider: str) -> FairLimiter:
+        if provider not in self._limiters:
+            self._limiters[provider] = FairLimiter(self.provider_concurrency)
+        return self._limiters[provider]
+
+    def _dataset(self, spec: Dict[str, Any]) -> Tuple[Any, Optional[int]]:
+        """
+        Load a job's dataset and its size, reusing the cached copy while the file is unchanged.
+
+        Call it on a worker thread: loading, indexing and counting an
+        unindexed JSONL file each read the whole file.
+        """
+        options = {"sample": spec["sample"], "stratify_by": spec["stratify_by"], "seed": spec["seed"],
+                   "use_index": spec["use_index"]}
+        key = (spec["dataset"],) + tuple(options.values())
+        stamp = os.path.getmtime(spec["dataset"]) if os.path.exists(spec["dataset"]) else None
+        with self._datasets_lock:
+            cached = self._datasets.get(key)
+            if cached is not None and cached[0] == stamp:
+                self._datasets.move_to_end(key)
+                return cached[1], cached[2]
+        dataset = self.dataset_loader(spec["dataset"], **options)
+        size = len(dataset) if hasattr(dataset, "__len__") else None
+        with self._datasets_lock:
+            self._datasets[key] = (stamp, dataset, size)
+            self._datasets.move_to_end(key)
+            while len(self._datasets) > self.max_datasets:
+                self._datasets.popitem(last=False)
+        return dataset, size
+
+    async def _run_job(self, job: Job) -> None:
+        spec = job.spec
+        run_log: Optional[RunLog] = None
+        writes: List[asyncio.Future] = []
+
+        def write_log(method: Callable[..., None], *args: Any) -> asyncio.Future:
+            future = self.loop.run_in_executor(self._log_writer, method, *args)
+            writes.append(future)
+            return future
+
+        try:
+            async with self._job_slots:
+                self._notify(job, status="running", started_at=time.time())
+                evaluator = self._evaluator(spec["provider"], spec["model"])
+                dataset, total = await asyncio.to_thread(self._dataset, spec)
+                if spec["max_cases"]:
+                    total = spec["max_cases"] if total is None else min(total, spec["max_cases"])
+
+                run_log = RunLog(new_run_id(), self.runs_dir)
+                await write_log(run_log.write_metadata, {
+                    "prompt_a": spec["prompt_a"],
+                    "prompt_b": spec["prompt_b"],
+                    "dataset": spec["dataset"],
+                    "provider": spec["provider"],
+                    "model": evaluator.model,
+                    "sequential": spec["sequential"],
+                    "min_effect": spec["min_effect"],
+                    "paired": spec["paired"],
+                    "covariate": None,
+                    "sample": spec["sample"],
+                    "stratify_by": spec["stratify_by"],
+                    "seed": spec["seed"],
+                    "use_index": spec["use_index"],
+                    "batch": False,
+                    "judge_batch": spec["judge_batch"],
+                    "max_cases": spec["max_cases"],
+                    "check_every": spec["check_every"],
+                    "job_id": job.id
+                })
+                self._notify(job, run_id=run_log.run_id, model=evaluator.model, total=total)
+
+                def stop_when_decided(scores_a, scores_b):
+                    decision = sequential_test(scores_a, scores_b, min_effect=spec["min_effect"])["decision"]
+                    return None if decision == "continue" else decision
+
+                def progress(completed, planned):
+                    self._notify(job, completed=completed, total=planned)
+
+                results = await evaluator.evaluate_prompts_async(
+                    spec["prompt_a"],
+                    spec["prompt_b"],
+                    dataset,
+                    progress_callback=progress,
+                    concurrency=spec["concurrency"],
+                    judge_batch=spec["judge_batch"],
+                    max_cases=spec["max_cases"],
+                    stopping_rule=stop_when_decided if spec["sequential"] else None,
+                    check_every=spec["check_every"],
+                    on_case_complete=lambda idx, result_a, result_b: write_log(run_log.append_case, idx,
+                                                                               result_a, result_b),
+                    total=total,
+                    semaphore=self._limiter(spec["provider"]).share(job.id)
+                )
+                if results.get("early_stopping"):
+                    write_log(run_log.write_summary, {"early_stopping": results["early_stopping"]})
+                await asyncio.gather(*writes)
+                if self.store_dir is not None:
+                    await write_log(run_log.close)
+                    # Appends fsync every column, so keep them off the loop the other jobs run on.
+                    await asyncio.to_thread(ResultsStore(self.store_dir).append_run_log, run_log)
+                stats = summary_statistics(results, paired=spec["paired"])
+                self._notify(job, status="done", results=results, stats=stats, finished_at=time.time())
+                self._evict_results()
+        except asyncio.CancelledError:
+            self._notify(job, status="cancelled", finished_at=time.time())
+        except Exception as error:
+            self._notify(job, status="failed", error=f"{type(error).__name__}: {error}", finished_at=time.time())
+        finally:
+            if run_log is not None:
+                # Queued behind the job's pending writes on the writer thread.
+                self._log_writer.submit(run_log.close)
+
+
+def summary_statistics(results: Dict[str, Any], paired: bool = False) -> Dict[str, Any]:
+    """Quality and latency comparison of a finished job, made JSON-safe."""
+    scores_a = results["prompt_a"]["quality_scores"]
+    scores_b = results["prompt_b"]["quality_scores"]
+    if len(scores_a) < 2:
+        return {"cases": len(scores_a)}
+    stats = calculate_paired_statistics(scores_a, scores_b) if paired else calculate_statistics(scores_a, scores_b)
+    stats["latency"] = calculate_latency_statistics(
+        [r["time"] for r in results["prompt_a"]["results"]],
+        [r["time"] for r in results["prompt_b"]["results"]]
+    )
+    stats["cases"] = len(scores_a)
+    return json.loads(json.dumps(stats, default=json_default))
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "NeoService/1.0"
+    protocol_version = "HTTP/1.1"
+    service: EvaluationService = None
+    # Seconds between keep-alive snapshots on /events while nothing changes.
+    heartbeat = 15.0
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: Any, content_type: str = "application/json") -> None:
+        data = body if isinstance(body, bytes) else json.dumps(body, default=json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, {"error": message})
+
+    def _route(self) -> Tuple[List[str], Optional[Job]]:
+        parts = [part for part in urlparse(self.path).path.split("/") if part]
+        job = self.service.get(parts[1]) if len(parts) >= 2 and parts[0] == "jobs" else None
+        return parts, job
+
+    def _send_events(self, job: Job) -> None:
+        """Stream job snapshots as JSON lines (chunked) until the job finishes."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        version = -1
+        while True:
+            current = self.service.wait_for_change(job, version, self.heartbeat)
+            version = current
+            line = (json.dumps(job.snapshot(), default=json_default) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+            self.wfile.flush()
+            if job.finished:
+                break
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self) -> None:
+        parts, job = self._route()
+        if parts == ["health"]:
+            return self._send(200, self.service.health())
+        if parts == ["metrics"]:
+            return self._send(200, self.service.telemetry.prometheus_text().encode("utf-8"),
+                              content_type="text/plain; version=0.0.4")
+        if parts == ["jobs"]:
+            return self._send(200, {"jobs": self.service.list_jobs()})
+        if job is None:
+            return self._error(404, f"No route or job for {self.path}")
+        if len(parts) == 2:
+            return self._send(200, job.snapshot())
+        if parts[2:] == ["events"]:
+            return self._send_events(job)
+        if parts[2:] == ["results"]:
+            if job.status != "done":
+                return self._error(409, f"Job {job.id} is {job.status}")
+            try:
+                return self._send(200, self.service.results(job))
+            except (FileNotFoundError, ValueError) as error:
+                return self._error(410, f"Results of job {job.id} are no longer available: {error}")
+        self._error(404, f"No route for {self.path}")
+
+    def do_POST(self) -> None:
+        parts, _ = self._route()
+        if parts != ["jobs"]:
+            return self._error(404, f"No route for {self.path}")
+        try:
+            spec = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            job = self.service.submit(spec)
+        except (ValueError, json.JSONDecodeError) as error:
+            return self._error(400, str(error))
+        self._send(202, job.snapshot())
+
+    def do_DELETE(self) -> None:
+        parts, job = self._route()
+        if job is None or len(parts) != 2:
+            return self._error(404, f"No job at {self.path}")
+        self.service.cancel(job.id)
+        self._send(202, job.snapshot())
+
+
+def serve(service: EvaluationService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """
+    Build the HTTP server for a started service (call ``serve_forever()`` on the result to run it).
+
+    Args:
+        service: Service whose jobs the server exposes
+        host: Interface to bind; the API has no authentication, so keep it on localhost or a trusted network
+        port: Port to listen on (0 picks a free port)
+    """
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+class ServiceError(Exception):
+    """The evaluation service rejected a request or could not be reached."""
+
+
+class ServiceClient:
+    """Thin HTTP client for a running evaluation service."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        """
+        Args:
+            base_url: Service URL, e.g. http://127.0.0.1:8765
+            timeout: Seconds to wait for a response (event streams wait indefinitely)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> Any:
+        try:
+            response = httpx.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except httpx.HTTPError as error:
+            raise ServiceError(f"Cannot reach the evaluation service at {self.base_url}: {error}") from error
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            raise ServiceError(message)
+        return response.json()
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health")
+
+    def submit(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job; returns its first snapshot (with ``job_id``)."""
+        return self._request("POST", "/jobs", json=spec)
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def results(self, job_id: str) -> Dict[str, Any]:
+        return self._request("GET", f"/jobs/{job_id}/results")
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        return self._request("DELETE", f"/jobs/{job_id}")
+
+    def events(self, job_id: str) -> Iterator[Dict[str, Any]]:
+        """Yield job snapshots as the service reports changes, ending with the finished job."""
+        timeout = httpx.Timeout(self.timeout, read=None)
+        try:
+            with httpx.stream("GET", f"{self.base_url}/jobs/{job_id}/events", timeout=timeout) as response:
+                if response.status_code >= 400:
+                    response.read()
+                    raise ServiceError(response.text)
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
+        except httpx.HTTPError as error:
+            raise ServiceError(f"Lost the event stream of job {job_id}: {error}") from error
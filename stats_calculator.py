@@ -1,33 +1,54 @@
-import scipy.stats as stats
+# scipy.stats is imported inside the functions that use it: it takes ~0.4s
+# to load and most CLI paths (--help, --dry-run, argument errors) never need it.
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-def calculate_statistics(prompt_a_scores: List[float], prompt_b_scores: List[float]) -> Dict[str, Any]:
+def calculate_statistics(prompt_a_scores: List[float], prompt_b_scores: List[float],
+                         weights: Optional[List[float]] = None) -> Dict[str, Any]:
     """
     Perform statistical analysis comparing two sets of quality scores.
     
+    With ``weights`` (one per test case, e.g. the size of the near-duplicate
+    cluster a case stands for) means and standard deviations are weighted,
+    and standard errors and the t-test use Kish's effective sample size
+    (sum w)^2 / sum w^2 instead of the number of cases.
+    
     Args:
         prompt_a_scores: List of quality scores (1-10) for Prompt A
         prompt_b_scores: List of quality scores (1-10) for Prompt B
+        weights: Optional per-case weights shared by both prompts
     
     Returns:
         Dictionary containing statistical metrics including p-value, confidence, winner, etc.
     """
+    import scipy.stats as stats
     if len(prompt_a_scores) == 0 or len(prompt_b_scores) == 0:
         raise ValueError("Score lists cannot be empty")
     
     prompt_a_array = np.array(prompt_a_scores)
     prompt_b_array = np.array(prompt_b_scores)
     
-    t_statistic, p_value = stats.ttest_ind(prompt_a_array, prompt_b_array)
-    
-    mean_a = np.mean(prompt_a_array)
-    mean_b = np.mean(prompt_b_array)
-    std_a = np.std(prompt_a_array, ddof=1)
-    std_b = np.std(prompt_b_array, ddof=1)
+    if weights is None:
+        t_statistic, p_value = stats.ttest_ind(prompt_a_array, prompt_b_array)
+        
+        mean_a = np.mean(prompt_a_array)
+        mean_b = np.mean(prompt_b_array)
+        std_a = np.std(prompt_a_array, ddof=1)
+        std_b = np.std(prompt_b_array, ddof=1)
+        n_a, n_b = len(prompt_a_array), len(prompt_b_array)
+    else:
+        weight_array = np.asarray(weights, dtype=float)
+        if len(weight_array) != len(prompt_a_array) or len(weight_array) != len(prompt_b_array):
+            raise ValueError("weights must have one entry per test case")
+        mean_a, std_a = _weighted_mean_std(prompt_a_array, weight_array)
+        mean_b, std_b = _weighted_mean_std(prompt_b_array, weight_array)
+        n_a = n_b = weight_array.sum() ** 2 / np.sum(weight_array ** 2)
     
-    pooled_std = np.sqrt(((len(prompt_a_array) - 1) * std_a**2 + (len(prompt_b_array) - 1) * std_b**2) / 
-                         (len(prompt_a_array) + len(prompt_b_array) - 2))
+    pooled_std = np.sqrt(((n_a - 1) * std_a**2 + (n_b - 1) * std_b**2) / (n_a + n_b - 2))
+    if weights is not None:
+        stderr_difference = pooled_std * np.sqrt(1 / n_a + 1 / n_b)
+        t_statistic = (mean_a - mean_b) / stderr_difference if stderr_difference else 0.0
+        p_value = float(2 * stats.t.sf(abs(t_statistic), n_a + n_b - 2)) if stderr_difference else 1.0
     cohens_d = (mean_a - mean_b) / pooled_std if pooled_std != 0 else 0
     
     is_significant = p_value < 0.05
@@ -46,12 +67,12 @@ def calculate_statistics(prompt_a_scores: List[float], prompt_b_scores: List[flo
         confidence = 0
         improvement = 0
     
-    stderr_a = std_a / np.sqrt(len(prompt_a_array))
-    stderr_b = std_b / np.sqrt(len(prompt_b_array))
+    stderr_a = std_a / np.sqrt(n_a)
+    stderr_b = std_b / np.sqrt(n_b)
     ci_95_a = (mean_a - 1.96 * stderr_a, mean_a + 1.96 * stderr_a)
     ci_95_b = (mean_b - 1.96 * stderr_b, mean_b + 1.96 * stderr_b)
     
-    return {
+    result = {
         "winner": winner,
         "p_value": p_value,
         "confidence_pct": confidence,
@@ -67,9 +88,22 @@ def calculate_statistics(prompt_a_scores: List[float], prompt_b_scores: List[flo
         "t_statistic": t_statistic,
         "sample_size": len(prompt_a_array)
     }
+    if weights is not None:
+        result["effective_sample_size"] = float(n_a)
+        result["represented_cases"] = float(np.sum(weights))
+    return result
+
+def _weighted_mean_std(values: np.ndarray, weights: np.ndarray):
+    """Weighted mean and standard deviation, unbiased for reliability weights."""
+    mean = np.average(values, weights=weights)
+    total, squares = weights.sum(), np.sum(weights ** 2)
+    denominator = total - squares / total
+    variance = np.sum(weights * (values - mean) ** 2) / denominator if denominator > 0 else 0.0
+    return mean, np.sqrt(variance)
 
 def calculate_roi(cost_a: float, cost_b: float, quality_a: float, quality_b: float, 
-                  num_requests: int = 100000) -> Dict[str, Any]:
+                  num_requests: int = 100000,
+                  batch_price_factor: Optional[float] = None) -> Dict[str, Any]:
     """
     Calculate ROI and cost savings at scale.
     
@@ -79,6 +113,8 @@ def calculate_roi(cost_a: float, cost_b: float, quality_a: float, quality_b: flo
         quality_a: Average quality score for Prompt A
         quality_b: Average quality score for Prompt B
         num_requests: Number of requests to project (default 100k)
+        batch_price_factor: Optional share of the list price charged by the provider's
+            batch API; adds the projected totals at batch pricing
     
     Returns:
         Dictionary with cost analysis
@@ -117,5 +153,471 @@ def calculate_roi(cost_a: float, cost_b: float, quality_a: float, quality_b: flo
         "quality_per_dollar_a": quality_per_dollar_a,
         "quality_per_dollar_b": quality_per_dollar_b,
         "better_value": better_value,
-        "num_requests": num_requests
-    }
\ No newline at end of file
+        "num_requests": num_requests,
+        "batch_total_cost_a": total_cost_a * batch_price_factor if batch_price_factor is not None else None,
+        "batch_total_cost_b": total_cost_b * batch_price_factor if batch_price_factor is not None else None
+    }
+
+def sequential_test(prompt_a_scores: List[float], prompt_b_scores: List[float],
+                    alpha: float = 0.05, min_effect: float = 0.5,
+                    mixing_sd: Optional[float] = None, min_samples: int = 10) -> Dict[str, Any]:
+    """
+    Always-valid sequential test (mSPRT) on paired quality differences.
+
+    Uses a normal-mixture likelihood ratio over the per-case differences
+    A - B with plug-in variance, so the returned p-value stays valid no
+    matter how often the data is peeked at or when the run is stopped.
+
+    Args:
+        prompt_a_scores: Quality scores for Prompt A, in dataset order
+        prompt_b_scores: Quality scores for Prompt B on the same cases
+        alpha: Significance level
+        min_effect: Smallest difference in mean quality worth detecting;
+            the run is futile once the always-valid interval lies inside ±min_effect
+        mixing_sd: Standard deviation of the mixing prior (defaults to min_effect)
+        min_samples: Cases required before any decision is made
+
+    Returns:
+        Dictionary with decision ('continue', 'significant' or 'futility'),
+        always-valid p-value and confidence interval, and sample size
+    """
+    if len(prompt_a_scores) != len(prompt_b_scores):
+        raise ValueError("Sequential testing requires paired score lists of equal length")
+
+    differences = np.asarray(prompt_a_scores, dtype=float) - np.asarray(prompt_b_scores, dtype=float)
+    sample_size = len(differences)
+    mean_difference = float(np.mean(differences)) if sample_size else 0.0
+
+    if sample_size < max(2, min_samples):
+        return {
+            "decision": "continue",
+            "p_value": 1.0,
+            "ci": (float("-inf"), float("inf")),
+            "mean_difference": mean_difference,
+            "sample_size": sample_size
+        }
+
+    counts = np.arange(1, sample_size + 1, dtype=float)
+    running_means = np.cumsum(differences) / counts
+    running_sq = np.cumsum(differences ** 2)
+    first = max(2, min_samples) - 1
+    counts, running_means, running_sq = counts[first:], running_means[first:], running_sq[first:]
+
+    variances = np.maximum((running_sq - counts * running_means ** 2) / (counts - 1), 1e-6)
+    tau_sq = (mixing_sd if mixing_sd is not None else min_effect) ** 2
+    mean_variances = variances / counts
+
+    log_lambda = (0.5 * np.log(mean_variances / (mean_variances + tau_sq))
+                  + tau_sq * running_means ** 2 / (2 * mean_variances * (mean_variances + tau_sq)))
+    p_value = float(min(1.0, np.exp(-np.max(log_lambda))))
+
+    final_v = mean_variances[-1]
+    half_width = float(np.sqrt(final_v * (final_v + tau_sq) / tau_sq
+                               * np.log((final_v + tau_sq) / (alpha ** 2 * final_v))))
+    ci = (mean_difference - half_width, mean_difference + half_width)
+
+    if p_value < alpha:
+        decision = "significant"
+    elif -min_effect < ci[0] and ci[1] < min_effect:
+        decision = "futility"
+    else:
+        decision = "continue"
+
+    return {
+        "decision": decision,
+        "p_value": p_value,
+        "ci": ci,
+        "mean_difference": mean_difference,
+        "sample_size": sample_size
+    }
+
+
+def latency_percentiles(latencies: List[float]) -> Dict[str, float]:
+    """Return the p50/p90/p99 and mean of per-request latencies (seconds)."""
+    if len(latencies) == 0:
+        raise ValueError("Latency list cannot be empty")
+    latency_array = np.asarray(latencies, dtype=float)
+    p50, p90, p99 = np.percentile(latency_array, [50, 90, 99])
+    return {"p50": float(p50), "p90": float(p90), "p99": float(p99), "mean": float(latency_array.mean())}
+
+def calculate_latency_statistics(latencies_a: List[float], latencies_b: List[float],
+                                 alpha: float = 0.05) -> Dict[str, Any]:
+    """
+    Compare latency distributions of two prompts, focusing on the tail.
+
+    Latencies are right-skewed, so significance uses the two-sided
+    Mann-Whitney U test rather than a t-test on the means.
+
+    Args:
+        latencies_a: Per-request latencies (seconds) for Prompt A
+        latencies_b: Per-request latencies (seconds) for Prompt B
+        alpha: Significance level
+
+    Returns:
+        Dictionary with p50/p90/p99 and mean for each prompt, the U statistic,
+        p-value, significance flag and the faster prompt
+    """
+    import scipy.stats as stats
+    if len(latencies_a) == 0 or len(latencies_b) == 0:
+        raise ValueError("Latency lists cannot be empty")
+
+    latency_a_array = np.asarray(latencies_a, dtype=float)
+    latency_b_array = np.asarray(latencies_b, dtype=float)
+
+    p50_a, p90_a, p99_a = np.percentile(latency_a_array, [50, 90, 99])
+    p50_b, p90_b, p99_b = np.percentile(latency_b_array, [50, 90, 99])
+
+    if np.ptp(np.concatenate([latency_a_array, latency_b_array])) == 0:
+        u_statistic, p_value = float("nan"), 1.0
+    else:
+        u_statistic, p_value = stats.mannwhitneyu(latency_a_array, latency_b_array, alternative="two-sided")
+
+    is_significant = p_value < alpha
+    if is_significant:
+        faster = "Prompt A" if p50_a < p50_b else "Prompt B"
+    else:
+        faster = "No significant difference"
+
+    return {
+        "p50_a": p50_a,
+        "p90_a": p90_a,
+        "p99_a": p99_a,
+        "p50_b": p50_b,
+        "p90_b": p90_b,
+        "p99_b": p99_b,
+        "mean_a": np.mean(latency_a_array),
+        "mean_b": np.mean(latency_b_array),
+        "u_statistic": u_statistic,
+        "p_value": p_value,
+        "is_significant": is_significant,
+        "faster": faster
+    }
+
+
+def calculate_leaderboard(scores_by_variant: Dict[str, List[float]], confidence: float = 0.95,
+                          min_sd: float = 1.0, draws: int = 20000,
+                          seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Rank prompt variants by mean quality with confidence intervals.
+
+    The probability that each variant is the best is estimated by Monte
+    Carlo draws from normal posteriors N(mean, sd^2 / n). The standard
+    deviation is floored at ``min_sd`` so variants with very few (or
+    identical) scores are not treated as certain.
+
+    Args:
+        scores_by_variant: Quality scores per variant name
+        confidence: Confidence level of the t-intervals
+        min_sd: Lower bound on the per-score standard deviation
+        draws: Number of posterior draws for the probability of being best
+        seed: Optional random seed
+
+    Returns:
+        List of dictionaries (rank, variant, mean, std, ci, n, prob_best), best first
+    """
+    import scipy.stats as stats
+    names = [name for name, scores in scores_by_variant.items() if len(scores) > 0]
+    if not names:
+        raise ValueError("At least one variant needs scores")
+
+    means = np.array([np.mean(scores_by_variant[name]) for name in names])
+    sizes = np.array([len(scores_by_variant[name]) for name in names])
+    stds = np.array([np.std(scores_by_variant[name], ddof=1) if n > 1 else 0.0
+                     for name, n in zip(names, sizes)])
+
+    rng = np.random.default_rng(seed)
+    posterior_sd = np.maximum(stds, min_sd) / np.sqrt(sizes)
+    samples = rng.normal(means, posterior_sd, size=(draws, len(names)))
+    prob_best = np.bincount(np.argmax(samples, axis=1), minlength=len(names)) / draws
+
+    leaderboard = []
+    for i, name in enumerate(names):
+        if sizes[i] > 1:
+            half_width = stats.t.ppf(0.5 + confidence / 2, sizes[i] - 1) * stds[i] / np.sqrt(sizes[i])
+            ci = (float(means[i] - half_width), float(means[i] + half_width))
+        else:
+            ci = (float("-inf"), float("inf"))
+        leaderboard.append({
+            "variant": name,
+            "mean": float(means[i]),
+            "std": float(stds[i]),
+            "ci": ci,
+            "n": int(sizes[i]),
+            "prob_best": float(prob_best[i])
+        })
+
+    leaderboard.sort(key=lambda row: (row["mean"], row["prob_best"]), reverse=True)
+    for rank, row in enumerate(leaderboard, start=1):
+        row["rank"] = rank
+    return leaderboard
+
+
+BOOTSTRAP_CHUNK_ELEMENTS = 4_000_000
+
+
+def bca_bootstrap_ci(differences: List[float], confidence: float = 0.95, n_resamples: int = 10000,
+                     seed: Optional[int] = 0) -> tuple:
+    """
+    Bias-corrected and accelerated (BCa) bootstrap interval for a mean.
+
+    Resamples are drawn as (chunk, n) index matrices, so the bootstrap is a
+    handful of NumPy operations rather than a Python loop while memory stays
+    bounded for large datasets. The acceleration comes from the closed-form
+    jackknife of the mean.
+
+    Args:
+        differences: Per-case values (e.g. paired quality differences)
+        confidence: Interval coverage
+        n_resamples: Number of bootstrap resamples
+        seed: Random seed
+
+    Returns:
+        Tuple (lower, upper)
+    """
+    import scipy.stats as stats
+    values = np.asarray(differences, dtype=float)
+    size = len(values)
+    estimate = values.mean()
+    if size < 2 or np.ptp(values) == 0:
+        return (float(estimate), float(estimate))
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1, min(n_resamples, BOOTSTRAP_CHUNK_ELEMENTS // size))
+    boot_means = np.concatenate([
+        values[rng.integers(0, size, size=(min(chunk, n_resamples - start), size))].mean(axis=1)
+        for start in range(0, n_resamples, chunk)
+    ])
+
+    proportion_below = np.clip(np.mean(boot_means < estimate), 1.0 / n_resamples, 1 - 1.0 / n_resamples)
+    z0 = stats.norm.ppf(proportion_below)
+
+    jackknife = (values.sum() - values) / (size - 1)
+    deviations = jackknife.mean() - jackknife
+    denominator = 6.0 * np.sum(deviations ** 2) ** 1.5
+    acceleration = np.sum(deviations ** 3) / denominator if denominator > 0 else 0.0
+
+    z = stats.norm.ppf([(1 - confidence) / 2, (1 + confidence) / 2])
+    adjusted = stats.norm.cdf(z0 + (z0 + z) / (1 - acceleration * (z0 + z)))
+    lower, upper = np.quantile(boot_means, adjusted)
+    return (float(lower), float(upper))
+
+
+def calculate_paired_statistics(prompt_a_scores: List[float], prompt_b_scores: List[float],
+                                covariate: Optional[List[float]] = None, alpha: float = 0.05,
+                                n_resamples: int = 10000, seed: Optional[int] = 0) -> Dict[str, Any]:
+    """
+    Paired analysis of two prompts scored on the same inputs.
+
+    Works on the per-case differences A - B, so variation between inputs
+    (easy vs hard cases) cancels out. Significance comes from the paired
+    t-test; the Wilcoxon signed-rank test and a BCa bootstrap interval are
+    reported alongside as distribution-free checks. With a ``covariate``
+    (e.g. input length) the differences are CUPED-adjusted: the part of
+    the difference explained linearly by the covariate is removed before
+    testing, which narrows the interval without biasing the mean.
+
+    Args:
+        prompt_a_scores: Quality scores for Prompt A, in dataset order
+        prompt_b_scores: Quality scores for Prompt B on the same cases
+        covariate: Optional per-case covariate measured before the responses
+        alpha: Significance level
+        n_resamples: Bootstrap resamples for the BCa interval
+        seed: Random seed for the bootstrap
+
+    Returns:
+        Dictionary with the same keys as calculate_statistics plus a 'paired'
+        entry holding the difference, its intervals, the Wilcoxon result and
+        CUPED details
+    """
+    import scipy.stats as stats
+    if len(prompt_a_scores) != len(prompt_b_scores):
+        raise ValueError("Paired analysis requires score lists of equal length")
+    if len(prompt_a_scores) < 2:
+        raise ValueError("Paired analysis needs at least two test cases")
+
+    prompt_a_array = np.asarray(prompt_a_scores, dtype=float)
+    prompt_b_array = np.asarray(prompt_b_scores, dtype=float)
+    differences = prompt_a_array - prompt_b_array
+    sample_size = len(differences)
+
+    cuped = None
+    adjusted = differences
+    if covariate is not None:
+        covariate_array = np.asarray(covariate, dtype=float)
+        if len(covariate_array) != sample_size:
+            raise ValueError("Covariate must have one value per test case")
+        centered = covariate_array - covariate_array.mean()
+        covariate_var = np.mean(centered ** 2)
+        theta = np.mean(centered * (differences - differences.mean())) / covariate_var if covariate_var > 0 else 0.0
+        adjusted = differences - theta * centered
+        raw_var = np.var(differences, ddof=1)
+        cuped = {
+            "theta": float(theta),
+            "variance_reduction": float(1 - np.var(adjusted, ddof=1) / raw_var) if raw_var > 0 else 0.0
+        }
+
+    mean_difference = float(adjusted.mean())
+    std_difference = float(np.std(adjusted, ddof=1))
+    if std_difference == 0:
+        t_statistic = 0.0 if mean_difference == 0 else float("inf") * np.sign(mean_difference)
+        p_value = 1.0 if mean_difference == 0 else 0.0
+        ci_difference = (mean_difference, mean_difference)
+    else:
+        stderr = std_difference / np.sqrt(sample_size)
+        t_statistic = mean_difference / stderr
+        p_value = float(2 * stats.t.sf(abs(t_statistic), sample_size - 1))
+        half_width = stats.t.ppf(1 - alpha / 2, sample_size - 1) * stderr
+        ci_difference = (float(mean_difference - half_width), float(mean_difference + half_width))
+
+    if np.all(differences == 0):
+        wilcoxon_statistic, wilcoxon_p_value = float("nan"), 1.0
+    else:
+        wilcoxon_statistic, wilcoxon_p_value = stats.wilcoxon(differences)
+
+    mean_a = np.mean(prompt_a_array)
+    mean_b = np.mean(prompt_b_array)
+    std_a = np.std(prompt_a_array, ddof=1)
+    std_b = np.std(prompt_b_array, ddof=1)
+    effect_size = mean_difference / std_difference if std_difference != 0 else 0
+
+    is_significant = p_value < alpha
+    if is_significant:
+        confidence = (1 - p_value) * 100
+        if mean_difference > 0:
+            winner = "Prompt A"
+            improvement = ((mean_a - mean_b) / mean_b) * 100
+        else:
+            winner = "Prompt B"
+            improvement = ((mean_b - mean_a) / mean_a) * 100
+    else:
+        winner = "No significant difference"
+        confidence = 0
+        improvement = 0
+
+    stderr_a = std_a / np.sqrt(sample_size)
+    stderr_b = std_b / np.sqrt(sample_size)
+
+    return {
+        "winner": winner,
+        "p_value": p_value,
+        "confidence_pct": confidence,
+        "is_significant": is_significant,
+        "mean_a": mean_a,
+        "mean_b": mean_b,
+        "std_a": std_a,
+        "std_b": std_b,
+        "effect_size": effect_size,
+        "improvement_pct": improvement,
+        "ci_95_a": (mean_a - 1.96 * stderr_a, mean_a + 1.96 * stderr_a),
+        "ci_95_b": (mean_b - 1.96 * stderr_b, mean_b + 1.96 * stderr_b),
+        "t_statistic": t_statistic,
+        "sample_size": sample_size,
+        "paired": {
+            "mean_difference": mean_difference,
+            "std_difference": std_difference,
+            "ci_difference": ci_difference,
+            "bootstrap_ci": bca_bootstrap_ci(adjusted, 1 - alpha, n_resamples, seed),
+            "wilcoxon_statistic": wilcoxon_statistic,
+            "wilcoxon_p_value": float(wilcoxon_p_value),
+            "cuped": cuped
+        }
+    }
+
+
+def _t_test_power(effect: float, sd: float, n: int, alpha: float, paired: bool) -> float:
+    """Power of a two-sided t-test for a true difference ``effect`` with ``n`` cases (per arm if unpaired)."""
+    import scipy.stats as stats
+    if paired:
+        df = n - 1
+        noncentrality = effect * np.sqrt(n) / sd
+    else:
+        df = 2 * n - 2
+        noncentrality = effect / (sd * np.sqrt(2.0 / n))
+    critical = stats.t.ppf(1 - alpha / 2, df)
+    return float(stats.nct.sf(critical, df, noncentrality) + stats.nct.cdf(-critical, df, noncentrality))
+
+
+def required_sample_size(effect: float, sd: float, alpha: float = 0.05, power: float = 0.8,
+                         paired: bool = True, max_n: int = 1_000_000) -> int:
+    """
+    Smallest number of cases for which a two-sided t-test reaches ``power``.
+
+    Starts from the normal approximation and steps up using the exact
+    noncentral-t power.
+
+    Args:
+        effect: Difference in mean quality to detect
+        sd: Standard deviation of the per-case differences (paired) or of
+            the scores within each prompt (unpaired)
+        alpha: Significance level
+        power: Target probability of detecting ``effect``
+        paired: Paired t-test on differences instead of an independent-samples test
+        max_n: Upper bound on the returned size
+
+    Returns:
+        Number of test cases (each case is scored for both prompts)
+    """
+    import scipy.stats as stats
+    if effect <= 0:
+        raise ValueError("effect must be positive")
+    if sd <= 0:
+        return 2
+
+    z_sum = stats.norm.ppf(1 - alpha / 2) + stats.norm.ppf(power)
+    n = int(np.ceil((z_sum * sd / effect) ** 2 * (1 if paired else 2)))
+    n = max(2, min(n, max_n))
+    while n < max_n and _t_test_power(effect, sd, n, alpha, paired) < power:
+        n += max(1, n // 50)
+    while n > 2 and _t_test_power(effect, sd, n - 1, alpha, paired) >= power:
+        n -= 1
+    return n
+
+
+def power_analysis(prompt_a_scores: List[float], prompt_b_scores: List[float], min_effect: float = 0.5,
+                   alpha: float = 0.05, power: float = 0.8) -> Dict[str, Any]:
+    """
+    Estimate the dataset size needed to detect ``min_effect`` from pilot scores.
+
+    The pilot gives the score spread of each prompt and the correlation of
+    the two prompts' scores across inputs. The paired design only pays for
+    the spread of the differences, sd_a^2 + sd_b^2 - 2 rho sd_a sd_b, so
+    strongly correlated prompts need far fewer cases than an unpaired test.
+
+    Args:
+        prompt_a_scores: Pilot quality scores for Prompt A, in dataset order
+        prompt_b_scores: Pilot quality scores for Prompt B on the same cases
+        min_effect: Smallest difference in mean quality worth detecting
+        alpha: Significance level
+        power: Target power
+
+    Returns:
+        Dictionary with pilot estimates and required cases for paired and unpaired analysis
+    """
+    if len(prompt_a_scores) != len(prompt_b_scores):
+        raise ValueError("Power analysis requires paired score lists of equal length")
+    if len(prompt_a_scores) < 3:
+        raise ValueError("Power analysis needs at least three pilot cases")
+
+    prompt_a_array = np.asarray(prompt_a_scores, dtype=float)
+    prompt_b_array = np.asarray(prompt_b_scores, dtype=float)
+    std_a = float(np.std(prompt_a_array, ddof=1))
+    std_b = float(np.std(prompt_b_array, ddof=1))
+    std_difference = float(np.std(prompt_a_array - prompt_b_array, ddof=1))
+    correlation = float(np.corrcoef(prompt_a_array, prompt_b_array)[0, 1]) if std_a > 0 and std_b > 0 else 0.0
+    pooled_std = float(np.sqrt((std_a ** 2 + std_b ** 2) / 2))
+
+    return {
+        "pilot_size": len(prompt_a_array),
+        "mean_a": float(np.mean(prompt_a_array)),
+        "mean_b": float(np.mean(prompt_b_array)),
+        "observed_difference": float(np.mean(prompt_a_array - prompt_b_array)),
+        "std_a": std_a,
+        "std_b": std_b,
+        "std_difference": std_difference,
+        "correlation": correlation,
+        "min_effect": min_effect,
+        "alpha": alpha,
+        "power": power,
+        "n_paired": required_sample_size(min_effect, std_difference, alpha, power, paired=True),
+        "n_unpaired": required_sample_size(min_effect, pooled_std, alpha, power, paired=False)
+    }
@@ -0,0 +1,230 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Tuple, Iterator
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+COST_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+METRIC_HELP = {
+    "neo_api_calls_total": ("counter", "API requests sent, by outcome"),
+    "neo_api_errors_total": ("counter", "Failed API requests, by error type"),
+    "neo_tokens_total": ("counter", "Tokens billed, by kind"),
+    "neo_cost_usd_total": ("counter", "Estimated spend in USD"),
+    "neo_throttle_seconds_total": ("counter", "Seconds spent waiting on the rate limiter and retry backoff"),
+    "neo_cache_hits_total": ("counter", "Requests answered from the response cache, by call kind"),
+    "neo_judge_parse_fallbacks_total": ("counter", "Judge replies that could not be parsed, by judge mode"),
+    "neo_call_latency_seconds": ("histogram", "Latency of successful API requests"),
+    "neo_call_tokens": ("histogram", "Input plus output tokens per successful API request"),
+    "neo_call_cost_usd": ("histogram", "Estimated cost per successful API request"),
+    "neo_span_seconds": ("counter", "Time spent inside spans, by span name"),
+    "neo_spans_total": ("counter", "Spans finished, by span name"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _otel_tracer():
+    """Return an OpenTelemetry tracer if the API package is installed, else None."""
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    return trace.get_tracer("neo_prompt_tester")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, rows = 0, []
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            rows.append(("+Inf" if bound == float("inf") else f"{bound:g}", total))
+        return rows
+
+
+class Telemetry:
+    """
+    Spans, counters and histograms for one evaluation run.
+
+    Spans time a phase, a test case or a single API call. Their durations
+    are aggregated per span name for the phase breakdown, and when the
+    ``opentelemetry`` API package is installed each span is also emitted
+    to the globally configured tracer provider, so an exporter configured
+    by the user receives them. Metrics are kept in process and dumped as
+    Prometheus text or JSON at the end of the run.
+    """
+
+    enabled = True
+
+    def __init__(self, tracer: Any = None, tracing: bool = True):
+        """
+        Args:
+            tracer: OpenTelemetry tracer for spans (defaults to the global one if installed)
+            tracing: Emit OpenTelemetry spans at all
+        """
+        self.tracer = (tracer or _otel_tracer()) if tracing else None
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.started_at = time.time()
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Add ``value`` to a counter."""
+        key = self._labels(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: Any) -> None:
+        """Record ``value`` in a histogram."""
+        key = self._labels(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        """
+        Time a block as span ``name``.
+
+        Nested spans (including spans opened in asyncio tasks started inside
+        the block) become children of this one in OpenTelemetry.
+        """
+        started = time.perf_counter()
+        if self.tracer is None:
+            try:
+                yield
+            finally:
+                self._finish_span(name, time.perf_counter() - started)
+            return
+        with self.tracer.start_as_current_span(f"neo.{name}", attributes=attributes):
+            try:
+                yield
+            finally:
+                self._finish_span(name, time.perf_counter() - started)
+
+    def _finish_span(self, name: str, duration: float) -> None:
+        self.count("neo_span_seconds", duration, span=name)
+        self.count("neo_spans_total", 1, span=name)
+
+    def phase_breakdown(self) -> List[Dict[str, Any]]:
+        """
+        Total time per span name, largest first.
+
+        Spans that run concurrently (calls and cases) are summed, so their
+        totals can exceed the wall time of the phase that contains them.
+        """
+        with self._lock:
+            seconds = dict(self.counters.get("neo_span_seconds", {}))
+            counts = dict(self.counters.get("neo_spans_total", {}))
+            throttle = sum(self.counters.get("neo_throttle_seconds_total", {}).values())
+        rows = []
+        for key, total in seconds.items():
+            name = dict(key)["span"]
+            count = int(counts.get(key, 0))
+            rows.append({"phase": name, "seconds": total, "count": count,
+                         "mean_seconds": total / count if count else 0.0})
+        if throttle:
+            rows.append({"phase": "throttle_wait", "seconds": throttle, "count": 0, "mean_seconds": 0.0})
+        rows.sort(key=lambda row: row["seconds"], reverse=True)
+        return rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self.counters.items()
+            }
+            histograms = {
+                name: [{"labels": dict(key), "count": hist.count, "sum": hist.sum,
+                        "buckets": dict(hist.cumulative())} for key, hist in series.items()]
+                for name, series in self.histograms.items()
+            }
+        return {"started_at": self.started_at, "counters": counters, "histograms": histograms,
+                "phases": self.phase_breakdown()}
+
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        def render_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted(self.counters):
+                kind, help_text = METRIC_HELP.get(name, ("counter", name))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for key, value in sorted(self.counters[name].items()):
+                    lines.append(f"{name}{render_labels(key)} {value:g}")
+            for name in sorted(self.histograms):
+                kind, help_text = METRIC_HELP.get(name, ("histogram", name))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for key, hist in sorted(self.histograms[name].items()):
+                    for bound, total in hist.cumulative():
+                        lines.append(f"{name}_bucket{render_labels(key, (('le', bound),))} {total}")
+                    lines.append(f"{name}_sum{render_labels(key)} {hist.sum:g}")
+                    lines.append(f"{name}_count{render_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path: str) -> str:
+        """
+        Dump the metrics to ``path``: JSON for a ``.json`` extension, Prometheus text otherwise.
+
+        Returns:
+            The path written
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.to_dict(), f, indent=2)
+            else:
+                f.write(self.prometheus_text())
+        return path
+
+
+class NullTelemetry(Telemetry):
+    """Telemetry that records nothing; the default for evaluators created without one."""
+
+    enabled = False
+
+    def __init__(self):
+        super().__init__(tracing=False)
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        pass
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: Any) -> None:
+        pass
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        yield
+
+
+NULL_TELEMETRY = NullTelemetry()
@@ -0,0 +1,264 @@
+import asyncio
+import math
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+import numpy as np
+
+from evaluator import PromptEvaluator, summarize_results
+from stats_calculator import calculate_leaderboard
+
+STRATEGIES = ("thompson", "halving")
+
+ResponseCallback = Callable[[str, int, Dict[str, Any]], None]
+
+
+class PromptTournament:
+    """
+    Multi-variant prompt comparison that spends calls where they matter.
+
+    Every variant walks the dataset in the same order, so variants are
+    compared on the same inputs as far as each got. Two allocation
+    strategies are supported:
+
+    - ``thompson``: after a short warm-up, each new response goes to the
+      variant whose posterior draw of mean quality is highest. Losing
+      variants quickly stop getting traffic. The run ends when one variant
+      is best with probability ``confidence`` (with at least
+      ``min_stop_samples`` responses for it and the runner-up) or the budget
+      is spent. The rule is checked again on the final scores once the
+      responses in flight finish; if it no longer holds, sampling continues.
+    - ``halving``: successive halving. The budget is split into
+      ceil(log2 N) rounds; each round evaluates every surviving variant on
+      its next slice of cases and keeps the better half.
+    """
+
+    def __init__(self, evaluator: PromptEvaluator, variants: Dict[str, str],
+                 dataset: List[Dict[str, str]], strategy: str = "thompson",
+                 budget: Optional[int] = None, min_samples: int = 5,
+                 confidence: float = 0.95, min_stop_samples: int = 15, seed: Optional[int] = None):
+        """
+        Initialize the tournament.
+
+        Args:
+            evaluator: Evaluator used for generation and judging
+            variants: Prompt templates by variant name
+            dataset: Test cases with 'input' field
+            strategy: 'thompson' or 'halving'
+            budget: Maximum number of judged responses (defaults to the full grid,
+                variants x cases)
+            min_samples: Responses every variant gets before it can be dropped
+            confidence: Probability of being best at which Thompson sampling stops
+            min_stop_samples: Responses the leader and runner-up need before Thompson sampling may stop
+            seed: Optional random seed for the allocation
+        """
+        if len(variants) < 2:
+            raise ValueError("A tournament needs at least two variants")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}. Use one of {', '.join(STRATEGIES)}")
+        if not dataset:
+            raise ValueError("Dataset cannot be empty")
+
+        self.evaluator = evaluator
+        self.variants = dict(variants)
+        self.dataset = list(dataset)
+        self.strategy = strategy
+        self.full_grid = len(self.variants) * len(self.dataset)
+        self.budget = min(budget, self.full_grid) if budget else self.full_grid
+        self.min_samples = min(min_samples, len(self.dataset))
+        self.confidence = confidence
+        self.min_stop_samples = min(min_stop_samples, len(self.dataset))
+        self.rng = np.random.default_rng(seed)
+        # One seed for every leaderboard, so equal scores always give the same P(best).
+        self.leaderboard_seed = int(self.rng.integers(2 ** 31))
+
+        self.results: Dict[str, List[Dict[str, Any]]] = {name: [] for name in self.variants}
+        self.next_case: Dict[str, int] = {name: 0 for name in self.variants}
+        self.eliminated: Dict[str, int] = {}
+        self.dispatched = 0
+
+    def _scores(self) -> Dict[str, List[float]]:
+        return {name: [r["quality"] for r in results] for name, results in self.results.items()}
+
+    def _available(self, name: str) -> bool:
+        return name not in self.eliminated and self.next_case[name] < len(self.dataset)
+
+    def _dispatch(self, name: str) -> Tuple[str, int]:
+        idx = self.next_case[name]
+        self.next_case[name] += 1
+        self.dispatched += 1
+        return name, idx
+
+    def _thompson_choice(self) -> Optional[str]:
+        """Pick the variant for the next response, or None if none can take more."""
+        candidates = [name for name in self.variants if self._available(name)]
+        if not candidates:
+            return None
+
+        warming_up = [name for name in candidates if self.next_case[name] < self.min_samples]
+        if warming_up:
+            return min(warming_up, key=lambda name: self.next_case[name])
+
+        draws = []
+        for name in candidates:
+            scores = np.array([r["quality"] for r in self.results[name]])
+            if len(scores) == 0:
+                draws.append(np.inf)
+                continue
+            sd = max(float(np.std(scores, ddof=1)) if len(scores) > 1 else 0.0, 1.0)
+            draws.append(self.rng.normal(scores.mean(), sd / math.sqrt(len(scores))))
+        return candidates[int(np.argmax(draws))]
+
+    def _leaderboard(self) -> List[Dict[str, Any]]:
+        return calculate_leaderboard(self._scores(), confidence=0.95, seed=self.leaderboard_seed)
+
+    def _leader_found(self) -> bool:
+        """True when the stopping rule holds on the current scores."""
+        if any(len(results) < self.min_samples for results in self.results.values()):
+            return False
+        leader, runner_up = self._leaderboard()[:2]
+        if min(leader["n"], runner_up["n"]) < self.min_stop_samples:
+            return False
+        return leader["prob_best"] >= self.confidence
+
+    async def _evaluate(self, name: str, idx: int,
+                        semaphore: asyncio.Semaphore) -> Tuple[str, int, Dict[str, Any]]:
+        result = await self.evaluator.evaluate_response(
+            self.variants[name], self.dataset[idx]["input"], semaphore
+        )
+        result["case_index"] = idx
+        return name, idx, result
+
+    async def run_async(self, concurrency: int = 1,
+                        progress_callback: Optional[Callable[[int, int], None]] = None,
+                        on_response_complete: Optional[ResponseCallback] = None) -> Dict[str, Any]:
+        """
+        Run the tournament.
+
+        Args:
+            concurrency: Maximum number of concurrent API calls
+            progress_callback: Optional callback receiving (responses completed, budget)
+            on_response_complete: Optional callback receiving (variant, case index, result)
+
+        Returns:
+            Dictionary with per-variant summaries, the leaderboard and call accounting
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        semaphore = asyncio.Semaphore(concurrency)
+        if self.evaluator.transport.warm_up:
+            await self.evaluator.awarm_up(concurrency)
+        pending = set()
+        completed = 0
+        calls_at_start = self.evaluator.call_count
+        stop_reason: Optional[str] = None
+
+        def collect(done) -> None:
+            nonlocal completed
+            for task in done:
+                name, idx, result = task.result()
+                self.results[name].append(result)
+                completed += 1
+                if on_response_complete:
+                    on_response_complete(name, idx, result)
+                if progress_callback:
+                    progress_callback(completed, self.budget)
+
+        async def submit(name: str, idx: int) -> None:
+            nonlocal pending
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+            pending.add(asyncio.ensure_future(self._evaluate(name, idx, semaphore)))
+
+        async def drain() -> None:
+            nonlocal pending
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+
+        try:
+            if self.strategy == "thompson":
+                check_every = len(self.variants)
+                last_check = 0
+                while True:
+                    while self.dispatched < self.budget:
+                        if completed - last_check >= check_every:
+                            last_check = completed
+                            if self._leader_found():
+                                stop_reason = "leader found"
+                                break
+                        name = self._thompson_choice()
+                        if name is None:
+                            break
+                        await submit(*self._dispatch(name))
+                    await drain()
+                    # Responses still in flight at the stop can change the ranking; confirm it on the final scores.
+                    if self._leader_found():
+                        stop_reason = "leader found"
+                        break
+                    if stop_reason is None:
+                        break
+                    stop_reason = None
+            else:
+                rounds = max(1, math.ceil(math.log2(len(self.variants))))
+                for round_number in range(1, rounds + 1):
+                    survivors = [name for name in self.variants if name not in self.eliminated]
+                    remaining = self.budget - self.dispatched
+                    per_variant = max(self.min_samples,
+                                      remaining // ((rounds - round_number + 1) * len(survivors)))
+                    for _ in range(per_variant):
+                        for name in survivors:
+                            if self._available(name) and self.dispatched < self.budget:
+                                await submit(*self._dispatch(name))
+                    await drain()
+
+                    if len(survivors) <= 1:
+                        break
+                    scores = self._scores()
+                    ranked = sorted(survivors, key=lambda name: np.mean(scores[name]) if scores[name] else 0.0,
+                                    reverse=True)
+                    for name in ranked[math.ceil(len(ranked) / 2):]:
+                        self.eliminated[name] = round_number
+                    if self.dispatched >= self.budget:
+                        break
+                if len([name for name in self.variants if name not in self.eliminated]) == 1:
+                    stop_reason = "single survivor"
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if stop_reason is None:
+            stop_reason = "budget spent" if self.dispatched >= self.budget else "dataset exhausted"
+
+        leaderboard = self._leaderboard()
+        for row in leaderboard:
+            row["eliminated_in_round"] = self.eliminated.get(row["variant"])
+
+        calls_made = self.evaluator.call_count - calls_at_start
+        calls_per_response = calls_made / completed if completed else 0.0
+        return {
+            "strategy": self.strategy,
+            "variants": {
+                name: dict(summarize_results(self.results[name]), prompt=self.variants[name])
+                for name in self.variants
+            },
+            "leaderboard": leaderboard,
+            "winner": leaderboard[0]["variant"],
+            "stop_reason": stop_reason,
+            "responses": completed,
+            "budget": self.budget,
+            "full_grid_responses": self.full_grid,
+            "calls_made": calls_made,
+            "calls_saved": round(calls_per_response * (self.full_grid - completed))
+        }
+
+    def run(self, concurrency: int = 1,
+            progress_callback: Optional[Callable[[int, int], None]] = None,
+            on_response_complete: Optional[ResponseCallback] = None) -> Dict[str, Any]:
+        """Synchronous wrapper around run_async."""
+        return asyncio.run(self.run_async(
+            concurrency=concurrency,
+            progress_callback=progress_callback,
+            on_response_complete=on_response_complete
+        ))
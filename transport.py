@@ -0,0 +1,168 @@
+import asyncio
+import importlib.util
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple, Iterator
+
+import httpx
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+# httpcore trace events that make up connection establishment.
+CONNECT_EVENTS = ("connection.connect_tcp", "connection.start_tls")
+
+_connect_timer: ContextVar[Optional[Dict[str, Any]]] = ContextVar("connect_timer", default=None)
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class TransportConfig:
+    """
+    Connection-pool settings shared by every SDK client built from them.
+
+    Evaluators created with equal settings share one pool per process (and
+    per event loop for async clients), so connections opened for one
+    provider, model or judge are reused by the others.
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                 http2: Optional[bool] = None, warm_up: bool = True):
+        """
+        Args:
+            max_connections: Maximum open connections per pool
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection stays open
+            http2: Negotiate HTTP/2 (None enables it when ``h2`` is installed)
+            warm_up: Open connections before the timed evaluation loop starts
+        """
+        if http2 and not http2_available():
+            raise ValueError("HTTP/2 needs the 'h2' package (pip install h2)")
+        self.max_connections = max_connections
+        self.max_keepalive_connections = min(max_keepalive_connections, max_connections)
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2_available() if http2 is None else http2
+        self.warm_up = warm_up
+
+    def key(self) -> Tuple:
+        return (self.max_connections, self.max_keepalive_connections, self.keepalive_expiry, self.http2)
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+
+DEFAULT_TRANSPORT = TransportConfig()
+
+_sync_clients: Dict[Tuple, httpx.Client] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+
+
+def _record_connect_event(event_name: str) -> None:
+    timer = _connect_timer.get()
+    if timer is None:
+        return
+    for event in CONNECT_EVENTS:
+        if event_name == f"{event}.started":
+            timer["started"] = time.perf_counter()
+        elif event_name in (f"{event}.complete", f"{event}.failed") and timer.get("started") is not None:
+            timer["connect_time"] += time.perf_counter() - timer["started"]
+            timer["started"] = None
+
+
+def _trace(event_name: str, info: Dict[str, Any]) -> None:
+    _record_connect_event(event_name)
+
+
+async def _atrace(event_name: str, info: Dict[str, Any]) -> None:
+    _record_connect_event(event_name)
+
+
+def _attach_trace(request: httpx.Request) -> None:
+    request.extensions["trace"] = _trace
+
+
+async def _aattach_trace(request: httpx.Request) -> None:
+    request.extensions["trace"] = _atrace
+
+
+def get_http_client(config: TransportConfig = DEFAULT_TRANSPORT) -> httpx.Client:
+    """Return the process-wide sync httpx client for ``config``."""
+    with _clients_lock:
+        client = _sync_clients.get(config.key())
+        if client is None or client.is_closed:
+            client = httpx.Client(limits=config.limits(), http2=config.http2,
+                                  event_hooks={"request": [_attach_trace]})
+            _sync_clients[config.key()] = client
+        return client
+
+
+def get_async_http_client(config: TransportConfig = DEFAULT_TRANSPORT) -> httpx.AsyncClient:
+    """Return the async httpx client for ``config`` bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(config.key())
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=config.limits(), http2=config.http2,
+                                       event_hooks={"request": [_aattach_trace]})
+            clients[config.key()] = client
+        return client
+
+
+@contextmanager
+def measure_connect_time() -> Iterator[Dict[str, Any]]:
+    """
+    Collect time spent opening TCP connections and TLS handshakes.
+
+    Requests sent through the shared clients inside the block add their
+    connection setup time to the yielded dict's ``connect_time``; reused
+    keep-alive connections add nothing. The timer is context-local, so
+    concurrent asyncio tasks each measure only their own requests.
+    """
+    timer = {"connect_time": 0.0, "started": None}
+    token = _connect_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _connect_timer.reset(token)
+
+
+async def warm_up(client: httpx.AsyncClient, base_url: str, connections: int,
+                  http2: bool = False) -> Dict[str, Any]:
+    """
+    Open up to ``connections`` keep-alive connections to ``base_url``.
+
+    Sends concurrent HEAD requests and ignores the responses (usually 404
+    or 405); only the established connections matter. With HTTP/2 a single
+    connection multiplexes every request, so one request is enough.
+
+    Returns:
+        Dictionary with the number of connections requested and the seconds spent
+    """
+    count = 1 if http2 else max(1, connections)
+    started = time.perf_counter()
+
+    async def touch() -> None:
+        try:
+            await client.head(base_url)
+        except httpx.HTTPError:
+            pass
+
+    await asyncio.gather(*(touch() for _ in range(count)))
+    return {"connections": count, "time": time.perf_counter() - started}
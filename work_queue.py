@@ -0,0 +1,382 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional, List, Tuple, Callable
+
+from run_log import CaseResults
+
+DEFAULT_QUEUE_DIR = os.path.join("results", "queues")
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+STATUSES = ("pending", "leased", "done", "failed")
+
+CaseCallback = Callable[[int, Dict[str, Any], Dict[str, Any]], None]
+
+
+def new_worker_id() -> str:
+    """Identify a worker by host, process and a random suffix."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+
+
+class WorkQueue:
+    """
+    Durable SQLite queue of A/B test cases shared by a coordinator and its workers.
+
+    The coordinator stores the run configuration and one task per test
+    case. Workers lease cases for a limited time, evaluate them and write
+    the results back. A lease that runs out (the worker died or lost its
+    connection) puts the case back in the queue; a case whose leases
+    expire or fail ``max_attempts`` times is marked failed so it cannot
+    stall the run.
+
+    Any process that can open the file can work on the queue. Workers on
+    other machines need it on a shared filesystem with working file locks,
+    and lease expiry assumes the hosts' clocks roughly agree.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the queue database.
+
+        Args:
+            path: Path of the SQLite queue file
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+
+        # The rollback journal (not WAL) keeps the file usable on network filesystems.
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " case_index INTEGER PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " worker TEXT,"
+            " lease_expires REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " result TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, lease_expires)")
+
+    def initialize(self, metadata: Dict[str, Any], cases: List[Tuple[int, Dict[str, Any]]],
+                   max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+        """
+        Store the run configuration and enqueue every test case.
+
+        Args:
+            metadata: Run configuration (prompts, provider, model, ...) read by workers
+            cases: (dataset index, test case) pairs
+            max_attempts: Leases a case gets before it is marked failed
+
+        Returns:
+            Number of cases enqueued
+
+        Raises:
+            ValueError: If the queue was already initialized
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        metadata = dict(metadata, max_attempts=max_attempts)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute("SELECT 1 FROM meta WHERE key = 'run'").fetchone():
+                    raise ValueError(f"Queue already initialized: {self.path}")
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('run', ?)",
+                                   (json.dumps(metadata, ensure_ascii=False),))
+                self._conn.executemany(
+                    "INSERT INTO tasks (case_index, payload) VALUES (?, ?)",
+                    ((idx, json.dumps(case, ensure_ascii=False)) for idx, case in cases)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(cases)
+
+    def metadata(self) -> Dict[str, Any]:
+        """
+        Return the run configuration.
+
+        Raises:
+            ValueError: If the queue has not been initialized by a coordinator
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'run'").fetchone()
+        if row is None:
+            raise ValueError(f"Queue has no run configuration: {self.path}")
+        return json.loads(row[0])
+
+    def _requeue_expired(self, now: float, max_attempts: int) -> int:
+        """Release expired leases; cases out of attempts are marked failed. Caller holds the lock."""
+        self._conn.execute(
+            "UPDATE tasks SET status = 'failed', worker = NULL, error = COALESCE(error, 'lease expired') "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, max_attempts)
+        )
+        return self._conn.execute(
+            "UPDATE tasks SET status = 'pending', worker = NULL, lease_expires = NULL "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (now,)
+        ).rowcount
+
+    def requeue_expired(self) -> int:
+        """
+        Put cases whose lease ran out back in the queue.
+
+        Returns:
+            Number of cases re-queued
+        """
+        max_attempts = self.metadata()["max_attempts"]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                requeued = self._requeue_expired(time.time(), max_attempts)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return requeued
+
+    def lease(self, worker_id: str, limit: int,
+              lease_seconds: float = DEFAULT_LEASE_SECONDS) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Atomically claim up to ``limit`` pending cases.
+
+        Expired leases are re-queued first, so cases held by a dead worker
+        are picked up again.
+
+        Args:
+            worker_id: Identifier of the leasing worker
+            limit: Maximum number of cases to claim
+            lease_seconds: Seconds until the claim expires unless extended or completed
+
+        Returns:
+            List of (dataset index, test case) pairs, lowest index first
+        """
+        if limit < 1:
+            return []
+        max_attempts = self.metadata()["max_attempts"]
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_expired(now, max_attempts)
+                rows = self._conn.execute(
+                    "SELECT case_index, payload FROM tasks WHERE status = 'pending' ORDER BY case_index LIMIT ?",
+                    (limit,)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE case_index = ?",
+                    ((worker_id, now + lease_seconds, idx) for idx, _ in rows)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(idx, json.loads(payload)) for idx, payload in rows]
+
+    def extend(self, worker_id: str, case_indices: List[int],
+               lease_seconds: float = DEFAULT_LEASE_SECONDS) -> int:
+        """
+        Renew this worker's leases on cases still in progress.
+
+        Returns:
+            Number of leases renewed (leases already expired and re-queued are not)
+        """
+        expires = time.time() + lease_seconds
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                renewed = sum(
+                    self._conn.execute(
+                        "UPDATE tasks SET lease_expires = ? WHERE case_index = ? AND status = 'leased' AND worker = ?",
+                        (expires, idx, worker_id)
+                    ).rowcount
+                    for idx in case_indices
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return renewed
+
+    def complete(self, case_index: int, worker_id: str,
+                 result_a: Dict[str, Any], result_b: Dict[str, Any]) -> bool:
+        """
+        Record a finished case.
+
+        A result is accepted even if the lease expired in the meantime, as
+        long as no other worker has finished the case first.
+
+        Returns:
+            True if the result was stored, False if the case was already done
+        """
+        encoded = json.dumps({"a": result_a, "b": result_b}, ensure_ascii=False)
+        with self._lock:
+            stored = self._conn.execute(
+                "UPDATE tasks SET status = 'done', worker = ?, lease_expires = NULL, error = NULL, result = ? "
+                "WHERE case_index = ? AND status != 'done'",
+                (worker_id, encoded, case_index)
+            ).rowcount
+        return stored > 0
+
+    def release(self, case_index: int, worker_id: str, error: str) -> None:
+        """Give a leased case back after an error; it fails for good once out of attempts."""
+        max_attempts = self.metadata()["max_attempts"]
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, lease_expires = NULL, error = ? "
+                "WHERE case_index = ? AND status = 'leased' AND worker = ?",
+                (max_attempts, error, case_index, worker_id)
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of cases in each status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update(dict(rows))
+        return counts
+
+    def finished(self) -> bool:
+        """True once no case is pending or leased."""
+        counts = self.counts()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+    def results(self) -> CaseResults:
+        """Return finished cases as {dataset index: (result_a, result_b)}."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT case_index, result FROM tasks WHERE status = 'done' ORDER BY case_index"
+            ).fetchall()
+        results: CaseResults = {}
+        for idx, encoded in rows:
+            record = json.loads(encoded)
+            results[idx] = (record["a"], record["b"])
+        return results
+
+    def failures(self) -> Dict[int, str]:
+        """Return the last error of every failed case by dataset index."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT case_index, error FROM tasks WHERE status = 'failed' ORDER BY case_index"
+            ).fetchall()
+        return {idx: error or "" for idx, error in rows}
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class QueueWorker:
+    """
+    Evaluate cases leased from a WorkQueue until the queue is drained.
+
+    Up to ``concurrency`` cases are in flight at a time, sharing the
+    evaluator's API-call semaphore as in a local run. Leases on in-flight
+    cases are renewed every third of the lease period, so only a worker
+    that stops responding loses its cases.
+    """
+
+    def __init__(self, queue: WorkQueue, evaluator, worker_id: Optional[str] = None,
+                 concurrency: int = 1, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 poll_interval: float = 5.0):
+        """
+        Args:
+            queue: Queue to work on
+            evaluator: PromptEvaluator used for generation and judging
+            worker_id: Identifier recorded on leases (defaults to host-pid-random)
+            concurrency: Maximum number of concurrent API calls
+            lease_seconds: Seconds a leased case stays reserved without renewal
+            poll_interval: Seconds to wait when other workers hold every remaining case
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.queue = queue
+        self.evaluator = evaluator
+        self.worker_id = worker_id or new_worker_id()
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+    async def run_async(self, on_case_complete: Optional[CaseCallback] = None) -> Dict[str, int]:
+        """
+        Work until no case is pending or leased.
+
+        Args:
+            on_case_complete: Optional callback receiving (index, result_a, result_b)
+
+        Returns:
+            Dictionary with the number of cases this worker completed and failed
+        """
+        # Queue calls are SQLite transactions that can wait on other workers' locks, so they
+        # run on worker threads instead of stalling the API calls on this loop.
+        metadata = await asyncio.to_thread(self.queue.metadata)
+        prompt_a, prompt_b = metadata["prompt_a"], metadata["prompt_b"]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        if self.evaluator.transport.warm_up:
+            await self.evaluator.awarm_up(self.concurrency)
+
+        in_flight: Dict[asyncio.Future, int] = {}
+        stats = {"completed": 0, "failed": 0}
+        last_renewal = time.monotonic()
+
+        async def collect(done) -> None:
+            for task in done:
+                idx = in_flight.pop(task)
+                try:
+                    _, result_a, result_b = task.result()
+                except Exception as e:
+                    await asyncio.to_thread(self.queue.release, idx, self.worker_id, f"{type(e).__name__}: {e}")
+                    stats["failed"] += 1
+                    continue
+                if await asyncio.to_thread(self.queue.complete, idx, self.worker_id, result_a, result_b):
+                    stats["completed"] += 1
+                    if on_case_complete:
+                        on_case_complete(idx, result_a, result_b)
+
+        try:
+            while True:
+                if time.monotonic() - last_renewal >= self.lease_seconds / 3 and in_flight:
+                    await asyncio.to_thread(self.queue.extend, self.worker_id, list(in_flight.values()),
+                                            self.lease_seconds)
+                    last_renewal = time.monotonic()
+
+                leased = await asyncio.to_thread(self.queue.lease, self.worker_id,
+                                                 self.concurrency - len(in_flight), self.lease_seconds)
+                for idx, case in leased:
+                    task = asyncio.ensure_future(
+                        self.evaluator.evaluate_case(idx, prompt_a, prompt_b, case["input"], semaphore)
+                    )
+                    in_flight[task] = idx
+
+                if in_flight:
+                    done, _ = await asyncio.wait(set(in_flight), timeout=self.lease_seconds / 3,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                    await collect(done)
+                elif await asyncio.to_thread(self.queue.finished):
+                    break
+                else:
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        return stats
+
+    def run(self, on_case_complete: Optional[CaseCallback] = None) -> Dict[str, int]:
+        """Synchronous wrapper around run_async."""
+        return asyncio.run(self.run_async(on_case_complete=on_case_complete))